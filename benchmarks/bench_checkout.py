@@ -0,0 +1,140 @@
+# benchmarks/bench_checkout.py
+# Сравнение задержки оформления заказа: прежний update_order (три коммита,
+# отдельное соединение на цену каждого товара, построчные INSERT) против
+# транзакционного db_utils.update_order.
+#
+# Нужна рабочая БД из config.py. Запуск из корня проекта:
+#   python -m benchmarks.bench_checkout --items 5 --rounds 50
+# Скрипт заводит тестового пользователя и удаляет его заказы (с пересчётом daily_sales) и его самого в конце.
+import argparse
+import logging
+import statistics
+import time
+from datetime import datetime
+
+import mysql.connector
+
+from db import db_utils
+
+BENCH_TG_USER_ID = "bench-checkout"
+
+
+def legacy_update_order(id_user, delivery_type_id, delivery_address, delivery_time, order_total, cart_items):
+    """
+    Оформление заказа в том виде, в каком оно было до перехода на одну транзакцию.
+    """
+    mydb = db_utils.connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor()
+        try:
+            mycursor.execute("SELECT id_orders FROM orders WHERE id_user = %s AND status = 'корзина'", (id_user,))
+            order_result = mycursor.fetchone()
+            if not order_result:
+                return None
+            order_id = order_result[0]
+            if delivery_time == "ASAP":
+                delivery_time = datetime.now()
+
+            mycursor.execute("""
+                UPDATE orders
+                SET deliv_date = NOW(), summa = %s, id_type = %s, adress = %s, delivery_time = %s, status = 'Оформлен'
+                WHERE id_orders = %s
+            """, (order_total, delivery_type_id, delivery_address, delivery_time, order_id))
+            mydb.commit()
+            mycursor.execute("DELETE FROM basket WHERE id_orders = %s", (order_id,))
+
+            for product_id, quantity in cart_items.items():
+                product_details = db_utils.get_product_details(product_id)
+                if product_details:
+                    mycursor.execute(
+                        "INSERT INTO basket (id_orders, id_product, quantity, price_to_quan) VALUES (%s, %s, %s, %s)",
+                        (order_id, product_id, quantity, product_details['price'] * quantity)
+                    )
+
+            mydb.commit()
+            mycursor.execute("""
+                INSERT INTO orders (id_user, deliv_date, summa, id_type, adress, delivery_time, status)
+                VALUES (%s, NOW(), 0, NULL, '', NULL, 'Корзина')
+            """, (id_user,))
+            mydb.commit()
+            return order_id
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка обновления заказа: {err}")
+            mydb.rollback()
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+    return None
+
+
+def _execute(sql, params=(), fetch=False):
+    mydb = db_utils.connect_to_db()
+    mycursor = mydb.cursor()
+    try:
+        mycursor.execute(sql, params)
+        rows = mycursor.fetchall() if fetch else None
+        mydb.commit()
+        return rows if fetch else mycursor.lastrowid
+    finally:
+        mycursor.close()
+        mydb.close()
+
+
+def _setup(items):
+    products = _execute("SELECT id_product FROM product WHERE is_deleted = 0 ORDER BY id_product LIMIT %s",
+                        (items,), fetch=True)
+    if len(products) < items:
+        raise SystemExit(f"В базе только {len(products)} товаров, нужно {items}")
+    id_user = _execute("INSERT INTO user (name, phone, tg_user_id) VALUES ('bench', '', %s)", (BENCH_TG_USER_ID,))
+    return id_user, [row[0] for row in products]
+
+
+def _teardown(id_user):
+    # Вместе с заказами пересчитывается daily_sales, иначе оформления бенчмарка попадут в отчёт
+    if db_utils.delete_user_orders([id_user]) is None:
+        raise SystemExit("Не удалось удалить заказы тестового пользователя")
+    _execute("DELETE FROM user WHERE id_user = %s", (id_user,))
+
+
+def _fill_cart(id_user, product_ids):
+    cart_id = db_utils.get_or_create_cart(id_user)
+    for product_id in product_ids:
+        db_utils.add_to_cart(cart_id, product_id, 2)
+    return {product_id: 2 for product_id in product_ids}
+
+
+def _run(name, checkout, id_user, product_ids, rounds):
+    timings = []
+    for _ in range(rounds):
+        cart_items = _fill_cart(id_user, product_ids)
+        started = time.perf_counter()
+        order_id = checkout(id_user, 1, "", "ASAP", 0, cart_items)
+        timings.append((time.perf_counter() - started) * 1000)
+        if order_id is None:
+            raise SystemExit(f"{name}: оформление заказа не удалось")
+
+    timings.sort()
+    p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+    print(f"{name:>14}: медиана {statistics.median(timings):7.2f} мс, "
+          f"p95 {p95:7.2f} мс, среднее {statistics.mean(timings):7.2f} мс")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Задержка оформления заказа: прежняя и транзакционная версии")
+    parser.add_argument("--items", type=int, default=5, help="товаров в корзине")
+    parser.add_argument("--rounds", type=int, default=50, help="оформлений на каждую версию")
+    args = parser.parse_args()
+
+    id_user, product_ids = _setup(args.items)
+    try:
+        print(f"Корзина из {args.items} товаров, {args.rounds} оформлений")
+        _run("прежняя", legacy_update_order, id_user, product_ids, args.rounds)
+        _run("транзакционная", db_utils.update_order, id_user, product_ids, args.rounds)
+    finally:
+        _teardown(id_user)
+        db_utils.pool.close_all()
+
+
+if __name__ == '__main__':
+    main()
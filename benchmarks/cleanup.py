@@ -0,0 +1,30 @@
+# benchmarks/cleanup.py
+# Удаление данных, которые оставляют прогоны бенчмарков: пользователи, их заказы
+# и корзины (daily_sales за затронутые дни пересчитывается), при необходимости - администраторы.
+from db.db_utils import connect_to_db, delete_user_orders
+
+
+def delete_test_users(tg_user_ids, admins=False):
+    """
+    :param admins: удалить и записи admin с этими tg_user_id (их заводит воспроизведение /admin).
+    """
+    if not tg_user_ids:
+        return
+    mydb = connect_to_db()
+    if mydb is None:
+        raise RuntimeError("Нет соединения с БД")
+    mycursor = mydb.cursor()
+    try:
+        ids = tuple(str(tg_user_id) for tg_user_id in tg_user_ids)
+        placeholders = ','.join(['%s'] * len(ids))
+        mycursor.execute(f"SELECT id_user FROM user WHERE tg_user_id IN ({placeholders})", ids)
+        user_ids = [row[0] for row in mycursor.fetchall()]
+        if delete_user_orders(user_ids) is None:
+            raise RuntimeError("Не удалось удалить заказы тестовых пользователей")
+        mycursor.execute(f"DELETE FROM user WHERE tg_user_id IN ({placeholders})", ids)
+        if admins:
+            mycursor.execute(f"DELETE FROM admin WHERE tg_user_id IN ({placeholders})", ids)
+        mydb.commit()
+    finally:
+        mycursor.close()
+        mydb.close()
@@ -0,0 +1,180 @@
+# benchmarks/fake_bot_api.py
+# Локальный фейковый Telegram Bot API для нагрузочных тестов: принимает те же запросы,
+# что и api.telegram.org, сразу отвечает правдоподобными объектами и считает вызовы.
+#
+# Отдельный запуск: python -m benchmarks.fake_bot_api --port 8081
+# Бот направляется на него через AiohttpSession(api=TelegramAPIServer.from_base(url)),
+# а без HTTP вообще - через StubSession, которая отвечает теми же объектами прямо в процессе.
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from collections import Counter
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiohttp import web
+
+BOT_USER = {"id": 1, "is_bot": True, "first_name": "FakeBot", "username": "fake_bot"}
+
+# Методы, которые в ответ возвращают сообщение
+_MESSAGE_METHODS = {
+    "sendmessage", "sendphoto", "senddocument", "editmessagetext", "editmessagecaption",
+    "editmessagemedia", "editmessagereplymarkup", "copymessage", "forwardmessage",
+}
+
+
+class FakeBotAPI:
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        """
+        :param port: 0 - выбрать свободный порт.
+        :param latency: искусственная задержка ответа в секундах (имитация сети).
+        """
+        self.host = host
+        self.port = port
+        self.latency = latency
+        self.calls = Counter()
+        self._message_ids = itertools.count(1)
+        self._file_ids = itertools.count(1)
+        self._runner = None
+
+        self.app = web.Application()
+        self.app.router.add_post("/bot{token}/{method}", self.handle)
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def handle(self, request: web.Request):
+        method = request.match_info["method"]
+        self.calls[method] += 1
+        params = dict(await request.post()) if request.can_read_body else {}
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return web.json_response({"ok": True, "result": self.result(method.lower(), params)})
+
+    def _file(self, prefix):
+        number = next(self._file_ids)
+        return {"file_id": f"{prefix}-{number}", "file_unique_id": f"u{prefix}-{number}"}
+
+    def _message(self, method, params):
+        chat_id = int(params.get("chat_id", 0) or 0)
+        message_id = params.get("message_id")
+        message = {
+            "message_id": int(message_id) if message_id else next(self._message_ids),
+            "date": int(time.time()),
+            "chat": {"id": chat_id, "type": "private"},
+            "from": BOT_USER,
+        }
+        if "text" in params:
+            message["text"] = params["text"]
+        if "caption" in params:
+            message["caption"] = params["caption"]
+        if method == "sendphoto" or (method == "editmessagemedia" and _media_type(params) == "photo"):
+            message["photo"] = [dict(self._file("photo"), width=1280, height=960)]
+        if method == "senddocument":
+            message["document"] = self._file("document")
+        if params.get("reply_markup"):
+            markup = _json(params["reply_markup"])
+            if markup.get("inline_keyboard"):
+                message["reply_markup"] = markup
+        return message
+
+    def result(self, method, params):
+        if method in _MESSAGE_METHODS:
+            return self._message(method, params)
+        if method == "getme":
+            return BOT_USER
+        if method == "getfile":
+            return {"file_id": params.get("file_id"), "file_unique_id": "u" + str(params.get("file_id")),
+                    "file_path": f"files/{params.get('file_id')}"}
+        if method == "getupdates":
+            return []
+        return True
+
+
+def _json(value):
+    """
+    Параметры из HTTP-запроса приходят JSON-строками, из StubSession - словарями.
+    """
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except ValueError:
+            return {}
+    return value or {}
+
+
+def _media_type(params):
+    return _json(params.get("media")).get("type")
+
+
+class StubSession(BaseSession):
+    """
+    Сессия бота без сети: ответы строит FakeBotAPI прямо в процессе.
+    """
+
+    def __init__(self, fake_api=None, **kwargs):
+        super().__init__(**kwargs)
+        self.fake_api = fake_api or FakeBotAPI()
+
+    @property
+    def calls(self):
+        return self.fake_api.calls
+
+    async def make_request(self, bot: Bot, method, timeout=None):
+        api_method = method.__api_method__
+        self.fake_api.calls[api_method] += 1
+        if self.fake_api.latency:
+            await asyncio.sleep(self.fake_api.latency)
+        params = method.model_dump(warnings=False, exclude_none=True)
+        result = self.fake_api.result(api_method.lower(), params)
+        response = self.check_response(
+            bot=bot, method=method, status_code=200, content=json.dumps({"ok": True, "result": result})
+        )
+        return response.result
+
+    async def stream_content(self, url, headers=None, timeout=30, chunk_size=65536, raise_for_status=True):
+        yield b""
+
+    async def close(self):
+        pass
+
+
+async def _serve(host, port, latency):
+    server = FakeBotAPI(host, port, latency)
+    await server.start()
+    print(f"Фейковый Bot API слушает {server.url}")
+    try:
+        while True:
+            await asyncio.sleep(3600)
+    finally:
+        await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Фейковый Telegram Bot API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="задержка ответа, мс")
+    args = parser.parse_args()
+    try:
+        asyncio.run(_serve(args.host, args.port, args.latency / 1000))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+# benchmarks/load_test.py
+# Нагрузочный тест: виртуальные покупатели параллельно проходят сценарий
+# /start -> регистрация -> меню -> категория -> товар в корзину -> корзина -> оформление.
+# Апдейты подаются прямо в Dispatcher из main.py, ответы бота уходят в локальный
+# фейковый Bot API (benchmarks/fake_bot_api.py).
+#
+# Нужна БД с исходной схемой и каталогом (Dump20250616.sql + python -m db.migrate).
+# Запуск из корня проекта:
+#   python -m benchmarks.load_test --users 500
+# Созданные тестом пользователи и их заказы удаляются в конце (если не указан --keep).
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+# Окружение теста задаём до импорта config: FSM в памяти, отдельный кэш file_id
+# (фейковые file_id не должны попасть в настоящий кэш), токен правильного формата.
+os.environ.setdefault("BOT_TOKEN", "123456:load-test")
+os.environ.setdefault("FSM_STORAGE", "memory")
+os.environ["MEDIA_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="load_test_"), "media_cache.json")
+
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
+
+from benchmarks.cleanup import delete_test_users
+from benchmarks.fake_bot_api import FakeBotAPI, BOT_USER
+from config import CATEGORY_VIEW
+from middlewares.metrics import TelegramApiMetricsMiddleware
+
+SCENARIO = (
+    "start", "name", "phone", "menu", "category", "select_product", "quantity",
+    "cart", "checkout", "delivery_type", "delivery_time", "accept",
+)
+
+
+class VirtualUser:
+    def __init__(self, tg_user_id):
+        self.tg_user_id = tg_user_id
+        self.message_ids = itertools.count(1)
+
+    def _user(self):
+        return {"id": self.tg_user_id, "is_bot": False, "first_name": f"Load{self.tg_user_id}"}
+
+    def message(self, update_id, text):
+        return {
+            "update_id": update_id,
+            "message": {
+                "message_id": next(self.message_ids),
+                "date": int(time.time()),
+                "chat": {"id": self.tg_user_id, "type": "private"},
+                "from": self._user(),
+                "text": text,
+            },
+        }
+
+    def callback(self, update_id, data, message_id=1):
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": f"{self.tg_user_id}-{update_id}",
+                "from": self._user(),
+                "chat_instance": str(self.tg_user_id),
+                "data": data,
+                "message": {
+                    "message_id": message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": self.tg_user_id, "type": "private"},
+                    "from": BOT_USER,
+                    "text": "...",
+                },
+            },
+        }
+
+
+class LoadTest:
+    def __init__(self, users, base_id, think_time):
+        self.users = users
+        self.base_id = base_id
+        self.think_time = think_time
+        self.latencies = defaultdict(list)  # шаг сценария -> [секунды]
+        self.errors = defaultdict(int)
+        self.update_ids = itertools.count(1)
+
+    async def feed(self, step, update):
+        from main import bot, dp
+
+        started = time.perf_counter()
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception:
+            self.errors[step] += 1
+        finally:
+            self.latencies[step].append(time.perf_counter() - started)
+        if self.think_time:
+            await asyncio.sleep(self.think_time)
+
+    async def run_user(self, index, category, product):
+        user = VirtualUser(self.base_id + index)
+        if CATEGORY_VIEW == "carousel":
+            select_data = f"order_{product['id_product']}_{category['id_category']}_0"
+        else:
+            select_data = f"order_{product['id_product']}"
+
+        steps = {
+            "start": lambda: user.message(next(self.update_ids), "/start"),
+            "name": lambda: user.message(next(self.update_ids), f"Покупатель {index}"),
+            "phone": lambda: user.message(next(self.update_ids), f"+79{index:09d}"),
+            "menu": lambda: user.message(next(self.update_ids), "Просмотр меню"),
+            "category": lambda: user.message(next(self.update_ids), category['name_cat']),
+            "select_product": lambda: user.callback(next(self.update_ids), select_data),
+            "quantity": lambda: user.message(next(self.update_ids), "2"),
+            "cart": lambda: user.message(next(self.update_ids), "Корзина"),
+            "checkout": lambda: user.callback(next(self.update_ids), f"process_order_{user.tg_user_id}"),
+            "delivery_type": lambda: user.callback(next(self.update_ids), "delivery_type_1"),
+            "delivery_time": lambda: user.callback(next(self.update_ids), "delivery_time_ASAP"),
+            "accept": lambda: user.callback(next(self.update_ids), "accept_data_processing"),
+        }
+        for step in SCENARIO:
+            await self.feed(step, steps[step]())
+
+    async def run(self):
+        from db.catalog import get_catalog
+
+        catalog = await get_catalog()
+        if catalog is None:
+            raise SystemExit("Не удалось загрузить каталог из БД")
+        category, product = None, None
+        for id_category, name in catalog.categories:
+            products = catalog.get_products_by_category(id_category)
+            if products:
+                category, product = catalog.get_category_by_name(name), products[0]
+                break
+        if product is None:
+            raise SystemExit("В каталоге нет товаров")
+
+        started = time.perf_counter()
+        await asyncio.gather(*(self.run_user(index, category, product) for index in range(self.users)))
+        return time.perf_counter() - started
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def _report(test, elapsed, api_calls, db_queries):
+    total_updates = sum(len(values) for values in test.latencies.values())
+    all_latencies = [value for values in test.latencies.values() for value in values]
+
+    print(f"\nПользователей: {test.users}, апдейтов: {total_updates}, время: {elapsed:.2f} с")
+    print(f"Пропускная способность: {total_updates / elapsed:.1f} апдейтов/с")
+    print(f"Запросов к БД на апдейт: {db_queries / total_updates:.2f}")
+    print(f"Вызовов Bot API на апдейт: {sum(api_calls.values()) / total_updates:.2f}")
+    print(f"\n{'шаг':<16}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'ошибок':>8}")
+    for step in SCENARIO + ("всего",):
+        values = all_latencies if step == "всего" else test.latencies[step]
+        errors = sum(test.errors.values()) if step == "всего" else test.errors[step]
+        print(f"{step:<16}{statistics.median(values) * 1000:>10.1f}{_percentile(values, 95) * 1000:>10.1f}"
+              f"{_percentile(values, 99) * 1000:>10.1f}{errors:>8}")
+    print("\nВызовы Bot API:", ", ".join(f"{method} {count}" for method, count in api_calls.most_common()))
+
+
+def _cleanup(base_id, users):
+    delete_test_users([str(base_id + index) for index in range(users)])
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота на фейковом Bot API")
+    parser.add_argument("--users", type=int, default=500, help="виртуальных покупателей одновременно")
+    parser.add_argument("--base-id", type=int, default=7_000_000_000, help="первый tg_user_id тестовых покупателей")
+    parser.add_argument("--think-time", type=float, default=0.0, help="пауза покупателя между шагами, с")
+    parser.add_argument("--api-latency", type=float, default=0.0, help="задержка фейкового Bot API, мс")
+    parser.add_argument("--keep", action="store_true", help="не удалять тестовых пользователей и заказы")
+    args = parser.parse_args()
+
+    from main import bot, dp
+    from db.db_utils import pool
+
+    server = FakeBotAPI(latency=args.api_latency / 1000)
+    await server.start()
+    bot.session = AiohttpSession(api=TelegramAPIServer.from_base(server.url))
+    # Middleware сессии привязаны к объекту сессии, поэтому метрики Telegram API подключаем заново
+    bot.session.middleware(TelegramApiMetricsMiddleware())
+
+    test = LoadTest(args.users, args.base_id, args.think_time)
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        queries_before = pool.stats()["queries"]
+        elapsed = await test.run()
+        _report(test, elapsed, server.calls, pool.stats()["queries"] - queries_before)
+    finally:
+        if not args.keep:
+            _cleanup(args.base_id, args.users)
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await bot.session.close()
+        await server.stop()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,166 @@
+# benchmarks/replay.py
+# Воспроизведение записанных апдейтов (RECORD_UPDATES_PATH, middlewares/recorder.py)
+# через Dispatcher из main.py с заглушкой вместо Bot API (StubSession).
+#
+# Апдейты одного чата обрабатываются строго по порядку, как при обычной работе бота.
+# Воспроизведение пишет в БД из config.py (регистрации, корзины, заказы, daily_sales),
+# поэтому запускайте его на отдельной копии БД (DB_NAME=...). Чтобы прогоны были
+# повторяемы, перед прогоном и после него удаляются записанные пользователи (псевдонимы
+# из файла) со всеми заказами и записями admin - каждый прогон начинается с одного состояния.
+# Запуск из корня проекта:
+#   python -m benchmarks.replay updates.jsonl --speed 1     # в реальном темпе
+#   python -m benchmarks.replay updates.jsonl --speed 10    # в 10 раз быстрее
+#   python -m benchmarks.replay updates.jsonl --speed max   # без пауз
+#   ... --keep                                              # не удалять данные после прогона
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+
+# См. benchmarks/load_test.py: FSM в памяти и отдельный кэш file_id
+os.environ.setdefault("BOT_TOKEN", "123456:replay")
+os.environ.setdefault("FSM_STORAGE", "memory")
+os.environ["MEDIA_CACHE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="replay_"), "media_cache.json")
+
+from aiogram.types import Update
+
+from benchmarks.cleanup import delete_test_users
+from benchmarks.fake_bot_api import StubSession
+from middlewares.metrics import TelegramApiMetricsMiddleware
+from supervisor import shard_key
+
+
+def load_updates(path):
+    """
+    Читает запись: [(секунды от начала, апдейт), ...]. Если файл дописывался
+    несколькими запусками бота, отсчёт времени каждого следующего продолжает предыдущий.
+    """
+    updates = []
+    base, previous = 0.0, 0.0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if item["t"] < previous:
+                base += previous
+            previous = item["t"]
+            updates.append((base + item["t"], item["update"]))
+    return updates
+
+
+def recorded_users(updates):
+    """
+    id пользователей (псевдонимы), от которых в записи есть апдейты.
+    """
+    users = set()
+    for _, raw_update in updates:
+        for key, event in raw_update.items():
+            if key != "update_id" and isinstance(event, dict):
+                user = event.get("from") or {}
+                if isinstance(user.get("id"), int) and not user.get("is_bot"):
+                    users.add(user["id"])
+    return users
+
+
+def _event_type(raw_update):
+    return next((key for key in raw_update if key != "update_id"), "unknown")
+
+
+def _percentile(values, percent):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+async def replay(updates, speed):
+    """
+    :param speed: во сколько раз быстрее записи; None - без пауз.
+    """
+    from main import bot, dp
+    from db.db_utils import pool
+
+    bot.session = StubSession()
+    # Middleware сессии привязаны к объекту сессии, поэтому метрики Telegram API подключаем заново
+    bot.session.middleware(TelegramApiMetricsMiddleware())
+    latencies = defaultdict(list)  # тип апдейта -> [секунды]
+    errors = defaultdict(int)
+    lags = []  # насколько апдейт подан позже запланированного
+    chat_locks = defaultdict(asyncio.Lock)
+    tasks = []
+
+    async def process(key, event_type, raw_update):
+        async with chat_locks[key]:
+            started = time.perf_counter()
+            try:
+                await dp.feed_raw_update(bot, raw_update)
+            except Exception:
+                errors[event_type] += 1
+            finally:
+                latencies[event_type].append(time.perf_counter() - started)
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        queries_before = pool.stats()["queries"]
+        started = time.perf_counter()
+        for offset, raw_update in updates:
+            if speed:
+                delay = offset / speed - (time.perf_counter() - started)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                lags.append(max(0.0, -delay))
+            key = shard_key(Update.model_validate(raw_update))
+            tasks.append(asyncio.create_task(process(key, _event_type(raw_update), raw_update)))
+        await asyncio.gather(*tasks)
+        elapsed = time.perf_counter() - started
+        queries = pool.stats()["queries"] - queries_before
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+
+    return elapsed, latencies, errors, lags, queries, bot.session.calls
+
+
+def _report(speed, elapsed, latencies, errors, lags, queries, api_calls):
+    all_latencies = [value for values in latencies.values() for value in values]
+    total = len(all_latencies)
+    print(f"\nСкорость: {'max' if not speed else f'{speed:g}x'}, апдейтов: {total}, время: {elapsed:.2f} с")
+    print(f"Пропускная способность: {total / elapsed:.1f} апдейтов/с")
+    print(f"Запросов к БД на апдейт: {queries / total:.2f}")
+    print(f"Вызовов Bot API на апдейт: {sum(api_calls.values()) / total:.2f}")
+    if lags:
+        print(f"Отставание от записи: p50 {statistics.median(lags) * 1000:.1f} мс, "
+              f"макс. {max(lags) * 1000:.1f} мс")
+    print(f"\n{'тип апдейта':<20}{'кол-во':>8}{'p50, мс':>10}{'p95, мс':>10}{'p99, мс':>10}{'ошибок':>8}")
+    for event_type, values in sorted(latencies.items()) + [("всего", all_latencies)]:
+        failed = sum(errors.values()) if event_type == "всего" else errors[event_type]
+        print(f"{event_type:<20}{len(values):>8}{statistics.median(values) * 1000:>10.1f}"
+              f"{_percentile(values, 95) * 1000:>10.1f}{_percentile(values, 99) * 1000:>10.1f}{failed:>8}")
+    print("\nВызовы Bot API:", ", ".join(f"{method} {count}" for method, count in api_calls.most_common()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Воспроизведение записанных апдейтов")
+    parser.add_argument("path", help="JSONL-файл с записанными апдейтами")
+    parser.add_argument("--speed", default="max", help="1, 10, ... или max")
+    parser.add_argument("--keep", action="store_true", help="не удалять данные записанных пользователей после прогона")
+    args = parser.parse_args()
+
+    speed = None if args.speed == "max" else float(args.speed)
+    updates = load_updates(args.path)
+    if not updates:
+        raise SystemExit("В файле нет апдейтов")
+    users = recorded_users(updates)
+    # Следы предыдущего прогона изменили бы пути обработки (уже зарегистрирован, корзина оформлена)
+    delete_test_users(users, admins=True)
+    try:
+        _report(speed, *asyncio.run(replay(updates, speed)))
+    finally:
+        if not args.keep:
+            delete_test_users(users, admins=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -12,3 +12,94 @@ DB_NAME = os.environ.get("DB_NAME")
 ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD")
 ADMIN_USER_ID = os.environ.get("ADMIN_USER_ID")
 
+
+# Пул соединений с БД
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 10))
+DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 5))  # сек. ожидания свободного соединения
+DB_POOL_RECYCLE = float(os.environ.get("DB_POOL_RECYCLE", 3600))  # сек. жизни соединения
+DB_POOL_PRE_PING = float(os.environ.get("DB_POOL_PRE_PING", 30))  # сек. простоя, после которых соединение пингуется
+
+# Количество потоков, в которых выполняются запросы к БД (не блокируют event loop)
+DB_EXECUTOR_WORKERS = int(os.environ.get("DB_EXECUTOR_WORKERS", DB_POOL_SIZE))
+
+# Файл, в котором хранятся file_id уже загруженных в Telegram фото и документов
+MEDIA_CACHE_PATH = os.environ.get("MEDIA_CACHE_PATH", "resources/media_cache.json")
+
+# Сколько секунд каталог (категории, товары, доставка) живёт в памяти без перезагрузки из БД
+CATALOG_TTL = float(os.environ.get("CATALOG_TTL", 300))
+
+# Хранилище FSM: memory, sqlite://<путь> или redis://<адрес>
+FSM_STORAGE = os.environ.get("FSM_STORAGE", "sqlite://fsm_storage.sqlite3")
+# Время жизни состояния и данных FSM в секундах (0 - бессрочно)
+FSM_STATE_TTL = float(os.environ.get("FSM_STATE_TTL", 86400)) or None
+FSM_DATA_TTL = float(os.environ.get("FSM_DATA_TTL", 86400)) or None
+
+# Режим получения апдейтов: polling или webhook
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+# Сколько апдейтов обрабатывается одновременно
+UPDATES_CONCURRENCY = int(os.environ.get("UPDATES_CONCURRENCY", 100))
+
+# Настройки webhook-режима
+WEBHOOK_BASE_URL = os.environ.get("WEBHOOK_BASE_URL")  # публичный адрес, например https://bot.example.com
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "/webhook")
+WEBHOOK_SECRET = os.environ.get("WEBHOOK_SECRET")
+WEBHOOK_HOST = os.environ.get("WEBHOOK_HOST", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("WEBHOOK_PORT", 8080))
+# Сколько одновременных соединений Telegram откроет к webhook'у (1-100)
+WEBHOOK_MAX_CONNECTIONS = int(os.environ.get("WEBHOOK_MAX_CONNECTIONS", 40))
+
+# Количество рабочих процессов при запуске через supervisor.py
+BOT_WORKERS = int(os.environ.get("BOT_WORKERS", os.cpu_count() or 1))
+# Как часто (сек.) supervisor пишет в лог метрики рабочих процессов
+WORKER_METRICS_INTERVAL = float(os.environ.get("WORKER_METRICS_INTERVAL", 60))
+
+# Сколько секунд кэшируется признак "пользователь - администратор" и сколько записей максимум
+ADMIN_CACHE_TTL = float(os.environ.get("ADMIN_CACHE_TTL", 60))
+ADMIN_CACHE_SIZE = int(os.environ.get("ADMIN_CACHE_SIZE", 10000))
+# Потоки для bcrypt (хэширование и проверка паролей)
+BCRYPT_WORKERS = int(os.environ.get("BCRYPT_WORKERS", 2))
+# Не больше ADMIN_LOGIN_MAX_ATTEMPTS неверных паролей за ADMIN_LOGIN_WINDOW секунд
+ADMIN_LOGIN_MAX_ATTEMPTS = int(os.environ.get("ADMIN_LOGIN_MAX_ATTEMPTS", 5))
+ADMIN_LOGIN_WINDOW = float(os.environ.get("ADMIN_LOGIN_WINDOW", 300))
+
+# Кэш пользователей: сколько секунд хранить найденного и ненайденного пользователя и сколько записей максимум
+USER_CACHE_TTL = float(os.environ.get("USER_CACHE_TTL", 300))
+USER_NEGATIVE_CACHE_TTL = float(os.environ.get("USER_NEGATIVE_CACHE_TTL", 5))
+USER_CACHE_SIZE = int(os.environ.get("USER_CACHE_SIZE", 10000))
+
+# Сколько секунд помнить id открытой корзины пользователя (сбрасывается при оформлении заказа)
+CART_CACHE_TTL = float(os.environ.get("CART_CACHE_TTL", 60))
+
+# Применять миграции схемы БД (db/migrations) при запуске бота: 1 - да, 0 - нет.
+# По умолчанию выключено: миграции меняют данные, поэтому при выкладке их применяют
+# отдельным шагом после резервной копии: python -m db.migrate --status, затем python -m db.migrate
+AUTO_MIGRATE = os.environ.get("AUTO_MIGRATE", "0") == "1"
+
+# Как показывать товары категории: carousel - одно сообщение с листанием, list - сообщение на каждый товар
+CATEGORY_VIEW = os.environ.get("CATEGORY_VIEW", "carousel")
+
+# Обработка фото товаров: папка, максимальная сторона фото в пикселях, качество JPEG, число процессов
+IMAGES_DIR = os.environ.get("IMAGES_DIR", "resources/images")
+IMAGE_MAX_SIDE = int(os.environ.get("IMAGE_MAX_SIDE", 1280))
+IMAGE_QUALITY = int(os.environ.get("IMAGE_QUALITY", 82))
+IMAGE_WORKERS = int(os.environ.get("IMAGE_WORKERS", 2))
+
+# Запись входящих апдейтов для воспроизведения (benchmarks/replay.py): путь к JSONL (пусто - не записывать)
+# и соль, с которой обезличиваются id пользователей и чатов
+RECORD_UPDATES_PATH = os.environ.get("RECORD_UPDATES_PATH", "")
+RECORD_UPDATES_SALT = os.environ.get("RECORD_UPDATES_SALT", "")
+
+# Метрики: порт HTTP-сервера с /metrics (0 - не запускать) и порог медленного вызова db_utils в мс
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 0))
+DB_SLOW_QUERY_MS = float(os.environ.get("DB_SLOW_QUERY_MS", 200))
+
+# Профилировщик (/profiler): интервал семплирования в мс и максимальная длительность сеанса в секундах
+PROFILER_INTERVAL_MS = float(os.environ.get("PROFILER_INTERVAL_MS", 5))
+PROFILER_MAX_SECONDS = int(os.environ.get("PROFILER_MAX_SECONDS", 120))
+
+# Выгрузка заказов (/export, python -m db.export): строк в одной пачке чтения из БД
+EXPORT_BATCH_SIZE = int(os.environ.get("EXPORT_BATCH_SIZE", 5000))
+
+# Inline-поиск: сколько секунд Telegram кэширует ответ на одинаковый запрос
+INLINE_CACHE_TIME = int(os.environ.get("INLINE_CACHE_TIME", 300))
@@ -0,0 +1,73 @@
+# db/async_db_utils.py
+# Асинхронные обёртки над db_utils: те же имена функций, но каждый вызов
+# выполняется в отдельном пуле потоков и не блокирует event loop aiogram.
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from config import DB_EXECUTOR_WORKERS
+from db import db_utils
+from utils.timing import add_db_time
+
+_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+
+async def run_in_db_executor(func, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    try:
+        return await loop.run_in_executor(_executor, functools.partial(func, *args, **kwargs))
+    finally:
+        # Время ожидания с точки зрения апдейта, включая очередь пула потоков
+        add_db_time(time.perf_counter() - started)
+
+
+def _to_async(func):
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return await run_in_db_executor(func, *args, **kwargs)
+
+    return wrapper
+
+
+def shutdown_executor():
+    _executor.shutdown(wait=True)
+    db_utils.pool.close_all()
+
+
+register_user = _to_async(db_utils.register_user)
+get_user = _to_async(db_utils.get_user)
+get_menu_categories = _to_async(db_utils.get_menu_categories)
+get_catalog_snapshot = _to_async(db_utils.get_catalog_snapshot)
+get_products_by_category = _to_async(db_utils.get_products_by_category)
+cancel_order_by_id = _to_async(db_utils.cancel_order_by_id)
+get_order_history = _to_async(db_utils.get_order_history)
+get_order_history_with_items = _to_async(db_utils.get_order_history_with_items)
+get_category_by_name = _to_async(db_utils.get_category_by_name)
+get_order_items = _to_async(db_utils.get_order_items)
+get_order_status = _to_async(db_utils.get_order_status)
+get_delivery_price = _to_async(db_utils.get_delivery_price)
+update_order = _to_async(db_utils.update_order)
+delete_product = _to_async(db_utils.delete_product)
+add_product = _to_async(db_utils.add_product)
+get_todays_orders = _to_async(db_utils.get_todays_orders)
+get_todays_orders_page = _to_async(db_utils.get_todays_orders_page)
+update_order_status = _to_async(db_utils.update_order_status)
+get_admin_by_tg_id = _to_async(db_utils.get_admin_by_tg_id)
+register_admin = _to_async(db_utils.register_admin)
+get_admin_password_hash = _to_async(db_utils.get_admin_password_hash)
+get_delivery_types = _to_async(db_utils.get_delivery_types)
+get_delivery_type_by_id = _to_async(db_utils.get_delivery_type_by_id)
+get_or_create_cart = _to_async(db_utils.get_or_create_cart)
+add_to_cart = _to_async(db_utils.add_to_cart)
+get_cart_items = _to_async(db_utils.get_cart_items)
+get_orders_today = _to_async(db_utils.get_orders_today)
+update_cart_item_quantity = _to_async(db_utils.update_cart_item_quantity)
+remove_item_from_cart = _to_async(db_utils.remove_item_from_cart)
+has_any_admins = _to_async(db_utils.has_any_admins)
+get_product_details = _to_async(db_utils.get_product_details)
+get_products_by_category_as_menu = _to_async(db_utils.get_products_by_category_as_menu)
+get_product_id_by_name = _to_async(db_utils.get_product_id_by_name)
+get_admins = _to_async(db_utils.get_admins)
+get_daily_sales = _to_async(db_utils.get_daily_sales)
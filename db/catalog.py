@@ -0,0 +1,94 @@
+# db/catalog.py
+# Кэш каталога в памяти процесса: категории, товары и типы доставки меняются
+# редко, а читаются почти на каждое нажатие кнопки.
+import asyncio
+import logging
+import time
+
+from config import CATALOG_TTL
+from db.async_db_utils import get_catalog_snapshot
+from utils import invalidation
+
+
+class Catalog:
+    def __init__(self, version, categories, products, delivery_types):
+        self.version = version
+        self.categories = categories  # [(id_category, name_cat), ...] как в get_menu_categories
+        self.category_by_name = {name: {'id_category': id_category, 'name_cat': name}
+                                 for id_category, name in categories}
+        self.products_by_id = {product['id_product']: product for product in products}
+        self.products_by_category = {}
+        for product in products:
+            self.products_by_category.setdefault(product['id_category'], []).append(product)
+        self.delivery_types = delivery_types
+        self.delivery_price_by_id = {dt['id_type']: dt['price_dost'] for dt in delivery_types}
+        self._memo = {}
+
+    def get_category_by_name(self, category_name):
+        return self.category_by_name.get(category_name)
+
+    def get_products_by_category(self, category_id):
+        return self.products_by_category.get(int(category_id), [])
+
+    def get_delivery_price(self, delivery_type_id):
+        return self.delivery_price_by_id.get(int(delivery_type_id))
+
+    def memoize(self, key, build):
+        """
+        Кэширует результат build() (например, клавиатуру) на время жизни этой версии каталога.
+        """
+        if key not in self._memo:
+            self._memo[key] = build()
+        return self._memo[key]
+
+
+_catalog = None
+_loaded_at = 0.0
+_stale = True
+_version = 0
+_lock = asyncio.Lock()
+
+
+def _mark_stale(_=None):
+    global _stale
+    _stale = True
+
+
+invalidation.register("catalog", _mark_stale)
+
+
+def invalidate():
+    """
+    Помечает каталог устаревшим во всех процессах - следующий get_catalog() перечитает его из БД.
+    Вызывается после добавления и удаления товаров.
+    """
+    invalidation.publish("catalog")
+
+
+def _is_fresh():
+    return _catalog is not None and not _stale and time.monotonic() - _loaded_at < CATALOG_TTL
+
+
+async def get_catalog() -> Catalog | None:
+    global _catalog, _loaded_at, _stale, _version
+    if _is_fresh():
+        return _catalog
+
+    async with _lock:
+        if _is_fresh():
+            return _catalog
+
+        _stale = False
+        snapshot = await get_catalog_snapshot()
+        if snapshot is None:
+            # Лучше показать чуть устаревшее меню, чем не показать ничего
+            logging.error("Не удалось обновить каталог, используется предыдущая версия.")
+            _stale = True
+            return _catalog
+
+        _version += 1
+        _catalog = Catalog(_version, **snapshot)
+        _loaded_at = time.monotonic()
+        logging.info(f"Каталог загружен (версия {_version}).")
+
+    return _catalog
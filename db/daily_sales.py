@@ -0,0 +1,26 @@
+# db/daily_sales.py
+# Разовое заполнение агрегатов daily_sales по истории заказов (после миграции 0004
+# или для исправления расхождений). Дальше агрегаты обновляются вместе с заказами в db_utils.
+#
+# Запуск из корня проекта:
+#   python -m db.daily_sales                    # пересчитать всё
+#   python -m db.daily_sales --since 2025-06-01 # пересчитать начиная с дня
+import argparse
+from datetime import date
+
+from db.db_utils import rebuild_daily_sales
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Пересчёт агрегатов продаж daily_sales")
+    parser.add_argument("--since", type=date.fromisoformat, help="пересчитать начиная с дня (ГГГГ-ММ-ДД)")
+    args = parser.parse_args()
+
+    rows = rebuild_daily_sales(args.since)
+    if rows is None:
+        raise SystemExit("Не удалось пересчитать агрегаты, подробности в логе")
+    print(f"Записано строк агрегатов: {rows}")
+
+
+if __name__ == '__main__':
+    main()
@@ -1,34 +1,91 @@
 import logging
 from datetime import datetime
 
-import bcrypt
 import mysql.connector
+from mysql.connector import errorcode
 
-from config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME
+from config import DB_HOST, DB_USER, DB_PASSWORD, DB_NAME, DB_POOL_SIZE, DB_POOL_TIMEOUT, DB_POOL_RECYCLE, \
+    DB_POOL_PRE_PING
+from db.instrumentation import instrumented
+from db.pool import ConnectionPool
+from utils.metrics import REGISTRY
 
 logging.basicConfig(level=logging.INFO)
 
+pool = ConnectionPool(
+    size=DB_POOL_SIZE,
+    timeout=DB_POOL_TIMEOUT,
+    recycle=DB_POOL_RECYCLE,
+    pre_ping=DB_POOL_PRE_PING,
+    host=DB_HOST,
+    user=DB_USER,
+    password=DB_PASSWORD,
+    database=DB_NAME,
+    # Соединения переиспользуются, поэтому недочитанные результаты нужно дочитывать автоматически
+    consume_results=True
+)
+
+
+REGISTRY.gauge("db_pool_in_use", "Соединения пула, выданные потокам").set_function(lambda: pool.stats()["in_use"])
+REGISTRY.gauge("db_pool_idle", "Свободные соединения пула").set_function(lambda: pool.stats()["idle"])
+
 
 def connect_to_db():
+    """
+    Берёт соединение из пула. mydb.close() возвращает его обратно в пул.
+
+    :return: соединение или None, если подключиться не удалось.
+    """
     try:
-        mydb = mysql.connector.connect(
-            host=DB_HOST,
-            user=DB_USER,
-            password=DB_PASSWORD,
-            database=DB_NAME
-        )
-        return mydb
+        return pool.acquire()
     except mysql.connector.Error as err:
         logging.error(f"Ошибка подключения к базе данных: {err}")
         return None
 
 
+class DBError(Exception):
+    """
+    Запрос не выполнен из-за ошибки БД. Бросается там, где None уже означает "не найдено",
+    чтобы временный сбой не приняли за отсутствие записи.
+    """
+
+
+def get_pool_stats():
+    return pool.stats()
+
+
+# Заказы в этих статусах не входят в daily_sales (сравнение без учёта регистра, как в БД)
+SALES_EXCLUDED_STATUSES = ("корзина", "отменен")
+
+
+def _counts_in_sales(status):
+    return status is not None and status.lower() not in SALES_EXCLUDED_STATUSES
+
+
+def _apply_daily_sales(cursor, order_id, sign):
+    """
+    Добавляет (sign=1) или вычитает (sign=-1) позиции заказа в daily_sales.
+    Вызывается внутри транзакции, которая меняет заказ.
+    """
+    cursor.execute("""
+        INSERT INTO daily_sales (sale_date, id_product, id_type, orders_count, quantity, revenue)
+        SELECT DATE(o.deliv_date), b.id_product, COALESCE(o.id_type, 0), %s, %s * b.quantity, %s * b.price_to_quan
+        FROM orders o
+        JOIN basket b ON b.id_orders = o.id_orders
+        WHERE o.id_orders = %s
+        ON DUPLICATE KEY UPDATE orders_count = orders_count + VALUES(orders_count),
+                                quantity = quantity + VALUES(quantity),
+                                revenue = revenue + VALUES(revenue)
+    """, (sign, sign, sign, order_id))
+
+
+@instrumented
 def register_user(name, phone, tg_user_id):
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor()
         sql = "INSERT INTO user (name, phone, tg_user_id) VALUES (%s, %s, %s)"
-        val = (name, phone, tg_user_id)
+        val = (name, phone, str(tg_user_id))
         try:
             mycursor.execute(sql, val)
             mydb.commit()
@@ -44,25 +101,32 @@ def register_user(name, phone, tg_user_id):
     return False
 
 
+@instrumented
 def get_user(tg_user_id):
+    """
+    :return: строка user или None, если пользователя нет.
+    :raises DBError: при ошибке БД.
+    """
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor(dictionary=True)
         sql = "SELECT * FROM user WHERE tg_user_id = %s"
-        val = (tg_user_id,)
+        # tg_user_id в БД - char(25): число заставило бы MySQL сравнивать как числа, мимо индекса
+        val = (str(tg_user_id),)
         try:
             mycursor.execute(sql, val)
             result = mycursor.fetchone()
             return result
         except mysql.connector.Error as err:
             logging.error(f"Ошибка получения пользователя: {err}")
-            return None
+            raise DBError(err) from err
         finally:
             mycursor.close()
             mydb.close()
-    return None
+    raise DBError("Нет соединения с БД")
 
 
+@instrumented
 def get_menu_categories():
     mydb = connect_to_db()
     if mydb:
@@ -81,6 +145,36 @@ def get_menu_categories():
     return None
 
 
+
+@instrumented
+def get_catalog_snapshot():
+    """
+    Загружает весь каталог (категории, товары, типы доставки) через одно соединение.
+
+    :return: словарь с ключами categories, products, delivery_types или None при ошибке.
+    """
+    mydb = connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor(dictionary=True)
+        try:
+            mycursor.execute("SELECT id_category, name_cat FROM category")
+            categories = [(row['id_category'], row['name_cat']) for row in mycursor.fetchall()]
+            mycursor.execute(
+                "SELECT id_product, id_category, name, descript, price, photo FROM product WHERE is_deleted = 0"
+            )
+            products = mycursor.fetchall()
+            mycursor.execute("SELECT id_type, name, price_dost FROM delivtype")
+            delivery_types = mycursor.fetchall()
+            return {'categories': categories, 'products': products, 'delivery_types': delivery_types}
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка загрузки каталога: {err}")
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+    return None
+
+@instrumented
 def get_products_by_category(category_id):
     mydb = connect_to_db()
     if mydb:
@@ -99,6 +193,7 @@ def get_products_by_category(category_id):
             mydb.close()
     return None
 
+@instrumented
 def cancel_order_by_id(order_id):
     mydb = connect_to_db()
     if mydb:
@@ -110,17 +205,24 @@ def cancel_order_by_id(order_id):
         """
         val = (order_id,)
         try:
+            mydb.start_transaction()
+            mycursor.execute("SELECT status FROM orders WHERE id_orders = %s FOR UPDATE", val)
+            row = mycursor.fetchone()
             mycursor.execute(sql, val)
+            if row and _counts_in_sales(row[0]):
+                _apply_daily_sales(mycursor, order_id, -1)
             mydb.commit()
             print(f"Заказ {order_id} успешно отменен")
         except mysql.connector.Error as err:
             logging.error(f"Ошибка при отмене заказа: {err}")
+            mydb.rollback()
             return None
         finally:
             mycursor.close()
             mydb.close()
     return None
 
+@instrumented
 def get_order_history(tg_user_id):
     mydb = connect_to_db()
     if mydb:
@@ -147,7 +249,7 @@ def get_order_history(tg_user_id):
                 o.deliv_date DESC
             LIMIT 10;
         """
-        val = (tg_user_id,)
+        val = (str(tg_user_id),)
         try:
             mycursor.execute(sql, val)
             orders = mycursor.fetchall()
@@ -161,6 +263,88 @@ def get_order_history(tg_user_id):
     return None
 
 
+
+@instrumented
+def get_order_history_with_items(tg_user_id):
+    """
+    История заказов пользователя вместе с составом каждого заказа одним запросом.
+
+    :return: список заказов (как в get_order_history), у каждого ключ 'items' -
+             список позиций с id_product, name, quantity, price_to_quan.
+    """
+    mydb = connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor(dictionary=True)
+        sql = """
+            SELECT
+                o.id_orders,
+                o.deliv_date,
+                o.summa,
+                o.name,
+                o.delivery_time,
+                o.status,
+                o.phone,
+                b.id_product,
+                b.quantity,
+                b.price_to_quan,
+                p.name AS product_name
+            FROM (
+                SELECT
+                    o.id_orders,
+                    o.deliv_date,
+                    o.summa,
+                    dt.name,
+                    o.delivery_time,
+                    o.status,
+                    u.phone
+                FROM
+                    orders o
+                JOIN
+                    user u ON o.id_user = u.id_user
+                JOIN
+                    delivtype dt ON o.id_type = dt.id_type
+                WHERE
+                    u.tg_user_id = %s
+                    AND o.deliv_date >= CURDATE() - INTERVAL 2 DAY
+                ORDER BY
+                    o.deliv_date DESC
+                LIMIT 10
+            ) o
+            LEFT JOIN
+                basket b ON b.id_orders = o.id_orders
+            LEFT JOIN
+                product p ON b.id_product = p.id_product
+            ORDER BY
+                o.deliv_date DESC, o.id_orders, b.id_basket;
+        """
+        val = (str(tg_user_id),)
+        try:
+            mycursor.execute(sql, val)
+            orders = {}
+            for row in mycursor.fetchall():
+                order = orders.get(row['id_orders'])
+                if order is None:
+                    order = {key: row[key] for key in
+                             ('id_orders', 'deliv_date', 'summa', 'name', 'delivery_time', 'status', 'phone')}
+                    order['items'] = []
+                    orders[row['id_orders']] = order
+                if row['id_product'] is not None:
+                    order['items'].append({
+                        'id_product': row['id_product'],
+                        'name': row['product_name'],
+                        'quantity': row['quantity'],
+                        'price_to_quan': row['price_to_quan'],
+                    })
+            return list(orders.values())
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка получения истории заказов: {err}")
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+    return None
+
+@instrumented
 def get_category_by_name(category_name):
     mydb = connect_to_db()
     if mydb:
@@ -180,6 +364,7 @@ def get_category_by_name(category_name):
     return None
 
 
+@instrumented
 def get_order_items(order_id):
     mydb = connect_to_db()
     if mydb:
@@ -211,6 +396,7 @@ def get_order_items(order_id):
     return None
 
 
+@instrumented
 def get_order_status(tg_user_id):
     mydb = connect_to_db()
     if mydb:
@@ -223,7 +409,7 @@ def get_order_status(tg_user_id):
             ORDER BY deliv_date DESC
             LIMIT 1;
         """
-        val = (tg_user_id,)
+        val = (str(tg_user_id),)
         try:
             mycursor.execute(sql, val)
             result = mycursor.fetchone()
@@ -240,6 +426,7 @@ def get_order_status(tg_user_id):
     return None
 
 
+@instrumented
 def get_delivery_price(delivery_type_id):
     mydb = connect_to_db()
     if mydb:
@@ -263,35 +450,42 @@ def get_delivery_price(delivery_type_id):
 
 
 # TODO implement delivery_time
-def update_order(tg_user_id, delivery_type_id, delivery_address, delivery_time, order_total, cart_items):
+@instrumented
+def update_order(id_user, delivery_type_id, delivery_address, delivery_time, order_total, cart_items):
+    """
+    Оформляет открытую корзину пользователя одной транзакцией: заказ, его позиции
+    и новая пустая корзина либо записываются вместе, либо не записывается ничего.
+
+    :param cart_items: словарь id_product -> количество.
+    :return: id оформленного заказа или None.
+    """
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor()
-        sql_get_user_id = "SELECT id_user FROM user WHERE tg_user_id = %s"
         try:
-            mycursor.execute(sql_get_user_id, (tg_user_id,))
-            user_id_result = mycursor.fetchone()
-            if not user_id_result:
-                logging.error(f"Пользователь с tg_user_id {tg_user_id} не найден.")
-                return None
-            id_user = user_id_result[0]
+            mydb.start_transaction()
 
-            # Получаем ID заказа в статусе "корзина"
-            sql_get_order = "SELECT id_orders FROM orders WHERE id_user = %s AND status = 'корзина'"
+            # Получаем ID заказа в статусе "корзина" и блокируем его до конца транзакции
+            sql_get_order = "SELECT id_orders FROM orders WHERE id_user = %s AND status = 'корзина' FOR UPDATE"
             mycursor.execute(sql_get_order, (id_user,))
             order_result = mycursor.fetchone()
             if not order_result:
-                logging.error(f"Заказ в статусе 'корзина' не найден для пользователя {tg_user_id}.")
+                logging.error(f"Заказ в статусе 'корзина' не найден для пользователя {id_user}.")
+                mydb.rollback()
                 return None
             order_id = order_result[0]
-            # delivery_price_result = (get_delivery_price(delivery_type_id),)
-            # if delivery_type_id == 2 and order_total > 1000:
-            #     delivery_price_result = (0,)
-            # else:
-            #     order_total += delivery_price_result[0]
             if delivery_time == "ASAP":
                 delivery_time = datetime.now()
 
+            # Цены всех товаров одним запросом
+            product_ids = list(cart_items)
+            prices = {}
+            if product_ids:
+                placeholders = ','.join(['%s'] * len(product_ids))
+                mycursor.execute(f"SELECT id_product, price FROM product WHERE id_product IN ({placeholders})",
+                                 tuple(product_ids))
+                prices = dict(mycursor.fetchall())
+
             # Обновляем заказ
             sql_update_order = """
                 UPDATE orders
@@ -308,27 +502,25 @@ def update_order(tg_user_id, delivery_type_id, delivery_address, delivery_time,
                               delivery_time,
                               order_id)
                              )
-            mydb.commit()
             # Очищаем старые товары
             mycursor.execute("DELETE FROM basket WHERE id_orders = %s", (order_id,))
 
-            # Добавляем новые товары
-            for product_id, quantity in cart_items.items():
-                product_details = get_product_details(product_id)
-                if product_details:
-                    price_to_quan = product_details['price'] * quantity
-                    sql_item = "INSERT INTO basket (id_orders, id_product, quantity, price_to_quan) VALUES (%s, %s, %s, %s)"
-                    val_item = (order_id, product_id, quantity, price_to_quan)
-                    mycursor.execute(sql_item, val_item)
+            # Добавляем новые товары одним многострочным INSERT
+            rows = [(order_id, product_id, quantity, prices[product_id] * quantity)
+                    for product_id, quantity in cart_items.items() if product_id in prices]
+            if rows:
+                sql_item = "INSERT INTO basket (id_orders, id_product, quantity, price_to_quan) VALUES (%s, %s, %s, %s)"
+                mycursor.executemany(sql_item, rows)
+            _apply_daily_sales(mycursor, order_id, 1)
 
-            mydb.commit()
-            logging.info(f"Заказ (ID: {order_id}) успешно обновлён для пользователя {tg_user_id}.")
             sql_new_cart = """
                 INSERT INTO orders (id_user, deliv_date, summa, id_type, adress, delivery_time, status)
                 VALUES (%s, NOW(), 0, NULL, '', NULL, 'Корзина')
             """
             mycursor.execute(sql_new_cart, (id_user,))
+
             mydb.commit()
+            logging.info(f"Заказ (ID: {order_id}) успешно обновлён для пользователя {id_user}.")
             return order_id
         except mysql.connector.Error as err:
             logging.error(f"Ошибка обновления заказа: {err}")
@@ -340,6 +532,7 @@ def update_order(tg_user_id, delivery_type_id, delivery_address, delivery_time,
     return None
 
 
+@instrumented
 def delete_product(product_id):
     mydb = connect_to_db()
     if mydb:
@@ -360,15 +553,19 @@ def delete_product(product_id):
     return False
 
 
-def add_product(category_id, product_name, product_description, product_price, product_image):
+@instrumented
+def add_product(category_id, product_name, product_description, product_price, product_image,
+                photo_width=None, photo_height=None, photo_size=None):
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor()
         sql = """
-            INSERT INTO product (id_category, name, descript, price, photo)
-            VALUES (%s, %s, %s, %s, %s)
+            INSERT INTO product (id_category, name, descript, price, photo,
+                                 photo_width, photo_height, photo_size)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
         """
-        val = (category_id, product_name, product_description, product_price, product_image)
+        val = (category_id, product_name, product_description, product_price, product_image,
+               photo_width, photo_height, photo_size)
         try:
             mycursor.execute(sql, val)
             mydb.commit()
@@ -384,6 +581,7 @@ def add_product(category_id, product_name, product_description, product_price, p
     return False
 
 
+@instrumented
 def get_todays_orders():
     mydb = connect_to_db()
     if mydb:
@@ -407,7 +605,8 @@ def get_todays_orders():
                 user u ON o.id_user = u.id_user
             JOIN
                 delivtype dt ON o.id_type = dt.id_type
-            WHERE DATE(o.deliv_date) = CURDATE() AND o.status != 'Корзина' AND o.status != 'Завершен'
+            WHERE o.deliv_date >= CURDATE() AND o.deliv_date < CURDATE() + INTERVAL 1 DAY
+                AND o.status != 'Корзина' AND o.status != 'Завершен'
             ORDER BY o.deliv_date DESC;
         """
         try:
@@ -423,13 +622,108 @@ def get_todays_orders():
     return None
 
 
+
+@instrumented
+def get_todays_orders_page(cursor_id=None, direction="next", limit=5):
+    """
+    Страница сегодняшних заказов вместе с составом (keyset-пагинация по id_orders, новые сверху).
+
+    :param cursor_id: id_orders, от которого отсчитывается страница (None - первая страница).
+    :param direction: "next" - заказы старше cursor_id, "prev" - новее cursor_id.
+    :param limit: количество заказов на странице.
+    :return: {'orders': [...], 'has_more': bool} или None при ошибке.
+             У каждого заказа ключ 'items' - список позиций с name, quantity, price_to_quan.
+    """
+    mydb = connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor(dictionary=True)
+        if direction == "prev":
+            keyset, order = "o.id_orders > %s", "ASC"
+        else:
+            keyset, order = "o.id_orders < %s", "DESC"
+        sql = f"""
+            SELECT
+                o.*,
+                b.id_product,
+                b.quantity,
+                b.price_to_quan,
+                p.name AS product_name
+            FROM (
+                SELECT
+                    o.id_orders,
+                    o.deliv_date,
+                    o.summa,
+                    o.delivery_time,
+                    dt.name AS delivery_type,
+                    o.status,
+                    o.adress,
+                    u.phone,
+                    u.tg_user_id,
+                    u.name
+                FROM
+                    orders o
+                JOIN
+                    user u ON o.id_user = u.id_user
+                JOIN
+                    delivtype dt ON o.id_type = dt.id_type
+                WHERE o.deliv_date >= CURDATE() AND o.deliv_date < CURDATE() + INTERVAL 1 DAY
+                    AND o.status != 'Корзина' AND o.status != 'Завершен'
+                    AND (%s IS NULL OR {keyset})
+                ORDER BY o.id_orders {order}
+                LIMIT %s
+            ) o
+            LEFT JOIN
+                basket b ON b.id_orders = o.id_orders
+            LEFT JOIN
+                product p ON b.id_product = p.id_product
+            ORDER BY o.id_orders {order}, b.id_basket;
+        """
+        val = (cursor_id, cursor_id, limit + 1)
+        try:
+            mycursor.execute(sql, val)
+            orders = {}
+            for row in mycursor.fetchall():
+                order = orders.get(row['id_orders'])
+                if order is None:
+                    order = {key: row[key] for key in
+                             ('id_orders', 'deliv_date', 'summa', 'delivery_time', 'delivery_type', 'status',
+                              'adress', 'phone', 'tg_user_id', 'name')}
+                    order['items'] = []
+                    orders[row['id_orders']] = order
+                if row['id_product'] is not None:
+                    order['items'].append({
+                        'name': row['product_name'],
+                        'quantity': row['quantity'],
+                        'price_to_quan': row['price_to_quan'],
+                    })
+            orders = list(orders.values())
+            has_more = len(orders) > limit
+            orders = orders[:limit]
+            if direction == "prev":
+                orders.reverse()
+            return {'orders': orders, 'has_more': has_more}
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка получения заказов за сегодня: {err}")
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+    return None
+
+@instrumented
 def update_order_status(order_id, status):
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor()
         sql = "UPDATE orders SET status = %s WHERE id_orders = %s"
         try:
+            mydb.start_transaction()
+            mycursor.execute("SELECT status FROM orders WHERE id_orders = %s FOR UPDATE", (order_id,))
+            row = mycursor.fetchone()
             mycursor.execute(sql, (status, order_id))
+            # Агрегаты меняются, только если заказ входит в продажи или выходит из них (отмена и её снятие)
+            if row and _counts_in_sales(row[0]) != _counts_in_sales(status):
+                _apply_daily_sales(mycursor, order_id, 1 if _counts_in_sales(status) else -1)
             mydb.commit()
             logging.info(f"Статус заказа {order_id} обновлен на {status}.")
             return True
@@ -443,31 +737,39 @@ def update_order_status(order_id, status):
     return True
 
 
+@instrumented
 def get_admin_by_tg_id(tg_user_id):
+    """
+    :return: строка admin или None, если такого админа нет.
+    :raises DBError: при ошибке БД.
+    """
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor(dictionary=True)
         sql = "SELECT * FROM admin WHERE tg_user_id = %s"
         try:
-            mycursor.execute(sql, (tg_user_id,))
+            mycursor.execute(sql, (str(tg_user_id),))
             admin = mycursor.fetchone()
             return admin
         except mysql.connector.Error as err:
             logging.error(f"Ошибка получения данных админа: {err}")
-            return None
+            raise DBError(err) from err
         finally:
             mycursor.close()
             mydb.close()
-    return None
+    raise DBError("Нет соединения с БД")
 
 
-def register_admin(tg_user_id: int, password: str, name: str = None, phone: str = None):
+@instrumented
+def register_admin(tg_user_id: int, password_hash: str, name: str = None, phone: str = None):
+    """
+    Сохраняет администратора. Пароль должен быть уже захэширован (см. utils.passwords).
+    """
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor()
-        hashed_password = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
         sql = "INSERT INTO admin (name, phone, tg_user_id, password) VALUES (%s, %s, %s, %s)"
-        val = (name, phone, tg_user_id, hashed_password)
+        val = (name, phone, str(tg_user_id), password_hash)
         try:
             mycursor.execute(sql, val)
             mydb.commit()
@@ -483,7 +785,11 @@ def register_admin(tg_user_id: int, password: str, name: str = None, phone: str
     return False
 
 
-def verify_admin_password(tg_user_id, password):
+@instrumented
+def get_admin_password_hash():
+    """
+    :return: bcrypt-хэш пароля админ-панели или None, если администраторов нет.
+    """
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor(dictionary=True)
@@ -491,20 +797,17 @@ def verify_admin_password(tg_user_id, password):
         try:
             mycursor.execute(sql)
             admin = mycursor.fetchone()
-            if admin:
-                hashed_password = admin['password']
-                return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
-            else:
-                return False
+            return admin['password'] if admin else None
         except mysql.connector.Error as err:
-            logging.error(f"Ошибка верификации пароля: {err}")
-            return False
+            logging.error(f"Ошибка получения пароля администратора: {err}")
+            return None
         finally:
             mycursor.close()
             mydb.close()
-    return False
+    return None
 
 
+@instrumented
 def get_delivery_types():
     mydb = connect_to_db()
     if mydb:
@@ -523,6 +826,7 @@ def get_delivery_types():
     return None
 
 
+@instrumented
 def get_delivery_type_by_id(delivery_type_id):
     mydb = connect_to_db()
     if mydb:
@@ -541,109 +845,86 @@ def get_delivery_type_by_id(delivery_type_id):
     return None
 
 
-def add_to_cart(tg_user_id, product_id, quantity):
+@instrumented
+def get_or_create_cart(id_user):
+    """
+    Возвращает id открытой корзины пользователя, создавая её при необходимости.
+
+    Уникальный ключ uq_orders_open_cart не даёт завести вторую корзину, поэтому
+    параллельные вызовы получат один и тот же id_orders.
+    """
     mydb = connect_to_db()
     if not mydb:
-        return False
+        return None
 
+    mycursor = mydb.cursor()
     try:
-        mycursor = mydb.cursor(dictionary=True)
-
-        # 1. Получаем id пользователя
-        sql_get_user = "SELECT id_user FROM user WHERE tg_user_id = %s"
-        mycursor.execute(sql_get_user, (tg_user_id,))
-        user = mycursor.fetchone()
-        if not user:
-            logging.error(f"Пользователь с tg_user_id {tg_user_id} не найден.")
-            return False
-        id_user = user['id_user']
+        sql = """
+            INSERT INTO orders (id_user, status) VALUES (%s, 'Корзина')
+            ON DUPLICATE KEY UPDATE id_orders = LAST_INSERT_ID(id_orders)
+        """
+        mycursor.execute(sql, (id_user,))
+        mydb.commit()
+        return mycursor.lastrowid
+    except mysql.connector.Error as err:
+        logging.error(f"Ошибка получения корзины пользователя {id_user}: {err}")
+        mydb.rollback()
+        return None
+    finally:
+        mycursor.close()
+        mydb.close()
 
-        # 2. Проверяем наличие открытой корзины (status='cart')
-        sql_find_cart = "SELECT id_orders FROM orders WHERE id_user = %s AND status = 'Корзина'"
-        mycursor.execute(sql_find_cart, (id_user,))
-        order = mycursor.fetchone()
 
-        if order:
-            order_id = order['id_orders']
-        else:
-            # 3. Если корзины нет — создаем новую
-            sql_create_cart = "INSERT INTO orders (id_user, status) VALUES (%s, 'Корзина')"
-            mycursor.execute(sql_create_cart, (id_user,))
-            order_id = mycursor.lastrowid
-
-        # 4. Проверяем, есть ли уже этот товар в корзине
-        sql_check_product = """
-            SELECT id_basket, quantity FROM basket
-            WHERE id_orders = %s AND id_product = %s
-        """
-        mycursor.execute(sql_check_product, (order_id, product_id))
-        basket_item = mycursor.fetchone()
-
-        if basket_item:
-            # 5. Товар уже есть — обновляем количество
-            new_quantity = basket_item['quantity'] + quantity
-            sql_update_quantity = "UPDATE basket SET quantity = %s WHERE id_basket = %s"
-            mycursor.execute(sql_update_quantity, (new_quantity, basket_item['id_basket']))
-        else:
-            # 6. Получаем цену товара
-            sql_get_price = "SELECT price FROM product WHERE id_product = %s"
-            mycursor.execute(sql_get_price, (product_id,))
-            product = mycursor.fetchone()
-            if not product:
-                logging.error(f"Товар с id {product_id} не найден.")
-                return False
-            price_to_quan = product['price'] * quantity
+@instrumented
+def add_to_cart(cart_id, product_id, quantity):
+    """
+    Добавляет товар в корзину одним запросом: новая позиция вставляется,
+    для существующей увеличивается количество (уникальный ключ (id_orders, id_product)).
 
-            # 7. Вставляем новую позицию в корзину
-            sql_add_item = """
-                INSERT INTO basket (id_orders, id_product, quantity, price_to_quan)
-                VALUES (%s, %s, %s, %s)
-            """
-            mycursor.execute(sql_add_item, (order_id, product_id, quantity, price_to_quan))
+    :return: True - товар добавлен, False - ошибка или товар не найден,
+             None - корзины cart_id больше нет (нужно получить новую).
+    """
+    mydb = connect_to_db()
+    if not mydb:
+        return False
 
+    mycursor = mydb.cursor()
+    try:
+        sql = """
+            INSERT INTO basket (id_orders, id_product, quantity, price_to_quan)
+            SELECT %s, p.id_product, %s, p.price * %s
+            FROM product p
+            WHERE p.id_product = %s AND p.is_deleted = 0
+            ON DUPLICATE KEY UPDATE
+                quantity = basket.quantity + VALUES(quantity),
+                price_to_quan = basket.price_to_quan + VALUES(price_to_quan)
+        """
+        mycursor.execute(sql, (cart_id, quantity, quantity, product_id))
         mydb.commit()
-        logging.info(f"Товар {product_id} добавлен в корзину пользователя {tg_user_id}")
+        if mycursor.rowcount == 0:
+            logging.error(f"Товар с id {product_id} не найден.")
+            return False
+        logging.info(f"Товар {product_id} добавлен в корзину {cart_id}")
         return True
-
     except mysql.connector.Error as err:
-        logging.error(f"Ошибка при добавлении в корзину: {err}")
         mydb.rollback()
+        if err.errno == errorcode.ER_NO_REFERENCED_ROW_2:
+            logging.warning(f"Корзина {cart_id} не найдена, товар {product_id} не добавлен")
+            return None
+        logging.error(f"Ошибка при добавлении в корзину: {err}")
         return False
     finally:
         mycursor.close()
         mydb.close()
 
 
-def get_cart_items(tg_user_id):
+@instrumented
+def get_cart_items(id_user):
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor(dictionary=True)
-        sql_get_user_id = "SELECT id_user FROM user WHERE tg_user_id = %s"
         try:
-            mycursor.execute(sql_get_user_id, (tg_user_id,))
-            user_id_result = mycursor.fetchone()
-            if not user_id_result:
-                logging.error(f"Пользователь с tg_user_id {tg_user_id} не найден.")
-                return None
-            id_user = user_id_result['id_user']
-
-            # Получаем id заказов пользователя
-            sql_get_orders = """
-            SELECT id_orders
-            FROM orders
-            WHERE id_user = %s
-            AND status = 'Корзина'
-            """
-            mycursor.execute(sql_get_orders, (id_user,))
-            orders_result = mycursor.fetchall()
-            if not orders_result:
-                logging.error(f"У пользователя {tg_user_id} нет активных заказов.")
-                return None
-
-            # Создаём список id заказов
-            order_ids = [order['id_orders'] for order in orders_result]
-
-            # Получаем товары из корзины, относящиеся к этим заказам
+            # Товары из открытой корзины пользователя
             sql = """
             SELECT
                 b.id_basket,
@@ -653,15 +934,16 @@ def get_cart_items(tg_user_id):
                 p.name as product_name,
                 p.price as product_price
             FROM
-                basket b
+                orders o
+            JOIN
+                basket b ON b.id_orders = o.id_orders
             JOIN
                 product p ON b.id_product = p.id_product
             WHERE
-                b.id_orders IN (%s)  -- Товары, привязанные к активным заказам
+                o.id_user = %s
+                AND o.status = 'Корзина'
             """
-            format_strings = ','.join(['%s'] * len(order_ids))  # Подготовка строки для IN
-            sql = sql % format_strings
-            mycursor.execute(sql, tuple(order_ids))
+            mycursor.execute(sql, (id_user,))
             cart_items = mycursor.fetchall()
             return cart_items
         except mysql.connector.Error as err:
@@ -673,6 +955,7 @@ def get_cart_items(tg_user_id):
     return None
 
 
+@instrumented
 def get_orders_today():
     mydb = connect_to_db()
     if mydb:
@@ -704,72 +987,28 @@ def get_orders_today():
             mydb.close()
     return []
 
-def update_cart_item_quantity(tg_user_id, product_id, quantity):
+@instrumented
+def update_cart_item_quantity(cart_id, product_id, quantity):
     mydb = connect_to_db()
     if mydb:
         mycursor = mydb.cursor()
         try:
-            # Шаг 1: Найдем заказ пользователя со статусом "Корзина"
-            sql_find_cart = """
-                SELECT id_orders 
-                FROM orders 
-                WHERE id_user = (SELECT id_user FROM user WHERE tg_user_id = %s) 
-                AND status = 'Корзина'
-                LIMIT 1
-            """
-            mycursor.execute(sql_find_cart, (tg_user_id,))
-            cart_id = mycursor.fetchone()
-
-            if cart_id is None:
-                logging.warning(f"Корзина для пользователя с tg_user_id={tg_user_id} не найдена.")
-                return False
-
-            cart_id = cart_id[0]  # Получаем id_orders корзины
-
-            # Шаг 2: Находим товар в корзине по id_product
-            sql_find_cart_item = """
-                SELECT id_basket, quantity 
-                FROM basket 
-                WHERE id_orders = %s AND id_product = %s
-            """
-            mycursor.execute(sql_find_cart_item, (cart_id, product_id))
-            cart_item = mycursor.fetchone()
-
-            if cart_item is None:
-                logging.warning(f"Товар с id_product={product_id} не найден в корзине для пользователя с tg_user_id={tg_user_id}.")
-                return False
-
-            id_basket, old_quantity = cart_item  # Получаем id_basket и старое количество товара
-
-            # Шаг 3: Получим цену товара
-            sql_find_product_price = """
-                SELECT price FROM product WHERE id_product = %s
-            """
-            mycursor.execute(sql_find_product_price, (product_id,))
-            product_price = mycursor.fetchone()
-
-            if product_price is None:
-                logging.warning(f"Товар с id_product={product_id} не найден.")
-                return False
-
-            product_price = product_price[0]  # Получаем цену товара
-
-            # Шаг 4: Обновляем количество товара и пересчитываем цену
+            # Обновляем количество и пересчитываем цену одним запросом
             sql_update = """
-                UPDATE basket 
-                SET quantity = %s, 
-                    price_to_quan = %s * %s
-                WHERE id_basket = %s
+                UPDATE basket b
+                JOIN product p ON p.id_product = b.id_product
+                SET b.quantity = %s,
+                    b.price_to_quan = p.price * %s
+                WHERE b.id_orders = %s AND b.id_product = %s
             """
-            val = (quantity, product_price, quantity, id_basket)
-            mycursor.execute(sql_update, val)
+            mycursor.execute(sql_update, (quantity, quantity, cart_id, product_id))
             mydb.commit()
 
             if mycursor.rowcount > 0:
-                logging.info(f"Количество товара с id_basket={id_basket} в корзине обновлено на {quantity}.")
+                logging.info(f"Количество товара {product_id} в корзине {cart_id} обновлено на {quantity}.")
                 return True
             else:
-                logging.warning(f"Не удалось обновить товар с id_basket={id_basket} в корзине для пользователя с tg_user_id={tg_user_id}.")
+                logging.warning(f"Не удалось обновить товар {product_id} в корзине {cart_id}.")
                 return False
 
         except mysql.connector.Error as err:
@@ -782,50 +1021,47 @@ def update_cart_item_quantity(tg_user_id, product_id, quantity):
     return False
 
 
+@instrumented
+def remove_item_from_cart(cart_id, product_id):
+    """
+    Удаляет товар из корзины; пустая корзина удаляется вместе с ним.
 
-def remove_item_from_cart(tg_user_id, product_id):
+    :return: True, если корзина была удалена.
+    """
     mydb = connect_to_db()
+    if not mydb:
+        return False
+
+    mycursor = mydb.cursor()
     try:
-        mycursor = mydb.cursor()
         mydb.start_transaction()
 
         # Удаление товара из корзины
-        sql_basket = """
-            DELETE FROM basket
-            WHERE id_orders IN (
-                SELECT id_orders FROM orders
-                WHERE id_user = (SELECT id_user FROM user WHERE tg_user_id = %s)
-                AND status = 'Корзина'
-            )
-            AND id_product = %s
-        """
-        print("executing sql_basket")
-        mycursor.execute(sql_basket, (tg_user_id, product_id))
-        mydb.commit()
+        mycursor.execute("DELETE FROM basket WHERE id_orders = %s AND id_product = %s", (cart_id, product_id))
 
         # Удаление заказа, если корзина пуста
         sql_orders = """
             DELETE FROM orders
-            WHERE id_user = (SELECT id_user FROM user WHERE tg_user_id = %s)
+            WHERE id_orders = %s
             AND status = 'Корзина'
             AND NOT EXISTS (
-                SELECT 1 FROM basket WHERE id_orders = orders.id_orders
+                SELECT 1 FROM basket WHERE id_orders = %s
             )
         """
-        print("executing sql_orders")
-        mycursor.execute(sql_orders, (tg_user_id,))
+        mycursor.execute(sql_orders, (cart_id, cart_id))
 
         mydb.commit()
         return mycursor.rowcount > 0
-    except Exception as e:
+    except mysql.connector.Error as err:
         mydb.rollback()
-        logging.error(f"Ошибка при удалении товара: {e}")
+        logging.error(f"Ошибка при удалении товара: {err}")
         return False
     finally:
         mycursor.close()
         mydb.close()
 
 
+@instrumented
 def has_any_admins():
     """
     Проверяет, есть ли хотя бы один администратор в базе данных.
@@ -850,6 +1086,7 @@ def has_any_admins():
         mycursor.close()
 
 
+@instrumented
 def get_product_details(product_id):
     mydb = connect_to_db()
     if mydb:
@@ -867,6 +1104,7 @@ def get_product_details(product_id):
             mydb.close()
 
 
+@instrumented
 def get_products_by_category_as_menu(category_id) -> dict | None:
     mydb = connect_to_db()
     if mydb:
@@ -886,6 +1124,7 @@ def get_products_by_category_as_menu(category_id) -> dict | None:
     return None
 
 
+@instrumented
 def get_product_id_by_name(product_name):
     mydb = connect_to_db()
     if mydb:
@@ -904,6 +1143,7 @@ def get_product_id_by_name(product_name):
             mydb.close()
     return None
 
+@instrumented
 def get_admins():
     mydb = connect_to_db()
     if mydb:
@@ -922,4 +1162,110 @@ def get_admins():
             return None
         finally:
             mycursor.close()
-            mydb.close()
\ No newline at end of file
+            mydb.close()
+
+@instrumented
+def get_daily_sales(date_from, date_to):
+    """
+    Строки daily_sales за период [date_from, date_to] с названиями товаров и типов доставки.
+    """
+    mydb = connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor(dictionary=True)
+        sql = """
+        SELECT ds.sale_date, ds.id_product, p.name AS product_name, ds.id_type, dt.name AS delivery_type,
+               ds.orders_count, ds.quantity, ds.revenue
+        FROM daily_sales ds
+        JOIN product p ON p.id_product = ds.id_product
+        LEFT JOIN delivtype dt ON dt.id_type = ds.id_type
+        WHERE ds.sale_date BETWEEN %s AND %s AND ds.orders_count > 0
+        """
+        try:
+            mycursor.execute(sql, (date_from, date_to))
+            return mycursor.fetchall()
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка получения агрегатов продаж: {err}")
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+    return None
+
+
+@instrumented
+def rebuild_daily_sales(since=None):
+    """
+    Пересчитывает daily_sales по orders и basket (целиком или начиная с дня since) одной транзакцией.
+    INSERT ... SELECT читает заказы с блокировкой, поэтому оформление заказов на время пересчёта ждёт.
+
+    :return: число записанных строк агрегатов или None при ошибке.
+    """
+    mydb = connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor()
+        placeholders = ','.join(['%s'] * len(SALES_EXCLUDED_STATUSES))
+        sql = f"""
+        INSERT INTO daily_sales (sale_date, id_product, id_type, orders_count, quantity, revenue)
+        SELECT DATE(o.deliv_date), b.id_product, COALESCE(o.id_type, 0),
+               COUNT(DISTINCT o.id_orders), SUM(b.quantity), SUM(b.price_to_quan)
+        FROM orders o
+        JOIN basket b ON b.id_orders = o.id_orders
+        WHERE o.status NOT IN ({placeholders}) AND o.deliv_date IS NOT NULL AND o.deliv_date >= %s
+        GROUP BY DATE(o.deliv_date), b.id_product, COALESCE(o.id_type, 0)
+        """
+        since = since or datetime(1970, 1, 1).date()
+        try:
+            mydb.start_transaction()
+            mycursor.execute("DELETE FROM daily_sales WHERE sale_date >= %s", (since,))
+            mycursor.execute(sql, SALES_EXCLUDED_STATUSES + (since,))
+            rows = mycursor.rowcount
+            mydb.commit()
+            logging.info(f"Агрегаты продаж пересчитаны с {since}: {rows} строк.")
+            return rows
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка пересчёта агрегатов продаж: {err}")
+            mydb.rollback()
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+    return None
+
+
+@instrumented
+def delete_user_orders(user_ids):
+    """
+    Удаляет все заказы и корзины пользователей (тестовые прогоны в benchmarks) и пересчитывает
+    daily_sales за затронутые дни, чтобы удалённые заказы не оставались в отчёте о продажах.
+
+    :return: число удалённых заказов или None при ошибке.
+    """
+    if not user_ids:
+        return 0
+    mydb = connect_to_db()
+    if mydb:
+        mycursor = mydb.cursor()
+        placeholders = ','.join(['%s'] * len(user_ids))
+        try:
+            mydb.start_transaction()
+            mycursor.execute(f"SELECT MIN(deliv_date) FROM orders WHERE id_user IN ({placeholders})",
+                             tuple(user_ids))
+            first_date = mycursor.fetchone()[0]
+            mycursor.execute(f"DELETE b FROM basket b JOIN orders o ON o.id_orders = b.id_orders "
+                             f"WHERE o.id_user IN ({placeholders})", tuple(user_ids))
+            mycursor.execute(f"DELETE FROM orders WHERE id_user IN ({placeholders})", tuple(user_ids))
+            deleted = mycursor.rowcount
+            mydb.commit()
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка удаления заказов пользователей: {err}")
+            mydb.rollback()
+            return None
+        finally:
+            mycursor.close()
+            mydb.close()
+
+        # Пересчёт, а не вычитание: заказы могли оформляться и в обход агрегатов (как legacy-версия в бенчмарке)
+        if first_date is not None and rebuild_daily_sales(first_date.date()) is None:
+            return None
+        return deleted
+    return None
@@ -0,0 +1,192 @@
+# db/export.py
+# Выгрузка заказов с позициями для бухгалтерии в CSV или Parquet.
+# Строки читаются небуферизованным курсором пачками по EXPORT_BATCH_SIZE и сразу пишутся
+# в файл, поэтому память не зависит от объёма выгрузки. Parquet требует pyarrow
+# (необязательная зависимость: pip install pyarrow).
+#
+# Запуск из корня проекта:
+#   python -m db.export --month 2025-06                       # CSV за июнь 2025
+#   python -m db.export --month 2025-06 --format parquet -o orders_2025_06.parquet
+import argparse
+import csv
+import logging
+from datetime import date
+
+import mysql.connector
+
+from config import EXPORT_BATCH_SIZE
+from db.db_utils import connect_to_db
+from db.instrumentation import instrumented
+
+FORMATS = ("csv", "parquet")
+
+# (колонка, тип в Parquet)
+COLUMNS = [
+    ("id_orders", "int64"),
+    ("deliv_date", "timestamp"),
+    ("status", "string"),
+    ("delivery_type", "string"),
+    ("delivery_price", "float64"),
+    ("order_sum", "float64"),
+    ("address", "string"),
+    ("delivery_time", "string"),
+    ("id_user", "int64"),
+    ("user_name", "string"),
+    ("id_product", "int64"),
+    ("product_name", "string"),
+    ("quantity", "int64"),
+    ("line_sum", "float64"),
+]
+
+_SQL = """
+    SELECT
+        o.id_orders,
+        o.deliv_date,
+        o.status,
+        dt.name,
+        o.dostavka,
+        o.summa,
+        o.adress,
+        TIME_FORMAT(o.delivery_time, '%%H:%%i'),
+        o.id_user,
+        u.name,
+        b.id_product,
+        p.name,
+        b.quantity,
+        b.price_to_quan
+    FROM orders o
+    JOIN basket b ON b.id_orders = o.id_orders
+    LEFT JOIN product p ON p.id_product = b.id_product
+    LEFT JOIN delivtype dt ON dt.id_type = o.id_type
+    LEFT JOIN user u ON u.id_user = o.id_user
+    WHERE o.deliv_date >= %s AND o.deliv_date < %s AND o.status != 'Корзина'
+    ORDER BY o.id_orders, b.id_basket
+"""
+
+
+def month_range(month):
+    """
+    "2025-06" -> (1 июня 2025, 1 июля 2025): границы для deliv_date >= начало AND < конец.
+    """
+    start = date.fromisoformat(f"{month}-01")
+    end = date(start.year + start.month // 12, start.month % 12 + 1, 1)
+    return start, end
+
+
+def previous_month(today=None):
+    today = today or date.today()
+    first = today.replace(day=1)
+    return f"{first.year - (first.month == 1)}-{(first.month - 2) % 12 + 1:02d}"
+
+
+def _iter_batches(cursor, batch_size):
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            return
+        yield rows
+
+
+def _write_csv(batches, path):
+    count = 0
+    # utf-8-sig и ";" - чтобы файл сразу открывался в русском Excel
+    with open(path, "w", newline="", encoding="utf-8-sig") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow([name for name, _ in COLUMNS])
+        for rows in batches:
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def _write_parquet(batches, path):
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise RuntimeError("Для выгрузки в Parquet нужен pyarrow: pip install pyarrow")
+
+    types = {"int64": pa.int64(), "float64": pa.float64(), "string": pa.string(), "timestamp": pa.timestamp("s")}
+    schema = pa.schema([(name, types[kind]) for name, kind in COLUMNS])
+    count = 0
+    # Каждая пачка - отдельная группа строк, в памяти не больше одной пачки
+    with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+        for rows in batches:
+            columns = list(zip(*rows))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema
+            ))
+            count += len(rows)
+    return count
+
+
+def _restore_net_write_timeout(mydb, value):
+    """
+    Соединение вернётся в пул, и увеличенный таймаут не должен достаться другим запросам.
+    """
+    mycursor = mydb.cursor()
+    try:
+        mycursor.execute("SET SESSION net_write_timeout = %s", (value,))
+    except mysql.connector.Error as err:
+        logging.error(f"Не удалось вернуть net_write_timeout = {value}, сбрасываем сессию: {err}")
+        try:
+            # Возвращает все переменные сессии к глобальным значениям
+            mydb.reset_session()
+        except mysql.connector.Error as reset_err:
+            logging.error(f"Не удалось сбросить сессию соединения: {reset_err}")
+    finally:
+        mycursor.close()
+
+
+@instrumented
+def export_orders(path, fmt, date_from, date_to, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Выгружает позиции заказов с deliv_date в [date_from, date_to) в файл path.
+
+    :return: число выгруженных строк или None при ошибке БД.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"Неизвестный формат выгрузки: {fmt}")
+    mydb = connect_to_db()
+    if mydb:
+        # Небуферизованный курсор: строки приходят с сервера по мере чтения, а не все сразу
+        mycursor = mydb.cursor(buffered=False)
+        saved_timeout = None
+        try:
+            # Пока запись файла не дочитала результат, сервер ждёт; по умолчанию он сдаётся через 60 с
+            mycursor.execute("SELECT @@SESSION.net_write_timeout")
+            saved_timeout = mycursor.fetchone()[0]
+            mycursor.execute("SET SESSION net_write_timeout = 600")
+            mycursor.execute(_SQL, (date_from, date_to))
+            batches = _iter_batches(mycursor, batch_size)
+            count = _write_csv(batches, path) if fmt == "csv" else _write_parquet(batches, path)
+            logging.info(f"Выгружено {count} строк заказов с {date_from} по {date_to} в {path}")
+            return count
+        except mysql.connector.Error as err:
+            logging.error(f"Ошибка выгрузки заказов: {err}")
+            return None
+        finally:
+            mycursor.close()
+            if saved_timeout is not None:
+                _restore_net_write_timeout(mydb, saved_timeout)
+            mydb.close()
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Выгрузка заказов с позициями")
+    parser.add_argument("--month", default=previous_month(), help="месяц ГГГГ-ММ (по умолчанию прошлый)")
+    parser.add_argument("--format", choices=FORMATS, default="csv")
+    parser.add_argument("-o", "--output", help="файл (по умолчанию orders_ГГГГ_ММ.csv/.parquet)")
+    args = parser.parse_args()
+
+    date_from, date_to = month_range(args.month)
+    path = args.output or f"orders_{args.month.replace('-', '_')}.{args.format}"
+    count = export_orders(path, args.format, date_from, date_to)
+    if count is None:
+        raise SystemExit("Не удалось выгрузить заказы, подробности в логе")
+    print(f"Выгружено строк: {count} -> {path}")
+
+
+if __name__ == '__main__':
+    main()
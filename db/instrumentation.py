@@ -0,0 +1,121 @@
+# db/instrumentation.py
+# Метрики функций db_utils: количество вызовов, гистограмма времени, число запросов
+# и полученных строк, время ожидания соединения из пула, а также журнал медленных вызовов.
+# Функции db_utils выполняются в потоках пула БД, поэтому текущий вызов хранится в threading.local.
+import functools
+import logging
+import threading
+import time
+
+from config import DB_SLOW_QUERY_MS
+from utils.metrics import REGISTRY
+
+DB_CALLS = REGISTRY.counter("db_calls_total", "Вызовы функций db_utils", ["function"])
+DB_CALL_SECONDS = REGISTRY.histogram("db_call_seconds", "Время выполнения функций db_utils", ["function"])
+DB_QUERIES = REGISTRY.counter("db_queries_total", "Запросы к БД из функций db_utils", ["function"])
+DB_ROWS = REGISTRY.counter("db_rows_total", "Строки, полученные функциями db_utils", ["function"])
+DB_ACQUIRE_SECONDS = REGISTRY.histogram("db_acquire_seconds", "Ожидание соединения из пула", ["function"])
+DB_SLOW_CALLS = REGISTRY.counter("db_slow_calls_total", "Вызовы db_utils дольше DB_SLOW_QUERY_MS", ["function"])
+
+_local = threading.local()
+
+
+class _Call:
+    __slots__ = ("function", "queries", "rows", "acquire", "statements")
+
+    def __init__(self, function):
+        self.function = function
+        self.queries = 0
+        self.rows = 0
+        self.acquire = 0.0
+        self.statements = []
+
+
+def _current():
+    return getattr(_local, "call", None)
+
+
+def note_acquire(seconds):
+    call = _current()
+    if call is not None:
+        call.acquire += seconds
+
+
+def note_query(statement):
+    call = _current()
+    if call is not None:
+        call.queries += 1
+        call.statements.append(statement)
+
+
+def note_rows(count):
+    call = _current()
+    if call is not None:
+        call.rows += count
+
+
+def _compact(statement):
+    statement = statement.decode() if isinstance(statement, bytes) else str(statement)
+    return " ".join(statement.split())[:200]
+
+
+def _record(call, elapsed):
+    function = call.function
+    DB_CALLS.inc(function=function)
+    DB_CALL_SECONDS.observe(elapsed, function=function)
+    DB_QUERIES.inc(call.queries, function=function)
+    DB_ROWS.inc(call.rows, function=function)
+    DB_ACQUIRE_SECONDS.observe(call.acquire, function=function)
+
+    if elapsed * 1000 >= DB_SLOW_QUERY_MS:
+        DB_SLOW_CALLS.inc(function=function)
+        logging.warning(
+            f"Медленный вызов db_utils.{function}: {elapsed * 1000:.0f} мс "
+            f"(ожидание соединения {call.acquire * 1000:.0f} мс, запросов {call.queries}, строк {call.rows}): "
+            + " | ".join(_compact(statement) for statement in call.statements)
+        )
+
+
+def instrumented(func):
+    """
+    Декоратор для функций db_utils: снимает метрики вызова.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        parent = _current()
+        call = _local.call = _Call(func.__name__)
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _local.call = parent
+            _record(call, time.perf_counter() - started)
+
+    return wrapper
+
+
+def format_db_stats(limit=15):
+    """
+    Текстовая сводка для администратора: функции db_utils по суммарному времени.
+    """
+    rows = []
+    for labels in DB_CALL_SECONDS.label_sets():
+        function = labels["function"]
+        count, total, _ = DB_CALL_SECONDS.snapshot(function=function)
+        acquire = DB_ACQUIRE_SECONDS.snapshot(function=function)
+        rows.append((total, function, count, acquire[1] if acquire else 0.0))
+    if not rows:
+        return "Вызовов БД пока не было."
+
+    rows.sort(reverse=True)
+    lines = ["Функции БД по суммарному времени:"]
+    for total, function, count, acquire_total in rows[:limit]:
+        p95 = DB_CALL_SECONDS.quantile(0.95, function=function) or 0.0
+        lines.append(
+            f"{function}: {int(count)} выз., ср. {total / count * 1000:.1f} мс, p95 ≈{p95 * 1000:.0f} мс, "
+            f"запросов {DB_QUERIES.get(function=function) / count:.1f}/выз., "
+            f"строк {int(DB_ROWS.get(function=function))}, "
+            f"ожидание соединения {acquire_total / count * 1000:.1f} мс, "
+            f"медленных {int(DB_SLOW_CALLS.get(function=function))}"
+        )
+    return "\n".join(lines)
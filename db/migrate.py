@@ -0,0 +1,184 @@
+# db/migrate.py
+# Версионные миграции схемы БД. Dump20250616.sql - исходная схема, все изменения
+# после него лежат в db/migrations/NNNN_описание.sql и применяются по порядку номеров.
+# Применённые версии записываются в таблицу schema_migrations.
+#
+# Выкладка: сделать резервную копию БД, посмотреть python -m db.migrate --status
+# и применить python -m db.migrate до запуска новой версии бота.
+# При AUTO_MIGRATE=1 миграции применяются при запуске бота, иначе бот только
+# предупреждает в логе о неприменённых миграциях.
+#
+# В файле миграции запросы разделяются ";" в конце строки; DELIMITER не поддерживается.
+# DDL в MySQL не откатывается, поэтому каждый запрос должен быть безопасен при повторе
+# миграции с места падения либо миграцию нужно разбивать на несколько файлов.
+import argparse
+import hashlib
+import logging
+import os
+import re
+
+import mysql.connector
+
+from db.db_utils import connect_to_db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+# Имя блокировки GET_LOCK: при нескольких процессах миграции применяет только один
+LOCK_NAME = "schema_migrations"
+LOCK_TIMEOUT = 60
+
+_FILE_RE = re.compile(r"^(\d+)_(.+)\.sql$")
+
+
+def list_migrations():
+    """
+    Список миграций на диске: [(версия, имя, путь), ...] по возрастанию версии.
+    """
+    migrations = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILE_RE.match(filename)
+        if match:
+            migrations.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    migrations.sort()
+
+    versions = [version for version, _, _ in migrations]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError(f"Повторяющиеся номера миграций в {MIGRATIONS_DIR}")
+    return migrations
+
+
+def split_statements(sql):
+    statements = []
+    current = []
+    for line in sql.splitlines():
+        if not current and (not line.strip() or line.strip().startswith("--")):
+            continue
+        current.append(line)
+        if line.rstrip().endswith(";"):
+            statements.append("\n".join(current).rstrip().rstrip(";"))
+            current = []
+    if any(line.strip() and not line.strip().startswith("--") for line in current):
+        statements.append("\n".join(current))
+    return statements
+
+
+def _checksum(sql):
+    return hashlib.sha256(sql.encode("utf-8")).hexdigest()
+
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version int NOT NULL,
+            name varchar(255) NOT NULL,
+            checksum char(64) NOT NULL,
+            applied_at datetime NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (version)
+        ) ENGINE=InnoDB
+    """)
+
+
+def _applied(cursor):
+    cursor.execute("SELECT version, checksum FROM schema_migrations")
+    return dict(cursor.fetchall())
+
+
+def migrate():
+    """
+    Применяет все ещё не применённые миграции.
+
+    :return: список применённых версий.
+    """
+    mydb = connect_to_db()
+    if mydb is None:
+        raise RuntimeError("Нет соединения с БД для применения миграций")
+
+    mycursor = mydb.cursor()
+    applied_now = []
+    try:
+        mycursor.execute("SELECT GET_LOCK(%s, %s)", (LOCK_NAME, LOCK_TIMEOUT))
+        if mycursor.fetchone()[0] != 1:
+            raise RuntimeError(f"Не удалось получить блокировку миграций за {LOCK_TIMEOUT} с.")
+        try:
+            _ensure_table(mycursor)
+            applied = _applied(mycursor)
+
+            for version, name, path in list_migrations():
+                with open(path, encoding="utf-8") as f:
+                    sql = f.read()
+                if version in applied:
+                    if applied[version] != _checksum(sql):
+                        logging.warning(f"Миграция {version}_{name} изменена после применения")
+                    continue
+
+                logging.info(f"Применяем миграцию {version}_{name}")
+                for statement in split_statements(sql):
+                    mycursor.execute(statement)
+                mycursor.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                    (version, name, _checksum(sql))
+                )
+                mydb.commit()
+                applied_now.append(version)
+        finally:
+            mycursor.execute("SELECT RELEASE_LOCK(%s)", (LOCK_NAME,))
+            mycursor.fetchall()
+    except mysql.connector.Error as err:
+        mydb.rollback()
+        logging.error(f"Ошибка применения миграций: {err}")
+        raise
+    finally:
+        mycursor.close()
+        mydb.close()
+
+    if applied_now:
+        logging.info(f"Применены миграции: {', '.join(map(str, applied_now))}")
+    return applied_now
+
+
+def status():
+    """
+    Возвращает [(версия, имя, применена ли), ...] для всех миграций на диске.
+    """
+    mydb = connect_to_db()
+    if mydb is None:
+        raise RuntimeError("Нет соединения с БД")
+
+    mycursor = mydb.cursor()
+    try:
+        _ensure_table(mycursor)
+        applied = _applied(mycursor)
+    finally:
+        mycursor.close()
+        mydb.close()
+    return [(version, name, version in applied) for version, name, _ in list_migrations()]
+
+
+def warn_pending():
+    """
+    Пишет в лог предупреждение, если на диске есть неприменённые миграции.
+    """
+    try:
+        pending = [f"{version:04d}_{name}" for version, name, is_applied in status() if not is_applied]
+    except (RuntimeError, mysql.connector.Error) as err:
+        logging.error(f"Не удалось проверить миграции: {err}")
+        return
+    if pending:
+        logging.warning(f"Не применены миграции: {', '.join(pending)}. Примените их: python -m db.migrate")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Миграции схемы БД")
+    parser.add_argument("--status", action="store_true", help="показать применённые и ожидающие миграции")
+    args = parser.parse_args()
+
+    if args.status:
+        for version, name, is_applied in status():
+            print(f"{version:04d} {name}: {'применена' if is_applied else 'ожидает'}")
+        return
+
+    applied = migrate()
+    print(f"Применено миграций: {len(applied)}")
+
+
+if __name__ == '__main__':
+    main()
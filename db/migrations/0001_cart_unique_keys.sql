@@ -0,0 +1,65 @@
+-- Одна позиция на товар в корзине и одна открытая корзина на пользователя.
+-- На этих ключах держатся upsert в add_to_cart и get_or_create_cart.
+--
+-- Триггеры basket при UPDATE пересчитывают price_to_quan по сегодняшней цене товара и
+-- orders.summa (а update_dostavka_on_update добавляет к ней доставку), DELETE триггеров не
+-- вызывает. Поэтому повторяющиеся позиции склеиваются только в открытых корзинах, и уже после
+-- удаления дублей - тогда триггеры считают сумму корзины как при обычном изменении.
+-- В оформленных заказах строки не обновляются: лишние позиции переносятся как есть в
+-- basket_duplicates, сумма заказа и цены остаются прежними (в отчёты и выгрузку они не попадают).
+
+CREATE TABLE IF NOT EXISTS basket_duplicates LIKE basket;
+
+-- Количество по повторяющимся позициям корзин запоминаем до удаления дублей
+CREATE TEMPORARY TABLE basket_cart_merge AS
+SELECT MIN(b.id_basket) AS keep_id, SUM(b.quantity) AS total
+FROM basket b
+JOIN orders o ON o.id_orders = b.id_orders
+WHERE o.status = 'Корзина'
+GROUP BY b.id_orders, b.id_product
+HAVING COUNT(*) > 1;
+
+INSERT IGNORE INTO basket_duplicates
+SELECT b.*
+FROM basket b
+JOIN orders o ON o.id_orders = b.id_orders
+WHERE o.status <> 'Корзина'
+    AND EXISTS (
+        SELECT 1 FROM basket keep
+        WHERE keep.id_orders = b.id_orders
+            AND keep.id_product = b.id_product
+            AND keep.id_basket < b.id_basket
+    );
+
+DELETE b FROM basket b
+JOIN basket keep ON keep.id_orders = b.id_orders
+    AND keep.id_product = b.id_product
+    AND keep.id_basket < b.id_basket;
+
+-- Дублей уже нет, поэтому after_basket_update пересчитает summa корзины без них
+UPDATE basket b
+JOIN basket_cart_merge d ON d.keep_id = b.id_basket
+SET b.quantity = d.total;
+
+DROP TEMPORARY TABLE basket_cart_merge;
+
+ALTER TABLE basket ADD UNIQUE KEY uq_basket_order_product (id_orders, id_product);
+
+-- Индекс id_orders теперь покрывается уникальным ключом
+ALTER TABLE basket DROP KEY id_orders;
+
+-- Если у пользователя несколько корзин, оставляем последнюю, остальные отменяем
+UPDATE orders o
+JOIN (
+    SELECT id_user, MAX(id_orders) AS keep_id
+    FROM orders
+    WHERE status = 'Корзина'
+    GROUP BY id_user
+    HAVING COUNT(*) > 1
+) d ON d.id_user = o.id_user
+SET o.status = 'Отменен'
+WHERE o.status = 'Корзина' AND o.id_orders <> d.keep_id;
+
+ALTER TABLE orders
+    ADD COLUMN open_cart_user int GENERATED ALWAYS AS (IF(status = 'Корзина', id_user, NULL)) STORED,
+    ADD UNIQUE KEY uq_orders_open_cart (open_cart_user);
@@ -0,0 +1,12 @@
+-- Индексы под самые частые фильтры в db_utils:
+-- get_user (tg_user_id), корзина и история заказов (id_user, status), заказы за день (deliv_date).
+-- basket (id_orders, id_product) уже покрыт ключом uq_basket_order_product из 0001.
+
+ALTER TABLE `user` ADD INDEX idx_user_tg_user_id (tg_user_id);
+
+ALTER TABLE orders ADD INDEX idx_orders_user_status (id_user, status);
+
+-- Индекс id_user теперь покрывается idx_orders_user_status
+ALTER TABLE orders DROP INDEX id_user;
+
+ALTER TABLE orders ADD INDEX idx_orders_deliv_date (deliv_date);
@@ -0,0 +1,6 @@
+-- Размеры обработанного фото товара (заполняются utils/images.py).
+
+ALTER TABLE product
+    ADD COLUMN photo_width int DEFAULT NULL,
+    ADD COLUMN photo_height int DEFAULT NULL,
+    ADD COLUMN photo_size int DEFAULT NULL;
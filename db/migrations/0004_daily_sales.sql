@@ -0,0 +1,14 @@
+-- Дневные агрегаты продаж: день оформления, товар, тип доставки.
+-- Обновляются в db_utils вместе с заказом; заполнить по истории: python -m db.daily_sales.
+-- Учитываются оформленные заказы, кроме отменённых (см. db_utils.SALES_EXCLUDED_STATUSES).
+
+CREATE TABLE IF NOT EXISTS daily_sales (
+    sale_date date NOT NULL,
+    id_product int NOT NULL,
+    id_type int NOT NULL DEFAULT 0,
+    orders_count int NOT NULL DEFAULT 0,
+    quantity int NOT NULL DEFAULT 0,
+    revenue decimal(14,2) NOT NULL DEFAULT 0,
+    PRIMARY KEY (sale_date, id_product, id_type),
+    KEY idx_daily_sales_product (id_product)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb3 COLLATE=utf8mb3_unicode_ci;
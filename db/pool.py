@@ -0,0 +1,243 @@
+# db/pool.py
+# Ограниченный пул соединений MySQL с проверкой живости (pre-ping),
+# пересозданием старых соединений (recycle), таймаутом ожидания и статистикой.
+import logging
+import threading
+import time
+from collections import deque
+
+import mysql.connector
+from mysql.connector.errors import PoolError
+
+from db import instrumentation
+
+
+class CountingCursor:
+    """
+    Обёртка над курсором, которая считает выполненные запросы в статистике пула
+    и передаёт запросы и полученные строки в db.instrumentation.
+    """
+
+    def __init__(self, pool, cursor):
+        self._pool = pool
+        self._cursor = cursor
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self._cursor.close()
+
+    def execute(self, operation, *args, **kwargs):
+        self._pool.count_query()
+        instrumentation.note_query(operation)
+        return self._cursor.execute(operation, *args, **kwargs)
+
+    def executemany(self, operation, *args, **kwargs):
+        self._pool.count_query()
+        instrumentation.note_query(operation)
+        return self._cursor.executemany(operation, *args, **kwargs)
+
+    def fetchone(self):
+        row = self._cursor.fetchone()
+        if row is not None:
+            instrumentation.note_rows(1)
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        instrumentation.note_rows(len(rows))
+        return rows
+
+    def fetchall(self):
+        rows = self._cursor.fetchall()
+        instrumentation.note_rows(len(rows))
+        return rows
+
+
+class PooledConnection:
+    """
+    Обёртка над соединением из пула. Всё, кроме close(), проксируется
+    в настоящее соединение; close() возвращает соединение в пул.
+    """
+
+    def __init__(self, pool, connection, created_at):
+        self._pool = pool
+        self._connection = connection
+        self._created_at = created_at
+        self._released = False
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def cursor(self, *args, **kwargs):
+        return CountingCursor(self._pool, self._connection.cursor(*args, **kwargs))
+
+    def close(self):
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._connection, self._created_at)
+
+
+class ConnectionPool:
+    def __init__(self, size, timeout, recycle, pre_ping, **connect_kwargs):
+        """
+        :param size: максимальное количество открытых соединений.
+        :param timeout: сколько секунд ждать свободного соединения.
+        :param recycle: через сколько секунд соединение пересоздаётся.
+        :param pre_ping: после скольких секунд простоя соединение проверяется ping'ом перед выдачей.
+        """
+        self.size = size
+        self.timeout = timeout
+        self.recycle = recycle
+        self.pre_ping = pre_ping
+        self._connect_kwargs = connect_kwargs
+
+        self._idle = deque()  # (connection, created_at, released_at)
+        self._opened = 0
+        self._in_use = 0
+        self._cond = threading.Condition()
+
+        self._acquired_total = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+        self._timeouts = 0
+        self._recycled = 0
+        self._reconnects = 0
+        self._queries = 0
+
+    def _connect(self):
+        return mysql.connector.connect(**self._connect_kwargs)
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.timeout
+        entry = None
+        waited = False
+
+        with self._cond:
+            while True:
+                if self._idle:
+                    # LIFO: отдаём самое "тёплое" соединение, холодные успевают уйти в recycle
+                    entry = self._idle.pop()
+                    break
+                if self._opened < self.size:
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolError(f"Нет свободных соединений в пуле за {self.timeout} с.")
+                waited = True
+                self._cond.wait(remaining)
+
+            self._in_use += 1
+            self._acquired_total += 1
+            wait_time = time.monotonic() - started
+            if waited:
+                self._waits += 1
+            self._wait_time_total += wait_time
+            self._wait_time_max = max(self._wait_time_max, wait_time)
+
+        try:
+            connection, created_at = self._prepare(entry)
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+        instrumentation.note_acquire(time.monotonic() - started)
+        return PooledConnection(self, connection, created_at)
+
+    def _prepare(self, entry):
+        now = time.monotonic()
+        if entry is None:
+            return self._connect(), now
+
+        connection, created_at, released_at = entry
+        if now - created_at > self.recycle:
+            with self._cond:
+                self._recycled += 1
+            self._close_quietly(connection)
+            return self._connect(), now
+
+        if now - released_at > self.pre_ping:
+            try:
+                connection.ping(reconnect=False)
+            except mysql.connector.Error as err:
+                logging.warning(f"Соединение из пула недоступно, переподключаемся: {err}")
+                with self._cond:
+                    self._reconnects += 1
+                self._close_quietly(connection)
+                return self._connect(), now
+
+        return connection, created_at
+
+    def release(self, connection, created_at):
+        healthy = True
+        try:
+            if connection.in_transaction:
+                connection.rollback()
+        except mysql.connector.Error:
+            healthy = False
+
+        with self._cond:
+            self._in_use -= 1
+            if healthy:
+                self._idle.append((connection, created_at, time.monotonic()))
+            else:
+                self._opened -= 1
+                self._close_quietly(connection)
+            self._cond.notify()
+
+    @staticmethod
+    def _close_quietly(connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close_all(self):
+        with self._cond:
+            while self._idle:
+                connection, _, _ = self._idle.pop()
+                self._opened -= 1
+                self._close_quietly(connection)
+
+    def count_query(self):
+        with self._cond:
+            self._queries += 1
+
+    def stats(self):
+        with self._cond:
+            return {
+                "size": self.size,
+                "opened": self._opened,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "acquired_total": self._acquired_total,
+                "waits": self._waits,
+                "wait_time_total": self._wait_time_total,
+                "wait_time_max": self._wait_time_max,
+                "wait_time_avg": self._wait_time_total / self._acquired_total if self._acquired_total else 0.0,
+                "timeouts": self._timeouts,
+                "recycled": self._recycled,
+                "reconnects": self._reconnects,
+                "queries": self._queries,
+            }
@@ -0,0 +1,149 @@
+# db/user_cache.py
+# Кэш пользователей поверх async_db_utils: строки user по tg_user_id (с коротким
+# кэшированием "пользователь не найден"), id открытых корзин и функции корзины,
+# которым нужны id_user и id корзины.
+import logging
+import time
+from collections import OrderedDict
+
+from config import USER_CACHE_TTL, USER_NEGATIVE_CACHE_TTL, USER_CACHE_SIZE, CART_CACHE_TTL
+from db import async_db_utils
+from utils import invalidation
+
+_users = OrderedDict()  # tg_user_id -> (строка user или None, когда запись устареет)
+_carts = OrderedDict()  # id_user -> (id открытой корзины, когда запись устареет)
+
+
+async def get_user(tg_user_id):
+    """
+    Строка user или None, если пользователя нет. Ошибка БД (db_utils.DBError) не кэшируется
+    и пробрасывается: её обрабатывает handlers.user_handlers.db_error_handler.
+    """
+    key = int(tg_user_id)
+    now = time.monotonic()
+    cached = _users.get(key)
+    if cached and cached[1] > now:
+        _users.move_to_end(key)
+        return cached[0]
+
+    user = await async_db_utils.get_user(tg_user_id)
+    ttl = USER_CACHE_TTL if user else USER_NEGATIVE_CACHE_TTL
+    _users[key] = (user, now + ttl)
+    _users.move_to_end(key)
+    if len(_users) > USER_CACHE_SIZE:
+        _users.popitem(last=False)
+    return user
+
+
+async def get_user_id(tg_user_id):
+    user = await get_user(tg_user_id)
+    return user['id_user'] if user else None
+
+
+def _drop_user(tg_user_id):
+    _users.pop(int(tg_user_id), None)
+
+
+invalidation.register("user", _drop_user)
+
+
+def invalidate_user(tg_user_id):
+    invalidation.publish("user", int(tg_user_id))
+
+
+async def register_user(name, phone, tg_user_id):
+    registered = await async_db_utils.register_user(name, phone, tg_user_id)
+    # Сбрасываем в том числе закэшированное "не найден"
+    invalidate_user(tg_user_id)
+    return registered
+
+
+async def _resolve_user_id(tg_user_id):
+    id_user = await get_user_id(tg_user_id)
+    if id_user is None:
+        logging.error(f"Пользователь с tg_user_id {tg_user_id} не найден.")
+    return id_user
+
+
+async def get_cart_id(id_user):
+    """
+    Id открытой корзины пользователя; корзина создаётся, если её ещё нет.
+    """
+    now = time.monotonic()
+    cached = _carts.get(id_user)
+    if cached and cached[1] > now:
+        _carts.move_to_end(id_user)
+        return cached[0]
+
+    cart_id = await async_db_utils.get_or_create_cart(id_user)
+    if cart_id:
+        _carts[id_user] = (cart_id, now + CART_CACHE_TTL)
+        _carts.move_to_end(id_user)
+        if len(_carts) > USER_CACHE_SIZE:
+            _carts.popitem(last=False)
+    return cart_id
+
+
+def invalidate_cart(id_user):
+    # Только в текущем процессе: корзину меняет сам пользователь, а все апдейты его чата
+    # supervisor отдаёт одному процессу
+    _carts.pop(id_user, None)
+
+
+async def add_to_cart(tg_user_id, product_id, quantity):
+    id_user = await _resolve_user_id(tg_user_id)
+    if id_user is None:
+        return False
+
+    # Если закэшированную корзину успели удалить, берём новую и пробуем ещё раз
+    for _ in range(2):
+        cart_id = await get_cart_id(id_user)
+        if cart_id is None:
+            return False
+        added = await async_db_utils.add_to_cart(cart_id, product_id, quantity)
+        if added is not None:
+            return added
+        invalidate_cart(id_user)
+    return False
+
+
+async def get_cart_items(tg_user_id):
+    id_user = await _resolve_user_id(tg_user_id)
+    if id_user is None:
+        return None
+    return await async_db_utils.get_cart_items(id_user)
+
+
+async def update_cart_item_quantity(tg_user_id, product_id, quantity):
+    id_user = await _resolve_user_id(tg_user_id)
+    if id_user is None:
+        return False
+    cart_id = await get_cart_id(id_user)
+    if cart_id is None:
+        return False
+    return await async_db_utils.update_cart_item_quantity(cart_id, product_id, quantity)
+
+
+async def remove_item_from_cart(tg_user_id, product_id):
+    id_user = await _resolve_user_id(tg_user_id)
+    if id_user is None:
+        return False
+    cart_id = await get_cart_id(id_user)
+    if cart_id is None:
+        return False
+    cart_deleted = await async_db_utils.remove_item_from_cart(cart_id, product_id)
+    if cart_deleted:
+        invalidate_cart(id_user)
+    return cart_deleted
+
+
+async def update_order(tg_user_id, delivery_type_id, delivery_address, delivery_time, order_total, cart_items):
+    id_user = await _resolve_user_id(tg_user_id)
+    if id_user is None:
+        return None
+    try:
+        return await async_db_utils.update_order(id_user, delivery_type_id, delivery_address, delivery_time,
+                                                 order_total, cart_items)
+    finally:
+        # Оформленная корзина перестала быть корзиной
+        invalidate_cart(id_user)
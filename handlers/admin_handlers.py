@@ -1,30 +1,39 @@
 import logging
 import os
-from datetime import datetime
+import tempfile
+from datetime import datetime, date, timedelta
 
 from aiogram import types, Dispatcher, F
-from aiogram.filters import Command, StateFilter
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.filters import Command, CommandObject, StateFilter
 from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import any_state
-from aiogram.types import ContentType, ReplyKeyboardRemove
-
-from db.db_utils import get_admin_by_tg_id, register_admin, delete_product, add_product, verify_admin_password, \
-    has_any_admins, get_category_by_name, \
-    get_products_by_category_as_menu, get_product_id_by_name, get_todays_orders, update_order_status, get_order_items
-from keyboards.keyboards import admin_keyboard, categories_keyboard, get_deletion_keyboard, status_keyboard
+from aiogram.types import ContentType, ReplyKeyboardRemove, BufferedInputFile, FSInputFile
+
+from config import PROFILER_MAX_SECONDS
+from db import catalog, export
+from db.instrumentation import format_db_stats
+from db.async_db_utils import delete_product, add_product, has_any_admins, get_product_id_by_name, \
+    get_todays_orders_page, update_order_status, get_daily_sales, run_in_db_executor
+from db.db_utils import get_pool_stats
+from handlers.user_handlers import MENU_UNAVAILABLE
+from keyboards.keyboards import admin_keyboard, categories_keyboard, get_deletion_keyboard, status_keyboard, \
+    orders_page_keyboard, report_keyboard
+from middlewares.metrics import format_handler_stats
 from states.states import Admin
+from utils import images, profiler
+from utils.reports import build_sales_report
+from utils.passwords import register_admin, save_admin, verify_admin_password, login_lockout, hash_password
 from utils.utils import is_admin, delete_saved_messages
 
 
 async def admin_command(message: types.Message, state: FSMContext):
-    admin = get_admin_by_tg_id(message.from_user.id)
-
-    if admin:
+    if await is_admin(message.from_user.id):
         await message.answer("Добро пожаловать в админ-панель!", reply_markup=admin_keyboard())
         logging.info(f"Пользователь {message.from_user.id} вошел в админ-панель")
         return
 
-    if not has_any_admins():
+    if not await has_any_admins():
 
         logging.info(f"Пользователь {message.from_user.id} начал регистрацию администратора")
         await state.set_state(Admin.registering_password)
@@ -38,10 +47,20 @@ async def admin_command(message: types.Message, state: FSMContext):
             "У вас нет доступа в админ-панель. Введите пароль администратора (выдаётся самим администратором):")
 
 
+async def answer_if_locked_out(message: types.Message) -> bool:
+    lockout = login_lockout(message.from_user.id)
+    if lockout:
+        logging.info(f"Пользователь {message.from_user.id} временно заблокирован после неверных паролей")
+        await message.answer(f"Слишком много неверных попыток. Попробуйте через {int(lockout // 60) + 1} мин.")
+        return True
+    return False
+
+
 async def process_admin_registration_password(message: types.Message, state: FSMContext):
-    admin = get_admin_by_tg_id(message.from_user.id)
-    if admin:
-        if verify_admin_password(message.from_user.id, message.text):
+    if await is_admin(message.from_user.id):
+        if await answer_if_locked_out(message):
+            return
+        if await verify_admin_password(message.from_user.id, message.text):
             logging.info(f"Пользователь {message.from_user.id} вошел в админ-панель")
             await message.answer("Пароль верный. Админ панель:", reply_markup=admin_keyboard())
             await state.clear()
@@ -50,16 +69,19 @@ async def process_admin_registration_password(message: types.Message, state: FSM
             await message.answer("Неверный пароль. Попробуйте еще раз.")
 
     else:
-        await state.update_data(password=message.text)
+        # В FSM (хранится на диске) кладём только хэш пароля
+        await state.update_data(password_hash=await hash_password(message.text))
         await message.answer("Введите ваше имя:")
         await state.set_state(Admin.waiting_for_name)
 
 
 async def process_admin_password(message: types.Message, state: FSMContext):
-    if verify_admin_password(message.from_user.id, message.text):
+    if await answer_if_locked_out(message):
+        return
+    if await verify_admin_password(message.from_user.id, message.text):
         logging.info(f"Пользователь {message.from_user.id} вошел в админ-панель")
         await message.answer("Пароль верный. Админ панель:", reply_markup=admin_keyboard())
-        register_admin(password=message.text, tg_user_id=message.from_user.id)
+        await register_admin(password=message.text, tg_user_id=message.from_user.id)
         await state.clear()
 
     else:
@@ -78,10 +100,10 @@ async def process_admin_phone(message: types.Message, state: FSMContext):
     data = await state.get_data()
     name = data['name']
     phone = data['phone']
-    password = data.get('password')
+    password_hash = data.get('password_hash')
     tg_user_id = message.from_user.id
 
-    if register_admin(name=name, phone=phone, tg_user_id=tg_user_id, password=password):
+    if await save_admin(name=name, phone=phone, tg_user_id=tg_user_id, password_hash=password_hash):
         await message.answer("Регистрация администратора прошла успешно!", reply_markup=admin_keyboard())
         await state.clear()
     else:
@@ -92,7 +114,7 @@ async def process_admin_phone(message: types.Message, state: FSMContext):
 async def set_order_status_start(message: types.Message, state: FSMContext):
     data = await state.get_data()
     messages_for_deletion = data.get("messages_for_deletion", [])
-    if not is_admin(message.from_user.id):
+    if not await is_admin(message.from_user.id):
         await message.answer("У вас нет прав доступа.")
         return
     await state.set_state(Admin.waiting_for_order_id)
@@ -112,7 +134,7 @@ async def process_set_order_status_id_entered(message: types.Message, state: FSM
         await message.answer("Неверный формат ID заказа. Введите число.")
         return
     await state.set_state(Admin.waiting_for_order_status)
-    await state.update_data(user_msg=message, messages_for_deletion=messages_for_deletion)
+    await state.update_data(messages_for_deletion=messages_for_deletion)
     await message.answer("Укажите новый статус заказа:", reply_markup=status_keyboard(order_id))
 
 
@@ -120,11 +142,10 @@ async def process_update_order_status(callback_query: types.CallbackQuery, state
     _, _, order_id, status = callback_query.data.split("_")
     order_id = int(order_id)
     status = str(status)
-    data = await state.get_data()
-    updated = update_order_status(order_id, status)
+    updated = await update_order_status(order_id, status)
     if updated:
         await callback_query.message.edit_text(f"Статус заказа №{order_id} обновлён на: {status}")
-        await admin_command(data.get('user_msg'), state)
+        await callback_query.message.answer("Добро пожаловать в админ-панель!", reply_markup=admin_keyboard())
         await delete_saved_messages(callback_query.bot, callback_query.message.chat.id, state)
     else:
         await callback_query.answer("Не удалось обновить статус.", show_alert=True)
@@ -134,11 +155,11 @@ async def process_update_order_status(callback_query: types.CallbackQuery, state
 
 
 async def add_product_start(message: types.Message, state: FSMContext):
-    if not is_admin(message.from_user.id):
+    if not await is_admin(message.from_user.id):
         await message.answer("У вас нет прав доступа.")
         return
 
-    keyboard = categories_keyboard()
+    keyboard = await categories_keyboard()
     if keyboard:
         await state.set_state(Admin.adding_product_category)
         await message.answer("Выберите категорию товара:", reply_markup=keyboard)
@@ -146,8 +167,26 @@ async def add_product_start(message: types.Message, state: FSMContext):
         await message.answer("Не удалось загрузить категории меню.")
 
 
+async def _chosen_category(message: types.Message):
+    """
+    Каталог и категория по тексту кнопки. Если каталог недоступен или такой категории нет,
+    отвечает пользователю, а вместо категории возвращает None.
+    """
+    menu = await catalog.get_catalog()
+    if menu is None:
+        await message.answer(MENU_UNAVAILABLE)
+        return None, None
+    category = menu.get_category_by_name((message.text or "").strip())
+    if category is None:
+        await message.answer("Такой категории нет. Выберите категорию кнопкой ниже.")
+    return menu, category
+
+
 async def add_product_category_chosen(message: types.Message, state: FSMContext):
-    category_id = get_category_by_name(message.text.strip())['id_category']
+    _, category = await _chosen_category(message)
+    if category is None:
+        return
+    category_id = category['id_category']
     await state.update_data(category_id=category_id)
     await state.set_state(Admin.adding_product_name)
     await message.answer("Введите название товара:", reply_markup=ReplyKeyboardRemove())
@@ -176,30 +215,22 @@ async def add_product_price_entered(message: types.Message, state: FSMContext):
 
 
 async def add_product_image_entered(message: types.Message, state: FSMContext):
-    from main import bot
     if not message.photo:
         await message.answer("Пожалуйста, отправьте фотографию товара.")
         return
 
-    # 1. Получаем файл (берём последнее фото - самое качественное)
-    photo = message.photo[-1]
-    file_id = photo.file_id
-    file_info = await bot.get_file(file_id)
-    file_path = file_info.file_path
-
-    # 2. Скачиваем файл
-    local_dir = "resources/images"
-    os.makedirs(local_dir, exist_ok=True)
-
-    # 3. Уникальное имя файла
-    filename = f"{file_id}.jpg"
-    full_path = os.path.join(local_dir, filename)
-
-    # 4. Сохраняем файл локально
-    await bot.download_file(file_path, full_path)
+    # 1-4. Скачиваем самое качественное фото, уменьшаем и пережимаем.
+    # Имя файла - хэш содержимого, так что одно и то же фото хранится один раз, а по этому пути
+    # никогда не окажется другое изображение - сбрасывать file_id в media_cache не нужно
+    try:
+        image = await images.ingest_photo(message.bot, message.photo[-1])
+    except Exception as err:
+        logging.error(f"Ошибка обработки фото товара: {err}")
+        await message.answer("Не удалось обработать фото. Попробуйте отправить другое.")
+        return
 
     # 5. Обновляем состояние FSM
-    await state.update_data(product_image=filename)
+    await state.update_data(product_image=image['photo'])
 
     # 6. Получаем все данные
     data = await state.get_data()
@@ -216,7 +247,9 @@ async def add_product_image_entered(message: types.Message, state: FSMContext):
     # logging.info(f"product_image: {product_image} ({type(product_image)})")
 
     # 7. Сохраняем в БД
-    if add_product(category_id, product_name, product_description, product_price, product_image):
+    if await add_product(category_id, product_name, product_description, product_price, product_image,
+                         image['width'], image['height'], image['size']):
+        catalog.invalidate()
         await message.answer("Товар успешно добавлен!", reply_markup=admin_keyboard())
     else:
         await message.answer("Произошла ошибка при добавлении товара.")
@@ -225,10 +258,10 @@ async def add_product_image_entered(message: types.Message, state: FSMContext):
 
 
 async def delete_product_start(message: types.Message, state: FSMContext):
-    if not is_admin(message.from_user.id):
+    if not await is_admin(message.from_user.id):
         await message.answer("У вас нет прав доступа.")
         return
-    keyboard = categories_keyboard()
+    keyboard = await categories_keyboard()
     if keyboard:
         await state.set_state(Admin.deleting_product_category)
         await message.answer("Выберите категорию в которой хотите удалить товар:", reply_markup=keyboard)
@@ -237,10 +270,13 @@ async def delete_product_start(message: types.Message, state: FSMContext):
 
 
 async def delete_product_category_chosen(message: types.Message, state: FSMContext):
-    category_id = get_category_by_name(message.text.strip())['id_category']
-    products = get_products_by_category_as_menu(category_id)
+    menu, category = await _chosen_category(message)
+    if category is None:
+        return
+    category_id = category['id_category']
+    products = menu.get_products_by_category(category_id)
     if products:
-        keyboard = get_deletion_keyboard(category_id)
+        keyboard = await get_deletion_keyboard(category_id)
         await state.set_state(Admin.deleting_product_confirmation)
         await message.answer("Выберите товар для удаления:", reply_markup=keyboard)
 
@@ -249,60 +285,262 @@ async def delete_product_category_chosen(message: types.Message, state: FSMConte
 
 
 async def delete_product_confirmation(message: types.Message, state: FSMContext):
-    product_id = get_product_id_by_name(message.text.strip())['id_product']
-    if delete_product(product_id):
+    product_id = (await get_product_id_by_name(message.text.strip()))['id_product']
+    if await delete_product(product_id):
+        catalog.invalidate()
         await message.answer("Товар успешно удален!", reply_markup=admin_keyboard())
         await state.clear()
     else:
         await message.answer("Ошибка при удалении товара.")
 
 
-async def view_orders(message: types.Message, state: FSMContext):
-    orders = get_todays_orders()
-    if orders:
-        order_details = ""
-        for order in orders:
-            order_items = get_order_items(order['id_orders'])
-            delivery_time = (datetime.min + order['delivery_time']).time()
-            deliv_time = (
-                delivery_time.strftime('%H:%M') if delivery_time.strftime('%H:%M') != order[
-                    'deliv_date'].time().strftime('%H:%M')
-                else "Как можно скорее"
-            )
+ORDERS_PAGE_SIZE = 5
 
-            # Форматируем состав заказа
-            items_text = ""
-            for item in order_items:
-                items_text += f"  • {item['name']} × {item['quantity']} = {item['price_to_quan']}₽\n"
-
-            order_details += (
-                f"📦 ID Заказа: {order['id_orders']}\n"
-                f"🔄 Статус: {order['status']}\n"
-                f"📅 Дата оформления: {order['deliv_date'].strftime('%d.%m.%Y %H:%M')}\n"
-                f"🚚 Тип доставки: {order['delivery_type']}\n"
-                f"💳 Сумма: {order['summa']}₽\n"
-                f"📱 Телефон: {order['phone']}\n"
-                f"👤 Имя пользователя: {order['name']}\n"
-                f"⏱ Время готовности: {deliv_time}\n"
-                f"🏠 Адрес доставки: {order['adress'] if order['adress'] else '—'}\n\n"
-                f"🛒 Состав заказа:\n{items_text}\n"
-                "___________________________\n\n"
-            )
 
-        # Разбиваем сообщение, если оно слишком длинное
-        if len(order_details) > 4000:
-            for chunk in [order_details[i:i + 4000] for i in range(0, len(order_details), 4000)]:
-                await message.answer(chunk)
-        else:
-            await message.answer(f"📊 Заказы за сегодня:\n\n{order_details}")
+# Ограничение Telegram на длину текста сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+
+def _text_length(text):
+    # Telegram считает длину в UTF-16: эмодзи занимают две позиции
+    return len(text.encode("utf-16-le")) // 2
+
+
+def format_order(order, max_length=None) -> str:
+    """
+    :param max_length: если задано и заказ не помещается, состав обрезается до этой длины.
+    """
+    delivery_time = (datetime.min + order['delivery_time']).time()
+    deliv_time = (
+        delivery_time.strftime('%H:%M') if delivery_time.strftime('%H:%M') != order[
+            'deliv_date'].time().strftime('%H:%M')
+        else "Как можно скорее"
+    )
+
+    head = (
+        f"📦 ID Заказа: {order['id_orders']}\n"
+        f"🔄 Статус: {order['status']}\n"
+        f"📅 Дата оформления: {order['deliv_date'].strftime('%d.%m.%Y %H:%M')}\n"
+        f"🚚 Тип доставки: {order['delivery_type']}\n"
+        f"💳 Сумма: {order['summa']}₽\n"
+        f"📱 Телефон: {order['phone']}\n"
+        f"👤 Имя пользователя: {order['name']}\n"
+        f"⏱ Время готовности: {deliv_time}\n"
+        f"🏠 Адрес доставки: {order['adress'] if order['adress'] else '—'}\n\n"
+        f"🛒 Состав заказа:\n"
+    )
+    tail = "\n___________________________\n\n"
+
+    # Форматируем состав заказа
+    items = [f"  • {item['name']} × {item['quantity']} = {item['price_to_quan']}₽\n" for item in order['items']]
+    items_text = "".join(items)
+    if max_length is not None and _text_length(head + items_text + tail) > max_length:
+        budget = max_length - _text_length(head + tail) - len("  … и ещё 0000 поз.\n")
+        shown = 0
+        for item in items:
+            if _text_length(item) > budget:
+                break
+            budget -= _text_length(item)
+            shown += 1
+        items_text = "".join(items[:shown]) + f"  … и ещё {len(items) - shown} поз.\n"
+    return head + items_text + tail
+
+
+async def render_orders_page(cursor_id=None, direction="next"):
+    page = await get_todays_orders_page(cursor_id, direction, ORDERS_PAGE_SIZE)
+    if not page or not page['orders']:
+        return None, None
+
+    # На страницу попадает столько заказов, сколько помещается в одно сообщение
+    text = "📊 Заказы за сегодня:\n\n"
+    orders = []
+    for order in page['orders']:
+        block = format_order(order)
+        if _text_length(text + block) > MAX_MESSAGE_LENGTH:
+            if orders:
+                break
+            block = format_order(order, max_length=MAX_MESSAGE_LENGTH - _text_length(text))
+        text += block
+        orders.append(order)
+    trimmed = len(orders) < len(page['orders'])
+
+    if direction == "prev":
+        has_prev, has_next = page['has_more'], True
+    else:
+        has_prev, has_next = cursor_id is not None, page['has_more'] or trimmed
+
+    keyboard = orders_page_keyboard(orders[0]['id_orders'], orders[-1]['id_orders'], has_prev, has_next)
+    return text, keyboard
+
+
+async def view_orders(message: types.Message, state: FSMContext):
+    if not await is_admin(message.from_user.id):
+        await message.answer("У вас нет прав доступа.")
+        return
+
+    text, keyboard = await render_orders_page()
+    if text:
+        await message.answer(text, reply_markup=keyboard)
     else:
         await message.answer("ℹ️ Заказы за сегодняшний день не найдены.")
 
 
+async def process_orders_page(callback_query: types.CallbackQuery):
+    if not await is_admin(callback_query.from_user.id):
+        await callback_query.answer("У вас нет прав доступа.", show_alert=True)
+        return
+
+    _, _, direction, cursor_id = callback_query.data.split("_")
+    text, keyboard = await render_orders_page(int(cursor_id), direction)
+    if text:
+        try:
+            await callback_query.message.edit_text(text, reply_markup=keyboard)
+        except TelegramBadRequest as err:
+            # Повторное нажатие на кнопку той же страницы - не ошибка
+            if "message is not modified" not in str(err):
+                raise
+        await callback_query.answer()
+    else:
+        await callback_query.answer("Больше заказов нет.")
+
+
+async def render_sales_report(days):
+    today = date.today()
+    rows = await get_daily_sales(today - timedelta(days=2 * days - 1), today)
+    if rows is None:
+        return None
+    return build_sales_report(rows, today, days)
+
+
+async def sales_report(message: types.Message):
+    if not await is_admin(message.from_user.id):
+        await message.answer("У вас нет прав доступа.")
+        return
+
+    text = await render_sales_report(7)
+    if text is None:
+        await message.answer("Не удалось построить отчёт. Попробуйте позже.")
+        return
+    await message.answer(text, reply_markup=report_keyboard(7))
+
+
+async def process_report_period(callback_query: types.CallbackQuery):
+    if not await is_admin(callback_query.from_user.id):
+        await callback_query.answer("У вас нет прав доступа.", show_alert=True)
+        return
+
+    days = int(callback_query.data.split("_")[1])
+    text = await render_sales_report(days)
+    if text is None:
+        await callback_query.answer("Не удалось построить отчёт.", show_alert=True)
+        return
+    if text != callback_query.message.text:
+        await callback_query.message.edit_text(text, reply_markup=report_keyboard(days))
+    await callback_query.answer()
+
+
+# Ограничение Bot API на размер отправляемого ботом файла
+MAX_DOCUMENT_SIZE = 50 * 1024 * 1024
+
+
+async def export_command(message: types.Message, command: CommandObject):
+    if not await is_admin(message.from_user.id):
+        await message.answer("У вас нет прав доступа.")
+        return
+
+    args = (command.args or "").split()
+    month = next((arg for arg in args if arg not in export.FORMATS), export.previous_month())
+    fmt = next((arg for arg in args if arg in export.FORMATS), "csv")
+    try:
+        date_from, date_to = export.month_range(month)
+    except ValueError:
+        await message.answer("Использование: /export [ГГГГ-ММ] [csv|parquet]. По умолчанию - прошлый месяц в CSV.")
+        return
+
+    await message.answer(f"Готовлю выгрузку заказов за {month}...")
+    logging.info(f"Администратор {message.from_user.id} запросил выгрузку заказов за {month} ({fmt})")
+    fd, path = tempfile.mkstemp(prefix=f"orders_{month}_", suffix=f".{fmt}")
+    os.close(fd)
+    try:
+        try:
+            count = await run_in_db_executor(export.export_orders, path, fmt, date_from, date_to)
+        except RuntimeError as err:
+            await message.answer(str(err))
+            return
+        if count is None:
+            await message.answer("Не удалось выгрузить заказы. Попробуйте позже.")
+        elif count == 0:
+            await message.answer(f"За {month} заказов нет.")
+        elif os.path.getsize(path) > MAX_DOCUMENT_SIZE:
+            await message.answer("Файл больше 50 МБ и не может быть отправлен ботом. "
+                                 "Используйте python -m db.export на сервере или формат parquet.")
+        else:
+            await message.answer_document(
+                FSInputFile(path, filename=f"orders_{month.replace('-', '_')}.{fmt}"),
+                caption=f"Заказы за {month}: {count} позиций"
+            )
+    finally:
+        os.remove(path)
+
+
+async def db_stats_command(message: types.Message):
+    if not await is_admin(message.from_user.id):
+        await message.answer("У вас нет прав доступа.")
+        return
+
+    pool_stats = get_pool_stats()
+    await message.answer(
+        format_db_stats() +
+        f"\n\nПул: занято {pool_stats['in_use']} из {pool_stats['size']}, свободно {pool_stats['idle']}, "
+        f"ожиданий {pool_stats['waits']}, таймаутов {pool_stats['timeouts']}"
+    )
+
+
+async def handler_stats_command(message: types.Message):
+    if not await is_admin(message.from_user.id):
+        await message.answer("У вас нет прав доступа.")
+        return
+
+    await message.answer(format_handler_stats())
+
+
+async def profiler_command(message: types.Message, command: CommandObject):
+    if not await is_admin(message.from_user.id):
+        await message.answer("У вас нет прав доступа.")
+        return
+
+    try:
+        seconds = int(command.args) if command.args else 10
+    except ValueError:
+        seconds = 0
+    if not 1 <= seconds <= PROFILER_MAX_SECONDS:
+        await message.answer(f"Использование: /profiler N, где N - число секунд от 1 до {PROFILER_MAX_SECONDS}.")
+        return
+
+    await message.answer(f"Профилирую {seconds} с...")
+    logging.info(f"Администратор {message.from_user.id} запустил профилировщик на {seconds} с")
+    try:
+        profile = await profiler.profile_for(seconds)
+    except profiler.ProfilerBusy:
+        await message.answer("Профилировщик уже запущен, дождитесь результата.")
+        return
+
+    await message.answer(profiler.format_profile(profile))
+    filename = f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+    await message.answer_document(
+        BufferedInputFile(profile.folded().encode("utf-8"), filename=filename),
+        caption="Стеки в формате folded (flamegraph.pl, speedscope)"
+    )
+
+
 def register_admin_handlers(dp: Dispatcher):
     # Команды управления админ-панелью
     dp.message.register(admin_command, F.text == "Админ-панель")
     dp.message.register(admin_command, Command("admin"))
+    dp.message.register(db_stats_command, Command("dbstats"))
+    dp.message.register(handler_stats_command, Command("stats"))
+    dp.message.register(profiler_command, Command("profiler"))
+    dp.message.register(export_command, Command("export"))
     dp.message.register(
         admin_command,
         F.text == "Назад",
@@ -336,6 +574,9 @@ def register_admin_handlers(dp: Dispatcher):
     dp.message.register(delete_product_category_chosen, StateFilter(Admin.deleting_product_category))
     dp.message.register(delete_product_confirmation, StateFilter(Admin.deleting_product_confirmation))
     dp.message.register(view_orders, F.text == "Посмотреть заказы")
+    dp.message.register(sales_report, F.text == "Отчёт")
+    dp.callback_query.register(process_orders_page, F.data.startswith("orders_page_"))
+    dp.callback_query.register(process_report_period, F.data.startswith("report_"))
     dp.message.register(set_order_status_start, F.text == "Изменить статус заказа")
     dp.message.register(process_set_order_status_id_entered, StateFilter(Admin.waiting_for_order_id))
     dp.callback_query.register(process_update_order_status, F.data.startswith("update_status_"))
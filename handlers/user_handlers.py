@@ -1,31 +1,59 @@
+import logging
 import os
 import re
 from datetime import datetime
 
 from aiogram import types, Dispatcher, F
-from aiogram.filters import Command, StateFilter
+from aiogram.filters import Command, CommandObject, ExceptionTypeFilter, StateFilter
 from aiogram.fsm.context import FSMContext
-from aiogram.types import FSInputFile
 
-from db.db_utils import get_user, register_user, get_category_by_name, get_products_by_category, get_order_history, \
-    get_order_items, get_order_status, update_order, get_product_details, get_delivery_types, add_to_cart, \
-    get_cart_items, update_cart_item_quantity, get_menu_categories, get_delivery_price, remove_item_from_cart, \
-    cancel_order_by_id
+from config import CATEGORY_VIEW, IMAGES_DIR, INLINE_CACHE_TIME
+from db.async_db_utils import get_order_history_with_items, get_order_status, cancel_order_by_id
+from db.catalog import get_catalog
+from db.db_utils import DBError
+from db.user_cache import get_user, register_user, add_to_cart, get_cart_items, update_order, \
+    update_cart_item_quantity, remove_item_from_cart
 from keyboards.keyboards import nav_keyboard, categories_keyboard, get_delivery_type_markup, \
     delivery_time_keyboard, add_select_button, add_cancel_select_button, add_order_button, \
     add_accept_data_processing_button, generate_edit_cart_keyboard, generate_edit_actions_keyboard, \
-    add_cancel_order_keyboard
+    add_cancel_order_keyboard, carousel_keyboard, inline_product_keyboard
 from states.states import Registration, Order, Admin
+from utils import media_cache
+from utils.search import search_products
 from utils.utils import is_admin, delete_saved_messages
 
-category_names = [i[1] for i in get_menu_categories()]
+# Ответ, когда каталог не удалось загрузить из БД (get_catalog() вернул None)
+MENU_UNAVAILABLE = "Меню временно недоступно, попробуйте позже."
+SERVICE_UNAVAILABLE = "Сервис временно недоступен, попробуйте позже."
+
+async def category_filter(message: types.Message):
+    """
+    Пропускает сообщения с названием категории из каталога и передаёт найденную категорию в обработчик.
+    Каталог загружается лениво и обновляется вместе с кэшем, поэтому новые категории видны без перезапуска.
+    """
+    if not message.text:
+        return False
+    catalog = await get_catalog()
+    category = catalog.get_category_by_name(message.text.strip()) if catalog else None
+    if category is None:
+        return False
+    return {'category': category}
 
 
-async def start_command(message: types.Message, state: FSMContext):
-    user = get_user(message.from_user.id)
+async def start_command(message: types.Message, state: FSMContext, command: CommandObject):
+    user = await get_user(message.from_user.id)
     if user:
         await message.answer("Привет! Рад видеть вас снова в 5 Вкусов! Используйте /nav для навигации.",
                              reply_markup=nav_keyboard())
+        # Переход из результата inline-поиска: /start product_<id>
+        if command.args and command.args.startswith("product_") and command.args[8:].isdigit():
+            catalog = await get_catalog()
+            if catalog is None:
+                await message.answer(MENU_UNAVAILABLE)
+                return
+            product = catalog.products_by_id.get(int(command.args[8:]))
+            if product:
+                await send_product(message, product, add_select_button(product['id_product']))
     else:
         await message.answer(
             "Привет! Похоже, вы впервые здесь. Пожалуйста, пройдите регистрацию, чтобы пользоваться ботом.",
@@ -52,7 +80,7 @@ async def process_phone(message: types.Message, state: FSMContext):
         return
     tg_user_id = message.from_user.id
 
-    if register_user(name, phone, tg_user_id):
+    if await register_user(name, phone, tg_user_id):
         await message.answer("Регистрация прошла успешно!", reply_markup=nav_keyboard())
     else:
         await message.answer("Произошла ошибка при регистрации. Попробуйте позже.")
@@ -61,15 +89,15 @@ async def process_phone(message: types.Message, state: FSMContext):
 
 
 async def nav_command(message: types.Message):
-    user = get_user(message.from_user.id)
+    user = await get_user(message.from_user.id)
     if not user:
         await message.answer("Пожалуйста, зарегистрируйтесь, чтобы просмотреть меню. Используйте /start.")
         return
-    await message.answer("Выберите действие:", reply_markup=nav_keyboard(is_admin=is_admin(message.from_user.id)))
+    await message.answer("Выберите действие:", reply_markup=nav_keyboard(is_admin=await is_admin(message.from_user.id)))
 
 
 async def profile_command(message: types.Message):
-    user = get_user(message.from_user.id)
+    user = await get_user(message.from_user.id)
     if user:
         profile_text = f"Ваш профиль:\nИмя: {user['name']}\nТелефон: {user['phone']}\nID: {user['tg_user_id']}"
         await message.answer(profile_text)
@@ -78,74 +106,217 @@ async def profile_command(message: types.Message):
 
 
 async def view_menu(message: types.Message):
-    user = get_user(message.from_user.id)
+    user = await get_user(message.from_user.id)
     if user:
-        keyboard = categories_keyboard()
+        keyboard = await categories_keyboard()
         await message.answer("Выберите категорию:", reply_markup=keyboard)
     else:
         await message.answer("Пожалуйста, зарегистрируйтесь, чтобы просмотреть меню. Используйте /start.")
 
 
-async def process_category(message: types.Message):
-    user = get_user(message.from_user.id)
+def product_caption(product):
+    name = product['name']
+    description = product.get('descript', 'Описание отсутствует.')
+    price = product['price']
+    return (
+        f"<b>Название:</b> {name}\n\n"
+        f"<b>Описание:</b> {description}\n\n"
+        f"<b>Цена:</b> {price}₽"
+    )
+
+
+def product_photo_path(product):
+    """
+    Путь к фото товара или None, если фото нет.
+    """
+    photo = product['photo']
+    if not photo:
+        return None
+    photo_path = os.path.join(IMAGES_DIR, photo)
+    if not os.path.exists(photo_path):
+        return None
+    return photo_path
+
+
+async def process_category(message: types.Message, category: dict):
+    user = await get_user(message.from_user.id)
     if not user:
         await message.answer("Пожалуйста, зарегистрируйтесь, чтобы просмотреть меню. Используйте /start.")
         return
-    category_name = message.text.strip()
 
-    if category_name == "Назад":
-        await message.answer("Вы вернулись в главное меню.")
+    catalog = await get_catalog()
+    if catalog is None:
+        await message.answer(MENU_UNAVAILABLE)
         return
-
-    category = get_category_by_name(category_name)
-    if category is None:
-        await message.answer("Категория не найдена.")
-        return
-
-    products = get_products_by_category(category['id_category'])
+    products = catalog.get_products_by_category(category['id_category'])
 
     if not products:
         await message.answer("В этой категории пока нет товаров.")
         return
 
+    if CATEGORY_VIEW == "carousel":
+        await show_carousel_item(message, category['id_category'], 0)
+        return
+
     for product in products:
-        name = product['name']
-        description = product.get('descript', 'Описание отсутствует.')
-        price = product['price']
-        photo = product['photo']
-        photo_path = "resources/images/" + product['photo']
-
-        caption = (
-            f"<b>Название:</b> {name}\n\n"
-            f"<b>Описание:</b> {description}\n\n"
-            f"<b>Цена:</b> {price}₽"
+        await send_product(message, product, add_select_button(product['id_product']))
+
+
+async def send_product(message: types.Message, product, keyboard):
+    caption = product_caption(product)
+    photo_path = product_photo_path(product)
+
+    # Проверим наличие файла
+    if photo_path is None:
+        await message.answer(
+            "<b>Странно, но фото нет...</b>\n\n" +
+            caption,
+            parse_mode="HTML",
+            reply_markup=keyboard
         )
+        return
 
-        # Проверим наличие файла
-        if not os.path.exists(photo_path) or not photo:
-            await message.answer(
-                "<b>Странно, но фото нет...</b>\n\n" +
-                caption,
-                parse_mode="HTML",
-                reply_markup=add_select_button(product['id_product'])
-            )
-            continue
+    await media_cache.answer_photo(message, photo_path, caption=caption, parse_mode="HTML",
+                                   reply_markup=keyboard)
 
-        photo = FSInputFile(photo_path)
 
-        await message.answer_photo(photo=photo, caption=caption, parse_mode="HTML",
-                                   reply_markup=add_select_button(product['id_product']))
+async def get_carousel_keyboard(category_id, index):
+    """
+    Клавиатура карусели для товара под номером index; None, если такого товара уже нет.
+    """
+    catalog = await get_catalog()
+    if catalog is None:
+        return None
+    products = catalog.get_products_by_category(category_id)
+    if not products:
+        return None
+    index %= len(products)
+    product_id = products[index]['id_product']
+    return catalog.memoize(
+        ("carousel", int(category_id), index),
+        lambda: carousel_keyboard(int(category_id), index, len(products), product_id)
+    )
+
+
+async def show_carousel_item(message: types.Message, category_id, index, edit=False):
+    """
+    Показывает товар категории в карусели. При edit=True сообщение карусели
+    редактируется на месте, иначе отправляется новое.
+    """
+    catalog = await get_catalog()
+    if catalog is None:
+        return False
+    products = catalog.get_products_by_category(category_id)
+    if not products:
+        return False
+    index %= len(products)
+    product = products[index]
+    caption = product_caption(product)
+    photo_path = product_photo_path(product)
+    keyboard = await get_carousel_keyboard(category_id, index)
+
+    if edit:
+        if photo_path and message.photo:
+            await media_cache.edit_photo(message, photo_path, caption=caption, parse_mode="HTML",
+                                         reply_markup=keyboard)
+            return True
+        if photo_path is None and not message.photo:
+            await message.edit_text("<b>Странно, но фото нет...</b>\n\n" + caption, parse_mode="HTML",
+                                    reply_markup=keyboard)
+            return True
+        # Фото нельзя заменить текстом и наоборот - отправляем карусель заново
+        try:
+            await message.delete()
+        except Exception:
+            pass
+
+    if photo_path is None:
+        await message.answer("<b>Странно, но фото нет...</b>\n\n" + caption, parse_mode="HTML",
+                             reply_markup=keyboard)
+    else:
+        await media_cache.answer_photo(message, photo_path, caption=caption, parse_mode="HTML",
+                                       reply_markup=keyboard)
+    return True
+
+
+async def process_carousel(callback_query: types.CallbackQuery):
+    _, category_id, index = callback_query.data.split('_')
+    if await get_catalog() is None:
+        await callback_query.answer(MENU_UNAVAILABLE)
+        return
+    if await show_carousel_item(callback_query.message, int(category_id), int(index), edit=True):
+        await callback_query.answer()
+    else:
+        await callback_query.answer("В этой категории пока нет товаров.")
+
+
+# Telegram принимает не больше 50 результатов в одном ответе на inline-запрос
+INLINE_PAGE_SIZE = 50
+
+
+async def process_inline_query(inline_query: types.InlineQuery):
+    """
+    Inline-поиск по меню. Товары берутся из индекса каталога, фото - по file_id из media_cache,
+    поэтому запрос не обращается ни к БД, ни к диску с изображениями (кроме проверки file_id).
+    Товары, фото которых бот ещё ни разу не отправлял, показываются текстом.
+    """
+    offset = int(inline_query.offset) if inline_query.offset.isdigit() else 0
+    products = await search_products(inline_query.query)
+    page = products[offset:offset + INLINE_PAGE_SIZE]
+    bot_username = (await inline_query.bot.me()).username
+
+    results = []
+    for product in page:
+        caption = product_caption(product)
+        keyboard = inline_product_keyboard(bot_username, product['id_product'])
+        photo_path = product_photo_path(product)
+        file_id = media_cache.get_file_id(photo_path) if photo_path else None
+        description = f"{product['price']}₽ · {product.get('descript') or ''}"[:100]
+        if file_id:
+            results.append(types.InlineQueryResultCachedPhoto(
+                id=str(product['id_product']), photo_file_id=file_id, title=product['name'],
+                description=description, caption=caption, parse_mode="HTML", reply_markup=keyboard
+            ))
+        else:
+            results.append(types.InlineQueryResultArticle(
+                id=str(product['id_product']), title=product['name'], description=description,
+                input_message_content=types.InputTextMessageContent(message_text=caption, parse_mode="HTML"),
+                reply_markup=keyboard
+            ))
+
+    next_offset = str(offset + INLINE_PAGE_SIZE) if offset + INLINE_PAGE_SIZE < len(products) else ""
+    await inline_query.answer(results, cache_time=INLINE_CACHE_TIME, is_personal=False, next_offset=next_offset)
+
+
+async def process_noop(callback_query: types.CallbackQuery):
+    await callback_query.answer()
+
+
+async def select_product_keyboard(data):
+    """
+    Клавиатура, которую нужно вернуть сообщению товара после выбора количества или отмены.
+    """
+    carousel = data.get('carousel')
+    if carousel:
+        keyboard = await get_carousel_keyboard(*carousel)
+        if keyboard:
+            return keyboard
+    return add_select_button(data.get('product_id'))
 
 
 async def process_select_product(callback_query: types.CallbackQuery, state: FSMContext):
-    product_id = callback_query.data.split('_')[1]
+    parts = callback_query.data.split('_')
+    product_id = parts[1]
+    # Из карусели приходит order_<товар>_<категория>_<номер>: запоминаем, куда вернуть клавиатуру
+    carousel = [int(parts[2]), int(parts[3])] if len(parts) == 4 else None
     await state.set_state(Order.waiting_for_quantity)
 
     msg = await callback_query.message.answer("Выберите количество:", reply_markup=types.ReplyKeyboardRemove())
     await state.update_data(
         product_id=product_id,
         message_id=msg.message_id,
-        inline_msg=callback_query.message.message_id
+        inline_msg=callback_query.message.message_id,
+        carousel=carousel
     )
 
     await callback_query.message.edit_reply_markup(
@@ -159,7 +330,7 @@ async def process_cancel_select(callback_query: types.CallbackQuery, state: FSMC
     data = await state.get_data()
     msg_id = data.get('message_id')
     await callback_query.message.edit_reply_markup(
-        reply_markup=add_select_button(data.get('product_id'))
+        reply_markup=await select_product_keyboard(data)
     )
 
     if msg_id:
@@ -201,18 +372,16 @@ async def process_quantity(message: types.Message, state: FSMContext):
     except Exception:
         pass
 
-    from main import bot
     inline_id = data.get('inline_msg')
-    await bot.edit_message_reply_markup(
+    await message.bot.edit_message_reply_markup(
         chat_id=message.chat.id,
         message_id=inline_id,
-        reply_markup=add_select_button(product_id)
+        reply_markup=await select_product_keyboard(data)
     )
-    if add_to_cart(message.from_user.id, product_id, quantity):
-        # бот импортируется посреди кода, потому что иначе начнётся циклический импорт и всё упадёт
+    if await add_to_cart(message.from_user.id, product_id, quantity):
         await state.clear()
         await message.answer("Товар добавлен в корзину!\nКоличество: " + str(quantity),
-                             reply_markup=categories_keyboard())
+                             reply_markup=await categories_keyboard())
     else:
         await state.clear()
         await message.answer("Не удалось добавить товар в корзину.")
@@ -220,20 +389,16 @@ async def process_quantity(message: types.Message, state: FSMContext):
 
 async def view_order_history(message: types.Message):
     tg_user_id = message.from_user.id
-    orders = get_order_history(tg_user_id)
+    orders = await get_order_history_with_items(tg_user_id)
 
     if orders:
         text = "Ваша история заказов:\n"
         for order in orders:
-            order_items = get_order_items(order['id_orders'])
             items_text = ""
-            total_sum = 0
 
-            for item in order_items:
-                product_details = get_product_details(item['id_product'])
-                if product_details:
-                    items_text += f"- {product_details['name']} x {item['quantity']} ({item['price_to_quan']} руб.)\n"
-                    total_sum += float(item['price_to_quan'])
+            for item in order['items']:
+                if item['name'] is not None:
+                    items_text += f"- {item['name']} x {item['quantity']} ({item['price_to_quan']} руб.)\n"
                 else:
                     items_text += f"- Product ID: {item['id_product']} x {item['quantity']} (Цена неизвестна)\n"
 
@@ -246,14 +411,14 @@ async def view_order_history(message: types.Message):
 Тип доставки: {order['name']}
 ------------------------
 """
-        await message.answer(text, reply_markup=add_cancel_order_keyboard(tg_user_id))
+        await message.answer(text, reply_markup=add_cancel_order_keyboard(orders))
     else:
         await message.answer("У вас пока нет заказов.")
 
 
 async def view_order_status(message: types.Message):
     tg_user_id = message.from_user.id
-    order_info = get_order_status(tg_user_id)
+    order_info = await get_order_status(tg_user_id)
     if order_info:
         status, deliv_dt = order_info
         formatted_date = deliv_dt.strftime("%d/%m/%Y %H:%M")
@@ -264,7 +429,7 @@ async def view_order_status(message: types.Message):
 
 async def view_cart(message: types.Message, state: FSMContext):
     tg_user_id = message.from_user.id
-    cart_items = get_cart_items(tg_user_id)
+    cart_items = await get_cart_items(tg_user_id)
 
     if cart_items:
         total_amount = 0
@@ -273,7 +438,11 @@ async def view_cart(message: types.Message, state: FSMContext):
             cart_text += f"- {item['product_name']} x {item['quantity']} ({item['product_price'] * item['quantity']} руб.)\n"
             total_amount += item['product_price'] * item['quantity']
 
-        delivery_price = get_delivery_price(2)
+        catalog = await get_catalog()
+        if catalog is None:
+            await message.answer(MENU_UNAVAILABLE)
+            return
+        delivery_price = catalog.get_delivery_price(2)
         print(delivery_price)
         cart_text += f"\nДоставка: {0 if total_amount > 1000 else delivery_price} руб."
         cart_text += f"\n\nОбщая сумма: {total_amount if total_amount > 1000 else total_amount + delivery_price} руб."
@@ -306,7 +475,7 @@ async def process_new_quantity(message: types.Message, state: FSMContext):
         state_data = await state.get_data()
         cart_item_id = state_data.get('cart_item_id')
         print(cart_item_id, quantity, message.from_user.id)
-        if update_cart_item_quantity(message.from_user.id, cart_item_id, quantity):
+        if await update_cart_item_quantity(message.from_user.id, cart_item_id, quantity):
             await message.answer("Количество товара в корзине обновлено.")
         else:
             await message.answer("Не удалось обновить количество товара.")
@@ -319,7 +488,7 @@ async def process_new_quantity(message: types.Message, state: FSMContext):
 
 async def edit_cart(callback_query: types.CallbackQuery, state: FSMContext):
     tg_user_id = callback_query.from_user.id
-    cart_items = get_cart_items(tg_user_id)
+    cart_items = await get_cart_items(tg_user_id)
 
     if not cart_items:
         await callback_query.answer("Ваша корзина пуста! Нечего редактировать.")
@@ -344,7 +513,7 @@ async def back_to_cart(callback_query: types.CallbackQuery, state: FSMContext):
 
 async def process_checkout(callback_query: types.CallbackQuery, state: FSMContext):
     tg_user_id = callback_query.from_user.id
-    cart_items = get_cart_items(tg_user_id)
+    cart_items = await get_cart_items(tg_user_id)
 
     if not cart_items:
         await callback_query.answer("Ваша корзина пуста! Нечего оформлять.")
@@ -354,7 +523,7 @@ async def process_checkout(callback_query: types.CallbackQuery, state: FSMContex
     await state.set_state(Order.choosing_delivery_type)
     await callback_query.message.edit_text(
         text=f"{cart_text}\n\nВыберите тип доставки:",
-        reply_markup=get_delivery_type_markup()
+        reply_markup=await get_delivery_type_markup()
     )
     await callback_query.answer()
 
@@ -364,7 +533,11 @@ async def process_delivery_type(callback_query: types.CallbackQuery, state: FSMC
     messages_for_deletion = data.get("messages_for_deletion", [])
     delivery_type_id = callback_query.data.split('_')[-1]
     await state.update_data(delivery_type_id=delivery_type_id)
-    delivery_type_info = get_delivery_types()
+    catalog = await get_catalog()
+    if catalog is None:
+        await callback_query.answer(MENU_UNAVAILABLE)
+        return
+    delivery_type_info = catalog.delivery_types
     delivery_info = next((item for item in delivery_type_info if item['id_type'] == int(delivery_type_id)), None)
     if delivery_info:
         await state.update_data(delivery_type=delivery_info['name'])
@@ -408,8 +581,9 @@ async def process_delivery_time(callback_query: types.CallbackQuery, state: FSMC
     if delivery_time_choice.lower() == "asap":
         await state.update_data(delivery_time="ASAP")
         await state.set_state(Order.accepting_data_processing)
-        msg = await callback_query.message.answer_document(
-            document=FSInputFile("resources/Согласие_на_обработку_персональных_данных.pdf"),
+        msg = await media_cache.answer_document(
+            callback_query.message,
+            "resources/Согласие_на_обработку_персональных_данных.pdf",
             caption="Для завершения оформления заказа необходимо согласие на обработку персональных данных.",
             reply_markup=add_accept_data_processing_button(),
         )
@@ -433,17 +607,23 @@ async def process_data_processing(callback_query: types.CallbackQuery, state: FS
     delivery_time = data['delivery_time']
     tg_user_id = callback_query.from_user.id
 
-    cart_items = get_cart_items(tg_user_id)
+    cart_items = await get_cart_items(tg_user_id)
 
     if not cart_items:
         await callback_query.message.answer("Ваша корзина пуста.")
         await state.clear()
         return
 
+    # Проверяем до оформления: без каталога не узнать стоимость доставки для ответа
+    catalog = await get_catalog()
+    if catalog is None:
+        await callback_query.message.answer(MENU_UNAVAILABLE)
+        return
+
     total_amount = sum(item['product_price'] * item['quantity'] for item in cart_items)
 
     product_ids_quantities = {item['id_product']: item['quantity'] for item in cart_items}
-    order_id = update_order(tg_user_id, delivery_type_id, delivery_address, delivery_time, total_amount,
+    order_id = await update_order(tg_user_id, delivery_type_id, delivery_address, delivery_time, total_amount,
                             product_ids_quantities)
 
     if order_id:
@@ -453,7 +633,7 @@ async def process_data_processing(callback_query: types.CallbackQuery, state: FS
              in cart_items]
         )
 
-        delivery_price = get_delivery_price(delivery_type_id) if total_amount < 1000 else 0
+        delivery_price = catalog.get_delivery_price(delivery_type_id) if total_amount < 1000 else 0
         # Добавляем состав заказа в сообщение
         success_message = (f"Заказ успешно оформлен! Номер вашего заказа: {order_id}\n\nСостав заказа:\n{order_details}"
                            f"\n\nСтоимость доставки: {delivery_price} руб.\n\nИтоговая стоимость: {total_amount + delivery_price} руб.")
@@ -522,7 +702,7 @@ async def process_delete_item(callback_query: types.CallbackQuery, state: FSMCon
     tg_user_id = callback_query.from_user.id
     print(tg_user_id)
     try:
-        remove_item_from_cart(tg_user_id, product_id)
+        await remove_item_from_cart(tg_user_id, product_id)
         await callback_query.answer("Товар успешно удален!")
         await callback_query.bot.delete_message(
             chat_id=callback_query.message.chat.id,
@@ -534,7 +714,7 @@ async def process_delete_item(callback_query: types.CallbackQuery, state: FSMCon
 async def process_cancel_order(callback_query: types.CallbackQuery):
     order_id = int(callback_query.data.split('_')[-1])
     try:
-        cancel_order_by_id(order_id)
+        await cancel_order_by_id(order_id)
         await callback_query.message.edit_text(text=f"Заказ №{order_id} успешно отменён")
         chat_id = 1080797132
         await callback_query.bot.send_message(chat_id=chat_id, text=f"Заказ №{order_id} был отменён")
@@ -542,7 +722,21 @@ async def process_cancel_order(callback_query: types.CallbackQuery):
         await callback_query.message.edit_text(text=f"Всё пошло по пизде: {e}")
 
 
+async def db_error_handler(event: types.ErrorEvent):
+    """
+    Ошибка БД там, где None означал бы "не найдено" (db_utils.DBError): сообщаем пользователю,
+    что сервис недоступен, вместо того чтобы молча потерять апдейт.
+    """
+    logging.error(f"Ошибка БД при обработке апдейта {event.update.update_id}: {event.exception}")
+    if event.update.message:
+        await event.update.message.answer(SERVICE_UNAVAILABLE)
+    elif event.update.callback_query:
+        await event.update.callback_query.answer(SERVICE_UNAVAILABLE, show_alert=True)
+    return True
+
+
 def register_user_handlers(dp: Dispatcher):
+    dp.errors.register(db_error_handler, ExceptionTypeFilter(DBError))
     dp.message.register(start_command, Command("start"))
     dp.message.register(nav_command, Command("nav"))
     dp.message.register(profile_command, Command("profile"))
@@ -551,7 +745,7 @@ def register_user_handlers(dp: Dispatcher):
     dp.message.register(process_phone, StateFilter(Registration.waiting_for_phone))
 
     dp.message.register(view_menu, F.text == "Просмотр меню")
-    dp.message.register(process_category, lambda msg: msg.text in category_names,
+    dp.message.register(process_category, category_filter,
                         ~StateFilter(Admin.adding_product_category), ~StateFilter(Admin.deleting_product_category))
 
     dp.message.register(view_order_history, F.text == "История заказов")
@@ -564,6 +758,9 @@ def register_user_handlers(dp: Dispatcher):
     dp.callback_query.register(process_checkout, F.data == "checkout")
     dp.message.register(nav_command, F.text == "Назад", ~StateFilter(Admin.adding_product_category))
 
+    dp.callback_query.register(process_carousel, F.data.startswith("carousel_"))
+    dp.callback_query.register(process_noop, F.data == "noop")
+    dp.inline_query.register(process_inline_query)
     dp.callback_query.register(process_select_product, F.data.startswith("order_"))
     dp.callback_query.register(process_cancel_select, F.data == "cancel_select",
                                StateFilter(Order.waiting_for_quantity))
@@ -2,7 +2,7 @@ import logging
 
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton, ReplyKeyboardMarkup, KeyboardButton
 
-from db.db_utils import get_menu_categories, get_delivery_types, get_products_by_category_as_menu, get_order_history
+from db.catalog import get_catalog
 
 
 # Навигационное меню
@@ -20,12 +20,14 @@ def nav_keyboard(is_admin=False):
     return keyboard
 
 
-def categories_keyboard():
-    categories = get_menu_categories()
-
-    if not categories:
+async def categories_keyboard():
+    catalog = await get_catalog()
+    if catalog is None or not catalog.categories:
         return None
+    return catalog.memoize("categories_keyboard", lambda: _build_categories_keyboard(catalog.categories))
+
 
+def _build_categories_keyboard(categories):
     row_width = 4
     rows = [categories[i:i + row_width] for i in range(0, len(categories), row_width)]
 
@@ -39,8 +41,9 @@ def categories_keyboard():
     return keyboard
 
 
-def get_deletion_keyboard(category_id):
-    products = get_products_by_category_as_menu(category_id)
+async def get_deletion_keyboard(category_id):
+    catalog = await get_catalog()
+    products = catalog.get_products_by_category(category_id) if catalog else []
     logging.info(f"products: {products}")
 
     # Количество кнопок в строке
@@ -59,29 +62,31 @@ def get_deletion_keyboard(category_id):
     return keyboard
 
 
-def get_delivery_type_markup():
-    delivery_types = get_delivery_types()  # Ожидается список словарей [{'id_type': ..., 'delivery_type': ...}, ...]
+async def get_delivery_type_markup():
+    catalog = await get_catalog()
+    if catalog is None or not catalog.delivery_types:
+        return None
+    return catalog.memoize("delivery_type_markup", lambda: _build_delivery_type_markup(catalog.delivery_types))
 
-    if delivery_types:
-        # Первый ряд — два типа доставки
-        buttons_row_1 = [
-            InlineKeyboardButton(
-                text=dt['name'],
-                callback_data=f"delivery_type_{dt['id_type']}"
-            ) for dt in delivery_types
-        ]
 
-        # Второй ряд — кнопка "Назад"
-        buttons_row_2 = [
-            InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_cart")
-        ]
+def _build_delivery_type_markup(delivery_types):
+    # Первый ряд — два типа доставки
+    buttons_row_1 = [
+        InlineKeyboardButton(
+            text=dt['name'],
+            callback_data=f"delivery_type_{dt['id_type']}"
+        ) for dt in delivery_types
+    ]
 
-        keyboard = InlineKeyboardMarkup(
-            inline_keyboard=[buttons_row_1, buttons_row_2]
-        )
-        return keyboard
-    else:
-        return None
+    # Второй ряд — кнопка "Назад"
+    buttons_row_2 = [
+        InlineKeyboardButton(text="🔙 Назад", callback_data="back_to_cart")
+    ]
+
+    keyboard = InlineKeyboardMarkup(
+        inline_keyboard=[buttons_row_1, buttons_row_2]
+    )
+    return keyboard
 
 
 def delivery_time_keyboard():
@@ -96,7 +101,8 @@ def admin_keyboard() -> ReplyKeyboardMarkup:
     return ReplyKeyboardMarkup(
         keyboard=[
             [KeyboardButton(text="Добавить новый товар"), KeyboardButton(text="Удалить товар")],
-            [KeyboardButton(text="Посмотреть заказы"), KeyboardButton(text="Изменить статус заказа")]
+            [KeyboardButton(text="Посмотреть заказы"), KeyboardButton(text="Изменить статус заказа")],
+            [KeyboardButton(text="Отчёт")]
         ],
         resize_keyboard=True,
         input_field_placeholder="Выберите действие"
@@ -112,6 +118,26 @@ def status_keyboard(order_id: int) -> InlineKeyboardMarkup:
     return keyboard
 
 
+
+def report_keyboard(days: int) -> InlineKeyboardMarkup:
+    periods = [(7, "7 дней"), (30, "30 дней"), (90, "90 дней")]
+    return InlineKeyboardMarkup(inline_keyboard=[[
+        InlineKeyboardButton(text=f"• {text}" if period == days else text, callback_data=f"report_{period}")
+        for period, text in periods
+    ]])
+
+
+def orders_page_keyboard(first_id: int, last_id: int, has_prev: bool, has_next: bool) -> InlineKeyboardMarkup | None:
+    buttons = []
+    if has_prev:
+        buttons.append(InlineKeyboardButton(text="⬅️ Новее", callback_data=f"orders_page_prev_{first_id}"))
+    if has_next:
+        buttons.append(InlineKeyboardButton(text="Старше ➡️", callback_data=f"orders_page_next_{last_id}"))
+
+    if not buttons:
+        return None
+    return InlineKeyboardMarkup(inline_keyboard=[buttons])
+
 def add_select_button(product_id: int) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -119,6 +145,34 @@ def add_select_button(product_id: int) -> InlineKeyboardMarkup:
         ]
     )
 
+def inline_product_keyboard(bot_username: str, product_id: int) -> InlineKeyboardMarkup:
+    """
+    Кнопка под результатом inline-поиска: открывает бота с этим товаром (/start product_<id>).
+    """
+    return InlineKeyboardMarkup(
+        inline_keyboard=[
+            [InlineKeyboardButton(text="🛒 Заказать в боте", url=f"https://t.me/{bot_username}?start=product_{product_id}")]
+        ]
+    )
+
+
+def carousel_keyboard(category_id: int, index: int, total: int, product_id: int) -> InlineKeyboardMarkup:
+    """
+    Клавиатура карусели товаров категории: листание по кругу и добавление текущего товара.
+    """
+    buttons = [
+        [InlineKeyboardButton(text="🛒 Добавить в корзину",
+                              callback_data=f"order_{product_id}_{category_id}_{index}")]
+    ]
+    if total > 1:
+        buttons.insert(0, [
+            InlineKeyboardButton(text="◀️", callback_data=f"carousel_{category_id}_{(index - 1) % total}"),
+            InlineKeyboardButton(text=f"{index + 1}/{total}", callback_data="noop"),
+            InlineKeyboardButton(text="▶️", callback_data=f"carousel_{category_id}_{(index + 1) % total}")
+        ])
+    return InlineKeyboardMarkup(inline_keyboard=buttons)
+
+
 def add_cancel_select_button() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(
         inline_keyboard=[
@@ -165,8 +219,7 @@ def add_accept_data_processing_button() -> InlineKeyboardMarkup:
     )
 
 
-def add_cancel_order_keyboard(tg_user_id) -> InlineKeyboardMarkup:
-    orders = get_order_history(tg_user_id)
+def add_cancel_order_keyboard(orders) -> InlineKeyboardMarkup:
     keyboard = []
     for order in orders:
         if order['status'] in ['Оформлен', 'Готовится']:
@@ -5,17 +5,35 @@ import logging
 
 from aiogram import Bot, Dispatcher, types
 from aiogram.filters import Command
-from aiogram.fsm.storage.memory import MemoryStorage
-
-from config import BOT_TOKEN
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from config import BOT_TOKEN, BOT_MODE, UPDATES_CONCURRENCY, WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, \
+    WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_MAX_CONNECTIONS, AUTO_MIGRATE, RECORD_UPDATES_PATH, RECORD_UPDATES_SALT, \
+    METRICS_HOST, METRICS_PORT
+from db.async_db_utils import run_in_db_executor, shutdown_executor
+from db.migrate import migrate, warn_pending
 from handlers import user_handlers, admin_handlers
+from middlewares.concurrency import ConcurrencyLimitMiddleware
+from middlewares.metrics import setup_metrics
+from middlewares.recorder import UpdateRecorderMiddleware
+from states.storage import build_storage
+from utils import images
+from utils.metrics import start_metrics_server
 
 logging.basicConfig(level=logging.INFO)
 
 bot = Bot(token=BOT_TOKEN)
-storage = MemoryStorage()
+storage = build_storage()
 dp = Dispatcher(storage=storage)
 dp.bot = bot
+# Апдейт записывается сразу при получении, до ожидания в очереди на обработку
+recorder = UpdateRecorderMiddleware(RECORD_UPDATES_PATH, RECORD_UPDATES_SALT) if RECORD_UPDATES_PATH else None
+if recorder:
+    dp.update.outer_middleware(recorder)
+# Метрики считаются до ограничения параллельности, чтобы в задержку попадало и ожидание очереди
+setup_metrics(dp, bot)
+dp.update.outer_middleware(ConcurrencyLimitMiddleware(UPDATES_CONCURRENCY))
 
 user_handlers.register_user_handlers(dp)
 admin_handlers.register_admin_handlers(dp)
@@ -39,7 +57,7 @@ dp.message.register(help_command, Command("help"))
 async def support_command(message: types.Message):
     # Замените на актуальную информацию об администраторе
     from utils.utils import is_admin  # импортируем локально, чтобы избежать циклического импорта
-    if is_admin(message.from_user.id):
+    if await is_admin(message.from_user.id):
         await message.answer(f"Вы администратор. Используйте админ-панель")
     else:
         admin_username = "@your_admin_username"  # Замените
@@ -49,9 +67,75 @@ async def support_command(message: types.Message):
 dp.message.register(support_command, Command("support"))
 
 
+metrics_runner = None
+
+
+async def on_startup():
+    global metrics_runner
+    if AUTO_MIGRATE:
+        await run_in_db_executor(migrate)
+    else:
+        await run_in_db_executor(warn_pending)
+    if METRICS_PORT:
+        metrics_runner = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+
+dp.startup.register(on_startup)
+
+
+async def on_shutdown():
+    if metrics_runner:
+        await metrics_runner.cleanup()
+    await storage.close()
+    shutdown_executor()
+    images.shutdown_executor()
+    if recorder:
+        recorder.close()
+
+
+dp.shutdown.register(on_shutdown)
+
+
 async def main():
+    # Если до этого бот работал через webhook, getUpdates вернёт конфликт
+    await bot.delete_webhook()
     await dp.start_polling(bot)
 
 
+async def on_webhook_startup():
+    await bot.set_webhook(
+        url=WEBHOOK_BASE_URL + WEBHOOK_PATH,
+        secret_token=WEBHOOK_SECRET,
+        max_connections=WEBHOOK_MAX_CONNECTIONS,
+        allowed_updates=dp.resolve_used_update_types()
+    )
+
+
+def run_webhook():
+    """
+    Принимает апдейты через встроенный HTTP-сервер. Несколько таких процессов
+    можно поставить за один балансировщик.
+    """
+    if not WEBHOOK_BASE_URL or not WEBHOOK_SECRET:
+        raise RuntimeError("Для webhook-режима нужны WEBHOOK_BASE_URL и WEBHOOK_SECRET")
+
+    dp.startup.register(on_webhook_startup)
+
+    app = web.Application()
+    # Telegram получает ответ сразу, а апдейт обрабатывается в фоне
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET,
+        handle_in_background=True
+    ).register(app, path=WEBHOOK_PATH)
+    setup_application(app, dp, bot=bot)
+
+    web.run_app(app, host=WEBHOOK_HOST, port=WEBHOOK_PORT)
+
+
 if __name__ == '__main__':
-    asyncio.run(main())
+    if BOT_MODE == "webhook":
+        run_webhook()
+    else:
+        asyncio.run(main())
@@ -0,0 +1,155 @@
+# middlewares/metrics.py
+# Метрики обработки апдейтов: сколько апдейтов в работе, время и исход каждого обработчика,
+# а также доля времени, проведённая в Telegram API и в БД. Экспортируются через utils.metrics.
+import time
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware, Bot, Dispatcher
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware
+from aiogram.dispatcher.event.bases import UNHANDLED
+from aiogram.types import TelegramObject, Update
+
+from utils.metrics import REGISTRY
+from utils.timing import UpdateTiming, current_update, add_api_time
+
+UPDATES_IN_FLIGHT = REGISTRY.gauge("bot_updates_in_flight", "Апдейты в обработке")
+UPDATES = REGISTRY.counter("bot_updates_total", "Обработанные апдейты", ["type", "outcome"])
+UPDATE_SECONDS = REGISTRY.histogram("bot_update_seconds", "Время обработки апдейта целиком", ["type"])
+HANDLER_CALLS = REGISTRY.counter("bot_handler_calls_total", "Вызовы обработчиков", ["handler", "outcome"])
+HANDLER_SECONDS = REGISTRY.histogram("bot_handler_seconds", "Время работы обработчика", ["handler"])
+HANDLER_API_SECONDS = REGISTRY.counter("bot_handler_api_seconds_total",
+                                       "Время обработчика в запросах к Telegram API", ["handler"])
+HANDLER_DB_SECONDS = REGISTRY.counter("bot_handler_db_seconds_total",
+                                      "Время обработчика в ожидании БД", ["handler"])
+API_SECONDS = REGISTRY.histogram("telegram_api_seconds", "Время запросов к Telegram API", ["method"])
+API_ERRORS = REGISTRY.counter("telegram_api_errors_total", "Ошибки запросов к Telegram API", ["method"])
+
+_in_flight = 0
+
+
+class UpdateMetricsMiddleware(BaseMiddleware):
+    """
+    Внешний middleware апдейтов: число апдейтов в работе, время и исход
+    (handled, unhandled, error) по типу апдейта. Создаёт контекст UpdateTiming.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        global _in_flight
+        update_type = event.event_type if isinstance(event, Update) else type(event).__name__
+        token = current_update.set(UpdateTiming())
+        _in_flight += 1
+        UPDATES_IN_FLIGHT.set(_in_flight)
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await handler(event, data)
+            outcome = "unhandled" if result is UNHANDLED else "handled"
+            return result
+        finally:
+            _in_flight -= 1
+            UPDATES_IN_FLIGHT.set(_in_flight)
+            UPDATE_SECONDS.observe(time.perf_counter() - started, type=update_type)
+            UPDATES.inc(type=update_type, outcome=outcome)
+            current_update.reset(token)
+
+
+class HandlerMetricsMiddleware(BaseMiddleware):
+    """
+    Внутренний middleware: вызывается уже для выбранного обработчика, поэтому знает его имя.
+    """
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        handler_object = data.get("handler")
+        name = getattr(handler_object.callback, "__name__", "unknown") if handler_object else "unknown"
+
+        timing = current_update.get()
+        if timing is not None:
+            timing.handler = name
+            api_before, db_before = timing.api_time, timing.db_time
+
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await handler(event, data)
+            outcome = "ok"
+            return result
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, handler=name)
+            HANDLER_CALLS.inc(handler=name, outcome=outcome)
+            if timing is not None:
+                HANDLER_API_SECONDS.inc(timing.api_time - api_before, handler=name)
+                HANDLER_DB_SECONDS.inc(timing.db_time - db_before, handler=name)
+
+
+class TelegramApiMetricsMiddleware(BaseRequestMiddleware):
+    """
+    Middleware сессии бота: время каждого запроса к Telegram API.
+    """
+
+    async def __call__(self, make_request, bot: Bot, method):
+        api_method = method.__api_method__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception:
+            API_ERRORS.inc(method=api_method)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            API_SECONDS.observe(elapsed, method=api_method)
+            add_api_time(elapsed)
+
+
+def setup_metrics(dp: Dispatcher, bot: Bot):
+    """
+    Подключает метрики: внешний middleware апдейтов, внутренний - к каждому типу событий, и middleware сессии.
+    """
+    dp.update.outer_middleware(UpdateMetricsMiddleware())
+    handler_metrics = HandlerMetricsMiddleware()
+    for name, observer in dp.observers.items():
+        if name not in ("update", "error"):
+            observer.middleware(handler_metrics)
+    bot.session.middleware(TelegramApiMetricsMiddleware())
+
+
+def format_handler_stats(limit=15):
+    """
+    Текстовая сводка для администратора: обработчики по суммарному времени.
+    """
+    handlers = {labels["handler"] for labels in HANDLER_SECONDS.label_sets()}
+    rows = []
+    for name in handlers:
+        count, total, _ = HANDLER_SECONDS.snapshot(handler=name)
+        rows.append((total, name, count))
+    if not rows:
+        return "Апдейтов пока не было."
+
+    handled = sum(UPDATES.get(type=labels["type"], outcome="handled") for labels in UPDATES.label_sets())
+    unhandled = sum(UPDATES.get(type=labels["type"], outcome="unhandled") for labels in UPDATES.label_sets())
+    errors = sum(UPDATES.get(type=labels["type"], outcome="error") for labels in UPDATES.label_sets())
+    lines = [
+        f"Апдейтов: обработано {int(handled)}, без обработчика {int(unhandled)}, с ошибкой {int(errors)}, "
+        f"сейчас в работе {_in_flight}",
+        "",
+        "Обработчики по суммарному времени:",
+    ]
+    rows.sort(reverse=True)
+    for total, name, count in rows[:limit]:
+        p95 = HANDLER_SECONDS.quantile(0.95, handler=name) or 0.0
+        lines.append(
+            f"{name}: {int(count)} выз., ср. {total / count * 1000:.1f} мс, p95 ≈{p95 * 1000:.0f} мс, "
+            f"ошибок {int(HANDLER_CALLS.get(handler=name, outcome='error'))}, "
+            f"Telegram {HANDLER_API_SECONDS.get(handler=name) / count * 1000:.1f} мс, "
+            f"БД {HANDLER_DB_SECONDS.get(handler=name) / count * 1000:.1f} мс"
+        )
+    return "\n".join(lines)
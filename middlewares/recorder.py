@@ -0,0 +1,133 @@
+# middlewares/recorder.py
+# Запись входящих апдейтов в JSONL для воспроизведения (benchmarks/replay.py).
+# Перед записью апдейт обезличивается: id пользователей и чатов заменяются псевдонимами,
+# имена и номера телефонов - заглушками, а текст, введённый в "личных" состояниях FSM
+# (имя, телефон, адрес, пароль), - фиксированными значениями.
+import hashlib
+import hmac
+import json
+import logging
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject, Update
+
+from states.states import Registration, Order, Admin
+
+# Объекты, в которых "id" - это id пользователя или чата
+_PERSON_KEYS = {"from", "chat", "user", "sender_chat", "forward_from", "forward_from_chat"}
+_PHONE_RE = re.compile(r"\+?\d{11,15}")
+
+# Текст, который подставляется вместо ввода в личных состояниях (None - подставить номер телефона)
+SENSITIVE_STATES = {
+    Registration.waiting_for_name.state: "Имя",
+    Registration.waiting_for_phone.state: None,
+    Order.waiting_for_address.state: "Адрес",
+    Admin.waiting_for_password.state: "password",
+    Admin.registering_password.state: "password",
+    Admin.waiting_for_name.state: "Имя",
+    Admin.waiting_for_phone.state: None,
+}
+
+
+class UpdateAnonymizer:
+    def __init__(self, salt: str = ""):
+        # Без заданной соли псевдонимы стабильны только в пределах одного запуска
+        self._salt = (salt or os.urandom(16).hex()).encode()
+
+    def pseudonym(self, value: int) -> int:
+        digest = hmac.new(self._salt, str(abs(value)).encode(), hashlib.sha256).hexdigest()
+        pseudonym = int(digest[:12], 16) + 1
+        return -pseudonym if value < 0 else pseudonym
+
+    def phone(self, value: int) -> str:
+        return "+7" + str(abs(self.pseudonym(value)))[-10:].rjust(10, "0")
+
+    def _person(self, obj: dict):
+        if obj.get("is_bot"):
+            return
+        if isinstance(obj.get("id"), int):
+            obj["id"] = self.pseudonym(obj["id"])
+        if "first_name" in obj:
+            obj["first_name"] = "User"
+        for key in ("last_name", "username", "title", "bio"):
+            obj.pop(key, None)
+
+    def _walk(self, obj, user_id):
+        if isinstance(obj, dict):
+            for key, value in list(obj.items()):
+                if key in _PERSON_KEYS and isinstance(value, dict):
+                    self._person(value)
+                if key == "phone_number":
+                    obj[key] = self.phone(user_id)
+                elif key in ("text", "caption") and isinstance(value, str):
+                    obj[key] = _PHONE_RE.sub(self.phone(user_id), value)
+                elif key == "data" and isinstance(value, str) and user_id:
+                    # Например, process_order_<tg_user_id>
+                    obj[key] = value.replace(str(user_id), str(self.pseudonym(user_id)))
+                else:
+                    self._walk(value, user_id)
+        elif isinstance(obj, list):
+            for value in obj:
+                self._walk(value, user_id)
+
+    def anonymize(self, update: dict, user_id: int = 0, state: str = None) -> dict:
+        if state in SENSITIVE_STATES:
+            message = update.get("message")
+            if message and "text" in message:
+                replacement = SENSITIVE_STATES[state]
+                message["text"] = replacement if replacement is not None else self.phone(user_id)
+        self._walk(update, user_id)
+        return update
+
+
+class UpdateRecorderMiddleware(BaseMiddleware):
+    """
+    Пишет каждый входящий апдейт строкой {"t": секунды от начала записи, "update": {...}}.
+    Запись идёт в отдельном потоке и не задерживает обработку апдейта.
+    """
+
+    def __init__(self, path: str, salt: str = ""):
+        self.path = path
+        self.anonymizer = UpdateAnonymizer(salt)
+        self._started = time.monotonic()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="recorder")
+        self._file = None
+
+    def _write(self, line: str):
+        try:
+            if self._file is None:
+                self._file = open(self.path, "a", encoding="utf-8")
+            self._file.write(line + "\n")
+            self._file.flush()
+        except OSError as err:
+            logging.error(f"Не удалось записать апдейт в {self.path}: {err}")
+
+    def record(self, update: Update, user_id: int = 0, state: str = None):
+        raw_update = update.model_dump(mode="json", exclude_unset=True, by_alias=True)
+        raw_update = self.anonymizer.anonymize(raw_update, user_id, state)
+        line = json.dumps({"t": round(time.monotonic() - self._started, 4), "update": raw_update},
+                          ensure_ascii=False, separators=(",", ":"))
+        self._executor.submit(self._write, line)
+
+    async def __call__(
+            self,
+            handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+            event: TelegramObject,
+            data: Dict[str, Any]
+    ) -> Any:
+        try:
+            user = data.get("event_from_user")
+            self.record(event, user.id if user else 0, data.get("raw_state"))
+        except Exception as err:
+            logging.error(f"Ошибка записи апдейта: {err}")
+        return await handler(event, data)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        if self._file is not None:
+            self._file.close()
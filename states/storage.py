@@ -0,0 +1,114 @@
+# states/storage.py
+# Хранилища FSM. По умолчанию состояния и данные хранятся в SQLite-файле,
+# поэтому незавершённые регистрации и заказы переживают перезапуск бота.
+import asyncio
+import json
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from config import FSM_STORAGE, FSM_STATE_TTL, FSM_DATA_TTL
+
+
+class SQLiteStorage(BaseStorage):
+    """
+    FSM-хранилище во встроенной SQLite с TTL на каждый ключ.
+
+    Состояние и данные лежат под разными ключами (как в RedisStorage), данные
+    сериализуются в компактный JSON. Все обращения к SQLite идут через один
+    выделенный поток, чтобы не блокировать event loop.
+    Для тестов можно использовать path=":memory:".
+    """
+
+    # Как часто (в записях) чистить протухшие ключи
+    PURGE_EVERY = 1000
+
+    def __init__(self, path: str, state_ttl: Optional[float] = None, data_ttl: Optional[float] = None,
+                 key_builder: Optional[KeyBuilder] = None):
+        self.state_ttl = state_ttl
+        self.data_ttl = data_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_destiny=True)
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fsm")
+        self._writes = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS fsm ("
+            " key TEXT PRIMARY KEY,"
+            " value TEXT NOT NULL,"
+            " expires_at REAL"
+            ") WITHOUT ROWID"
+        )
+
+    async def _run(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    def _get(self, key: str) -> Optional[str]:
+        row = self._conn.execute(
+            "SELECT value FROM fsm WHERE key = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def _set(self, key: str, value: Optional[str], ttl: Optional[float]):
+        if value is None:
+            self._conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+        else:
+            expires_at = time.time() + ttl if ttl else None
+            self._conn.execute(
+                "INSERT INTO fsm (key, value, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT(key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at",
+                (key, value, expires_at)
+            )
+
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self._conn.execute("DELETE FROM fsm WHERE expires_at <= ?", (time.time(),))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        value = state.state if isinstance(state, State) else state
+        await self._run(self._set, self.key_builder.build(key, "state"), value, self.state_ttl)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return await self._run(self._get, self.key_builder.build(key, "state"))
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        value = json.dumps(data, ensure_ascii=False, separators=(",", ":")) if data else None
+        await self._run(self._set, self.key_builder.build(key, "data"), value, self.data_ttl)
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        value = await self._run(self._get, self.key_builder.build(key, "data"))
+        return json.loads(value) if value else {}
+
+    async def close(self) -> None:
+        await self._run(self._conn.close)
+        self._executor.shutdown(wait=True)
+
+
+def build_storage(url: str = FSM_STORAGE) -> BaseStorage:
+    """
+    Создаёт FSM-хранилище по адресу из конфигурации:
+
+    - ``memory`` - в памяти процесса (теряется при перезапуске);
+    - ``sqlite://<путь>`` - SQLite-файл (``sqlite://:memory:`` - для тестов);
+    - ``redis://...`` - Redis (нужен пакет redis), можно делить между процессами.
+    """
+    if url == "memory":
+        return MemoryStorage()
+
+    if url.startswith("sqlite://"):
+        return SQLiteStorage(url[len("sqlite://"):], state_ttl=FSM_STATE_TTL, data_ttl=FSM_DATA_TTL)
+
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        from aiogram.fsm.storage.redis import RedisStorage  # требует пакет redis
+        return RedisStorage.from_url(url, state_ttl=FSM_STATE_TTL, data_ttl=FSM_DATA_TTL)
+
+    raise ValueError(f"Неизвестное FSM-хранилище: {url}")
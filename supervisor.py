@@ -0,0 +1,345 @@
+# supervisor.py
+# Запуск бота в несколько процессов: supervisor получает апдейты через long polling
+# и раздаёт их рабочим процессам по hash(chat_id). Все апдейты одного чата попадают
+# в один процесс и обрабатываются строго по очереди, поэтому FSM-сценарии не перемешиваются.
+#
+# Запуск: python supervisor.py (количество процессов - BOT_WORKERS).
+#
+# Рабочий процесс подтверждает каждый обработанный апдейт. Telegram получает offset
+# только до самого старого неподтверждённого апдейта, поэтому при перезапуске supervisor
+# необработанные апдейты придут снова. Упавший рабочий процесс перезапускается, а его
+# неподтверждённые апдейты отдаются новому процессу (апдейт, на котором процесс упал,
+# может быть обработан повторно; после UPDATE_MAX_ATTEMPTS попыток он пропускается).
+#
+# Кэши каталога, пользователей и админов у каждого процесса свои. Сброс кэша в одном
+# процессе (utils/invalidation.py) supervisor пересылает остальным через их очереди.
+
+import asyncio
+import logging
+import multiprocessing
+import queue as queue_errors
+import time
+
+from aiogram import Bot
+from aiogram.types import Update
+
+from config import BOT_TOKEN, BOT_WORKERS, FSM_STORAGE, WORKER_METRICS_INTERVAL
+
+logging.basicConfig(level=logging.INFO)
+
+# Поля метрик одного процесса в общем массиве
+METRIC_FIELDS = ("processed", "errors", "in_flight", "latency_total", "restarts")
+
+# Сколько раз апдейт отдаётся заново после падения обработавшего его процесса
+UPDATE_MAX_ATTEMPTS = 3
+# getUpdates возвращает не больше 100 апдейтов, начиная с offset
+GET_UPDATES_LIMIT = 100
+# Сколько секунд ждать подтверждения, если getUpdates вернул только уже розданные апдейты.
+# Без ожидания такой запрос возвращается сразу, и supervisor опрашивал бы Bot API без пауз
+ACK_WAIT_TIMEOUT = 1
+
+
+def shard_key(update: Update) -> int:
+    """
+    Ключ шардирования апдейта: id чата, а если чата нет - id пользователя.
+    """
+    event = update.event
+    chat = getattr(event, "chat", None)
+    if chat is not None:
+        return chat.id
+    message = getattr(event, "message", None)  # callback_query
+    if message is not None and getattr(message, "chat", None) is not None:
+        return message.chat.id
+    user = getattr(event, "from_user", None)
+    if user is not None:
+        return user.id
+    return update.update_id
+
+
+class WorkerMetrics:
+    def __init__(self, array, index):
+        self._array = array
+        self._offset = index * len(METRIC_FIELDS)
+
+    def add(self, field, value):
+        with self._array.get_lock():
+            self._array[self._offset + METRIC_FIELDS.index(field)] += value
+
+    def reset(self, field):
+        with self._array.get_lock():
+            self._array[self._offset + METRIC_FIELDS.index(field)] = 0
+
+    def snapshot(self):
+        with self._array.get_lock():
+            values = self._array[self._offset:self._offset + len(METRIC_FIELDS)]
+        return dict(zip(METRIC_FIELDS, values))
+
+
+async def _worker_loop(index, queue, control, metrics: WorkerMetrics):
+    # У каждого процесса свой /metrics: METRICS_PORT + 1 + номер процесса
+    import config
+    if config.METRICS_PORT:
+        config.METRICS_PORT += 1 + index
+
+    # Импортируем внутри процесса: у каждого рабочего свои Bot, Dispatcher и пул соединений
+    from main import bot, dp
+    from utils import invalidation
+    invalidation.set_publisher(lambda kind, arg: control.put(("invalidate", index, kind, arg)))
+
+    loop = asyncio.get_running_loop()
+    chat_locks = {}  # ключ чата -> [asyncio.Lock, количество ожидающих апдейтов]
+    tasks = set()
+
+    async def process(key, raw_update):
+        entry = chat_locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                started = time.monotonic()
+                metrics.add("in_flight", 1)
+                try:
+                    await dp.feed_raw_update(bot, raw_update)
+                    metrics.add("processed", 1)
+                except Exception:
+                    metrics.add("errors", 1)
+                    logging.exception(f"Ошибка обработки апдейта {raw_update.get('update_id')}")
+                finally:
+                    metrics.add("in_flight", -1)
+                    metrics.add("latency_total", time.monotonic() - started)
+                    control.put(("ack", index, raw_update["update_id"]))
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del chat_locks[key]
+
+    await dp.emit_startup(bot=bot, dispatcher=dp)
+    try:
+        while True:
+            item = await loop.run_in_executor(None, queue.get)
+            if item is None:
+                break
+            if item[0] == "invalidate":
+                invalidation.apply(*item[1:])
+                continue
+            task = asyncio.create_task(process(*item[1:]))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        await asyncio.gather(*tasks)
+    finally:
+        await dp.emit_shutdown(bot=bot, dispatcher=dp)
+        await bot.session.close()
+
+
+def run_worker(index, queue, control, metrics_array):
+    logging.info(f"Рабочий процесс #{index} запущен")
+    try:
+        asyncio.run(_worker_loop(index, queue, control, WorkerMetrics(metrics_array, index)))
+    except KeyboardInterrupt:
+        pass
+
+
+class Worker:
+    """
+    Рабочий процесс с его очередью и апдейтами, которые ему отданы, но ещё не подтверждены.
+    """
+
+    def __init__(self, context, index, control, metrics_array):
+        self.context = context
+        self.index = index
+        self.control = control
+        self.metrics_array = metrics_array
+        self.metrics = WorkerMetrics(metrics_array, index)
+        self.pending = {}  # update_id -> (ключ чата, апдейт)
+        self.process = None
+        self.queue = None
+
+    def start(self):
+        self.queue = self.context.Queue()
+        self.process = self.context.Process(target=run_worker, daemon=True,
+                                            args=(self.index, self.queue, self.control, self.metrics_array))
+        self.process.start()
+
+    def dispatch(self, update_id, key, raw_update):
+        self.pending[update_id] = (key, raw_update)
+        self.queue.put(("update", key, raw_update))
+
+
+class Supervisor:
+    def __init__(self, workers, control):
+        self.workers = workers
+        self.control = control
+        self.attempts = {}  # update_id -> сколько раз апдейт отдавался упавшим процессам
+        self.next_offset = None
+        self.stopping = False
+        self.acked = asyncio.Event()
+
+    def pending_ids(self):
+        return [update_id for worker in self.workers for update_id in worker.pending]
+
+    def confirm_offset(self):
+        """
+        offset для getUpdates: подтверждаем Telegram только апдейты до самого старого необработанного.
+        """
+        pending = self.pending_ids()
+        if not pending:
+            return self.next_offset
+        if len(pending) >= GET_UPDATES_LIMIT:
+            # Иначе getUpdates возвращал бы только уже розданные апдейты и новые не приходили бы.
+            # Розданные апдейты при этом не теряются, пока жив supervisor.
+            logging.warning(f"Необработанных апдейтов {len(pending)}, подтверждаем offset без ожидания")
+            return self.next_offset
+        return min(pending)
+
+    def handle_control(self, message):
+        if message[0] == "ack":
+            _, index, update_id = message
+            self.workers[index].pending.pop(update_id, None)
+            self.attempts.pop(update_id, None)
+            self.acked.set()
+        elif message[0] == "invalidate":
+            _, index, kind, arg = message
+            for worker in self.workers:
+                if worker.index != index:
+                    worker.queue.put(("invalidate", kind, arg))
+
+    def drain_control(self):
+        while True:
+            try:
+                self.handle_control(self.control.get_nowait())
+            except queue_errors.Empty:
+                return
+
+    async def read_control(self):
+        loop = asyncio.get_running_loop()
+        while not self.stopping:
+            try:
+                # С таймаутом, чтобы поток исполнителя не висел в get() после остановки
+                item = await loop.run_in_executor(None, self.control.get, True, 1)
+            except queue_errors.Empty:
+                continue
+            self.handle_control(item)
+
+    def respawn(self, worker):
+        logging.error(f"Рабочий процесс #{worker.index} (pid {worker.process.pid}) завершился "
+                      f"с кодом {worker.process.exitcode}, перезапускаем")
+        worker.metrics.add("restarts", 1)
+        worker.metrics.reset("in_flight")
+        self.drain_control()
+        pending = sorted(worker.pending.items())
+        worker.pending = {}
+        # Старая очередь могла остаться заблокированной упавшим процессом - у нового процесса своя
+        worker.start()
+        for update_id, (key, raw_update) in pending:
+            self.attempts[update_id] = self.attempts.get(update_id, 0) + 1
+            if self.attempts[update_id] > UPDATE_MAX_ATTEMPTS:
+                logging.error(f"Апдейт {update_id} пропущен: обработавшие его процессы падали "
+                              f"{UPDATE_MAX_ATTEMPTS} раз подряд")
+                self.attempts.pop(update_id)
+                continue
+            worker.dispatch(update_id, key, raw_update)
+
+    async def watch_workers(self):
+        while not self.stopping:
+            await asyncio.sleep(1)
+            for worker in self.workers:
+                if not self.stopping and not worker.process.is_alive():
+                    self.respawn(worker)
+
+    async def poll_updates(self, bot: Bot):
+        await bot.delete_webhook()
+        while True:
+            # Подтверждения, пришедшие во время запроса, тоже считаются
+            self.acked.clear()
+            try:
+                updates = await bot.get_updates(offset=self.confirm_offset(), timeout=30)
+            except Exception as err:
+                logging.error(f"Ошибка получения апдейтов: {err}")
+                await asyncio.sleep(1)
+                continue
+
+            pending = set(self.pending_ids())
+            dispatched = 0
+            for update in updates:
+                self.next_offset = max(self.next_offset or 0, update.update_id + 1)
+                # Telegram повторяет апдейты после offset, пока они не подтверждены
+                if update.update_id in pending:
+                    continue
+                key = shard_key(update)
+                raw_update = update.model_dump(mode="json", exclude_unset=True, by_alias=True)
+                self.workers[hash(key) % len(self.workers)].dispatch(update.update_id, key, raw_update)
+                dispatched += 1
+
+            if updates and not dispatched:
+                # Новых апдейтов нет, а long polling не ждёт, пока offset указывает на необработанный:
+                # ждём подтверждения (или новые апдейты не дольше ACK_WAIT_TIMEOUT)
+                try:
+                    await asyncio.wait_for(self.acked.wait(), ACK_WAIT_TIMEOUT)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def confirm_processed(self, bot: Bot):
+        """
+        Подтверждает Telegram всё обработанное перед остановкой (limit=1: вернувшийся апдейт не подтверждается).
+        """
+        self.drain_control()
+        offset = self.confirm_offset()
+        if offset is not None:
+            await bot.get_updates(offset=offset, limit=1, timeout=0)
+
+
+async def _report_metrics(workers):
+    while True:
+        await asyncio.sleep(WORKER_METRICS_INTERVAL)
+        for worker in workers:
+            stats = worker.metrics.snapshot()
+            handled = stats["processed"] + stats["errors"]
+            avg_latency = stats["latency_total"] / handled * 1000 if handled else 0.0
+            logging.info(
+                f"Процесс #{worker.index} (pid {worker.process.pid}, "
+                f"{'жив' if worker.process.is_alive() else 'остановлен'}): "
+                f"обработано {int(stats['processed'])}, ошибок {int(stats['errors'])}, "
+                f"в работе {int(stats['in_flight'])}, не подтверждено {len(worker.pending)}, "
+                f"перезапусков {int(stats['restarts'])}, среднее время {avg_latency:.1f} мс"
+            )
+
+
+async def supervise(worker_count=BOT_WORKERS):
+    if worker_count > 1 and FSM_STORAGE == "memory":
+        raise RuntimeError("Для нескольких процессов нужно общее FSM-хранилище (sqlite:// или redis://)")
+
+    context = multiprocessing.get_context("spawn")
+    metrics_array = context.Array("d", worker_count * len(METRIC_FIELDS))
+    control = context.Queue()
+    workers = [Worker(context, index, control, metrics_array) for index in range(worker_count)]
+    for worker in workers:
+        worker.start()
+
+    supervisor = Supervisor(workers, control)
+    bot = Bot(token=BOT_TOKEN)
+    background = [
+        asyncio.create_task(_report_metrics(workers)),
+        asyncio.create_task(supervisor.read_control()),
+        asyncio.create_task(supervisor.watch_workers()),
+    ]
+    try:
+        await supervisor.poll_updates(bot)
+    finally:
+        supervisor.stopping = True
+        for task in background:
+            task.cancel()
+        for worker in workers:
+            worker.queue.put(None)
+        for worker in workers:
+            worker.process.join(timeout=30)
+        try:
+            await supervisor.confirm_processed(bot)
+        except Exception as err:
+            logging.error(f"Не удалось подтвердить обработанные апдейты: {err}")
+        await bot.session.close()
+
+
+if __name__ == '__main__':
+    try:
+        asyncio.run(supervise())
+    except KeyboardInterrupt:
+        pass
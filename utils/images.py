@@ -0,0 +1,79 @@
+# utils/images.py
+# Приём фото товаров: исходник из Telegram хэшируется (одинаковые фото хранятся один раз),
+# уменьшается до IMAGE_MAX_SIDE и пережимается в JPEG.
+# Обработка идёт в пуле процессов, чтобы Pillow не занимал event loop и GIL.
+import asyncio
+import hashlib
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from aiogram import Bot
+from aiogram.types import PhotoSize
+
+from config import IMAGES_DIR, IMAGE_MAX_SIDE, IMAGE_QUALITY, IMAGE_WORKERS
+
+_executor = None
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return _executor
+
+
+def shutdown_executor():
+    if _executor is not None:
+        _executor.shutdown(wait=True)
+
+
+def _save_jpeg(image, path, quality):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    image.save(tmp_path, format="JPEG", quality=quality, optimize=True, progressive=True)
+    os.replace(tmp_path, path)
+
+
+def process_image(data, images_dir=IMAGES_DIR, max_side=IMAGE_MAX_SIDE, quality=IMAGE_QUALITY):
+    """
+    Обрабатывает исходное изображение (выполняется в отдельном процессе).
+
+    :param data: байты исходного файла.
+    :return: словарь с именем файла (photo) относительно images_dir,
+             размерами (width, height) и размером файла в байтах (size).
+    """
+    from PIL import Image, ImageOps
+
+    digest = hashlib.sha256(data).hexdigest()
+    photo_name = f"{digest}.jpg"
+    photo_path = os.path.join(images_dir, photo_name)
+
+    os.makedirs(images_dir, exist_ok=True)
+
+    if os.path.exists(photo_path):
+        # Такое фото уже загружали
+        with Image.open(photo_path) as image:
+            width, height = image.size
+    else:
+        with Image.open(io.BytesIO(data)) as source:
+            image = ImageOps.exif_transpose(source).convert("RGB")
+        image.thumbnail((max_side, max_side), Image.Resampling.LANCZOS)
+        width, height = image.size
+        _save_jpeg(image, photo_path, quality)
+
+    return {
+        "photo": photo_name,
+        "width": width,
+        "height": height,
+        "size": os.path.getsize(photo_path),
+    }
+
+
+async def ingest_photo(bot: Bot, photo: PhotoSize):
+    """
+    Скачивает фото из Telegram в память и обрабатывает его в пуле процессов.
+    """
+    buffer = io.BytesIO()
+    await bot.download(photo, destination=buffer)
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_get_executor(), process_image, buffer.getvalue())
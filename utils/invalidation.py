@@ -0,0 +1,38 @@
+# utils/invalidation.py
+# Сброс кэшей во всех процессах бота. Кэш регистрирует обработчик под своим именем,
+# publish() сбрасывает его в текущем процессе и передаёт сообщение дальше: под supervisor
+# рабочий процесс отправляет его supervisor, а тот - остальным процессам. При запуске
+# через main.py издателя нет и сброс только локальный.
+import logging
+
+_handlers = {}  # вид кэша -> функция сброса в текущем процессе
+_publisher = None
+
+
+def register(kind, handler):
+    _handlers[kind] = handler
+
+
+def set_publisher(publisher):
+    """
+    :param publisher: publisher(kind, arg) - доставляет сброс остальным процессам.
+    """
+    global _publisher
+    _publisher = publisher
+
+
+def apply(kind, arg=None):
+    """
+    Сбрасывает кэш только в текущем процессе (сообщение от другого процесса).
+    """
+    handler = _handlers.get(kind)
+    if handler is None:
+        logging.error(f"Неизвестный вид кэша для сброса: {kind}")
+        return
+    handler(arg)
+
+
+def publish(kind, arg=None):
+    apply(kind, arg)
+    if _publisher is not None:
+        _publisher(kind, arg)
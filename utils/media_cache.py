@@ -0,0 +1,135 @@
+# utils/media_cache.py
+# Кэш file_id, которые Telegram возвращает после первой загрузки файла.
+# Повторные отправки того же файла идут по file_id, без повторной загрузки.
+import asyncio
+import json
+import logging
+import os
+
+from aiogram import types
+from aiogram.exceptions import TelegramBadRequest
+from aiogram.types import FSInputFile
+
+from config import MEDIA_CACHE_PATH
+
+# Фрагменты ответа Telegram, когда недействителен сам file_id ("wrong file identifier/HTTP URL
+# specified", "wrong remote file identifier specified", "FILE_ID_INVALID" и т. п.)
+_INVALID_FILE_ID_ERRORS = ("wrong file identifier", "wrong remote file identifier", "file_id_invalid",
+                           "file reference", "wrong type of the web page content")
+
+_cache = None  # путь к файлу -> {"file_id": ..., "mtime": ..., "size": ...}
+_save_lock = asyncio.Lock()
+
+
+def _load():
+    global _cache
+    if _cache is None:
+        try:
+            with open(MEDIA_CACHE_PATH, encoding="utf-8") as f:
+                _cache = json.load(f)
+        except FileNotFoundError:
+            _cache = {}
+        except (OSError, ValueError) as err:
+            logging.error(f"Не удалось прочитать кэш медиа {MEDIA_CACHE_PATH}: {err}")
+            _cache = {}
+    return _cache
+
+
+def _key(path):
+    return os.path.normpath(path)
+
+
+def _write(data):
+    tmp_path = MEDIA_CACHE_PATH + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp_path, MEDIA_CACHE_PATH)
+
+
+async def _save():
+    async with _save_lock:
+        data = json.dumps(_load(), ensure_ascii=False, separators=(",", ":"))
+        try:
+            await asyncio.to_thread(_write, data)
+        except OSError as err:
+            logging.error(f"Не удалось сохранить кэш медиа {MEDIA_CACHE_PATH}: {err}")
+
+
+def get_file_id(path):
+    """
+    Возвращает сохранённый file_id, если файл не менялся с момента загрузки.
+    """
+    entry = _load().get(_key(path))
+    if not entry:
+        return None
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    if entry["mtime"] != stat.st_mtime_ns or entry["size"] != stat.st_size:
+        return None
+    return entry["file_id"]
+
+
+async def remember(path, file_id):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return
+    _load()[_key(path)] = {"file_id": file_id, "mtime": stat.st_mtime_ns, "size": stat.st_size}
+    await _save()
+
+
+def _is_invalid_file_id(err: TelegramBadRequest):
+    text = err.message.lower()
+    return any(fragment in text for fragment in _INVALID_FILE_ID_ERRORS)
+
+
+async def _send_cached(send, path, extract_file_id, **kwargs):
+    file_id = get_file_id(path)
+    if file_id:
+        try:
+            return await send(file_id, **kwargs)
+        except TelegramBadRequest as err:
+            # Остальные ошибки (не изменилось сообщение, длинная подпись, нет сообщения) к file_id
+            # не относятся: повторная загрузка упадёт так же, а рабочий file_id потеряется
+            if not _is_invalid_file_id(err):
+                raise
+            logging.warning(f"file_id для {path} больше не действителен, загружаем заново: {err}")
+            _load().pop(_key(path), None)
+
+    msg = await send(FSInputFile(path), **kwargs)
+    await remember(path, extract_file_id(msg))
+    return msg
+
+
+async def answer_photo(message: types.Message, path, **kwargs) -> types.Message:
+    return await _send_cached(
+        lambda photo, **kw: message.answer_photo(photo=photo, **kw),
+        path,
+        lambda msg: msg.photo[-1].file_id,
+        **kwargs
+    )
+
+
+async def answer_document(message: types.Message, path, **kwargs) -> types.Message:
+    return await _send_cached(
+        lambda document, **kw: message.answer_document(document=document, **kw),
+        path,
+        lambda msg: msg.document.file_id,
+        **kwargs
+    )
+
+
+async def edit_photo(message: types.Message, path, caption=None, parse_mode=None, **kwargs):
+    """
+    Заменяет фото и подпись в уже отправленном сообщении (edit_message_media).
+    """
+    return await _send_cached(
+        lambda photo, **kw: message.edit_media(
+            media=types.InputMediaPhoto(media=photo, caption=caption, parse_mode=parse_mode), **kw
+        ),
+        path,
+        lambda msg: msg.photo[-1].file_id,
+        **kwargs
+    )
@@ -0,0 +1,90 @@
+# utils/passwords.py
+# Пароли админ-панели: bcrypt выполняется в отдельном ограниченном пуле потоков
+# (не блокирует event loop), а неверные попытки ограничиваются по tg_user_id.
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import bcrypt
+
+from config import BCRYPT_WORKERS, ADMIN_LOGIN_MAX_ATTEMPTS, ADMIN_LOGIN_WINDOW
+from db import async_db_utils
+from utils.utils import invalidate_admin
+
+_bcrypt_executor = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_failed_attempts = {}  # tg_user_id -> deque времени последних ADMIN_LOGIN_MAX_ATTEMPTS неверных попыток
+_last_sweep = 0.0
+
+
+def _hash(password):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def _check(password, hashed_password):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+
+
+async def hash_password(password) -> str:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, _hash, password)
+
+
+async def check_password(password, hashed_password) -> bool:
+    return await asyncio.get_running_loop().run_in_executor(_bcrypt_executor, _check, password, hashed_password)
+
+
+def login_lockout(tg_user_id) -> float:
+    """
+    :return: сколько секунд пользователь ещё не может вводить пароль (0 - может).
+    """
+    attempts = _failed_attempts.get(tg_user_id)
+    if not attempts:
+        return 0
+    now = time.monotonic()
+    while attempts and now - attempts[0] > ADMIN_LOGIN_WINDOW:
+        attempts.popleft()
+    if not attempts:
+        del _failed_attempts[tg_user_id]
+        return 0
+    if len(attempts) < ADMIN_LOGIN_MAX_ATTEMPTS:
+        return 0
+    return ADMIN_LOGIN_WINDOW - (now - attempts[0])
+
+
+def _sweep_failed_attempts(now):
+    """
+    Удаляет пользователей, у которых окно блокировки уже прошло: иначе записи тех,
+    кто больше не вводит пароль, копились бы бесконечно. Проход по всем записям - не чаще раза в окно.
+    """
+    global _last_sweep
+    if now - _last_sweep < ADMIN_LOGIN_WINDOW:
+        return
+    _last_sweep = now
+    expired = [tg_user_id for tg_user_id, attempts in _failed_attempts.items()
+               if now - attempts[-1] > ADMIN_LOGIN_WINDOW]
+    for tg_user_id in expired:
+        del _failed_attempts[tg_user_id]
+
+
+async def verify_admin_password(tg_user_id, password) -> bool:
+    hashed_password = await async_db_utils.get_admin_password_hash()
+    if hashed_password and await check_password(password, hashed_password):
+        _failed_attempts.pop(tg_user_id, None)
+        return True
+
+    now = time.monotonic()
+    _sweep_failed_attempts(now)
+    # Для блокировки важны только последние ADMIN_LOGIN_MAX_ATTEMPTS попыток
+    _failed_attempts.setdefault(tg_user_id, deque(maxlen=ADMIN_LOGIN_MAX_ATTEMPTS)).append(now)
+    return False
+
+
+async def save_admin(tg_user_id: int, password_hash: str, name: str = None, phone: str = None) -> bool:
+    registered = await async_db_utils.register_admin(tg_user_id, password_hash, name=name, phone=phone)
+    if registered:
+        invalidate_admin(tg_user_id)
+    return registered
+
+
+async def register_admin(tg_user_id: int, password: str, name: str = None, phone: str = None) -> bool:
+    return await save_admin(tg_user_id, await hash_password(password), name=name, phone=phone)
@@ -0,0 +1,150 @@
+# utils/profiler.py
+# Семплирующий профилировщик для работающего бота: отдельный поток раз в PROFILER_INTERVAL_MS
+# снимает стеки всех потоков (sys._current_frames) и считает, в каких функциях они находятся.
+# В отличие от cProfile, код бота не трассируется, поэтому накладные расходы малы и не
+# зависят от нагрузки. Результат - топ функций по времени и стеки в формате folded
+# (flamegraph.pl, speedscope, inferno). Поток профилировщика получает GIL только при
+# переключении потоков, поэтому доли статистические и точны на интервалах в секунды.
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+from config import PROFILER_INTERVAL_MS
+
+_lock = threading.Lock()
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_name(code, names):
+    name = names.get(code)
+    if name is None:
+        filename = code.co_filename
+        if filename.startswith(_ROOT):
+            filename = filename[len(_ROOT):]
+        elif "site-packages" in filename:
+            filename = filename.split("site-packages" + os.sep, 1)[-1]
+        else:
+            filename = os.path.basename(filename)
+        # ";" разделяет кадры в формате folded
+        name = names[code] = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+    return name
+
+
+class Profile:
+    def __init__(self, loop_thread_id):
+        self.loop_thread_id = loop_thread_id
+        self.samples = 0
+        self.loop_samples = 0
+        self.idle_samples = 0
+        self.stacks = Counter()  # (поток, кадры от корня) -> количество
+        self.cumulative = Counter()  # функция -> в скольких семплах потока цикла она была в стеке
+        self.own = Counter()  # функция -> в скольких семплах потока цикла она была на вершине стека
+        self.elapsed = 0.0
+
+    def top(self, limit=20):
+        """
+        :return: [(функция, доля в стеке, доля на вершине), ...] для потока event loop,
+                 без учёта времени ожидания событий.
+        """
+        busy = self.loop_samples - self.idle_samples
+        if busy <= 0:
+            return []
+        return [(name, count / busy, self.own[name] / busy) for name, count in self.cumulative.most_common(limit)]
+
+    def folded(self):
+        lines = (f"{thread};{';'.join(frames)} {count}" for (thread, frames), count in self.stacks.items())
+        return "\n".join(lines) + "\n"
+
+
+def _sample(profile, own_id, names, thread_names):
+    for thread_id, frame in sys._current_frames().items():
+        if thread_id == own_id:
+            continue
+        frames = []
+        while frame is not None:
+            frames.append(_frame_name(frame.f_code, names))
+            frame = frame.f_back
+        frames.reverse()
+        frames = tuple(frames)
+
+        thread = thread_names.get(thread_id, f"thread-{thread_id}")
+        profile.stacks[(thread, frames)] += 1
+        if thread_id != profile.loop_thread_id:
+            continue
+        profile.loop_samples += 1
+        # Цикл событий ждёт в select(): это простой, а не нагрузка
+        if frames and frames[-1].startswith("select (selectors.py"):
+            profile.idle_samples += 1
+            continue
+        # Кадры самого цикла событий (run_forever, _run_once, Handle._run) есть в каждом семпле
+        task_frames = frames
+        for index in range(len(frames) - 1, -1, -1):
+            if frames[index].startswith("_run (events.py"):
+                task_frames = frames[index + 1:]
+                break
+        for name in set(task_frames):
+            profile.cumulative[name] += 1
+        if task_frames:
+            profile.own[task_frames[-1]] += 1
+
+
+def _run(profile, seconds, stop):
+    own_id = threading.get_ident()
+    names = {}
+    interval = PROFILER_INTERVAL_MS / 1000
+    started = time.perf_counter()
+    deadline = started + seconds
+    thread_names = {}
+    while not stop.is_set() and time.perf_counter() < deadline:
+        if profile.samples % 100 == 0:
+            thread_names = {thread.ident: thread.name for thread in threading.enumerate()}
+        _sample(profile, own_id, names, thread_names)
+        profile.samples += 1
+        stop.wait(interval)
+    profile.elapsed = time.perf_counter() - started
+
+
+async def profile_for(seconds):
+    """
+    Профилирует процесс seconds секунд, не блокируя event loop.
+    Одновременно может идти только один сеанс, иначе ProfilerBusy.
+    """
+    if not _lock.acquire(blocking=False):
+        raise ProfilerBusy()
+    try:
+        profile = Profile(threading.get_ident())
+        stop = threading.Event()
+        thread = threading.Thread(target=_run, args=(profile, seconds, stop), name="profiler", daemon=True)
+        thread.start()
+        try:
+            while thread.is_alive():
+                await asyncio.sleep(0.1)
+        finally:
+            stop.set()
+        return profile
+    finally:
+        _lock.release()
+
+
+def format_profile(profile, limit=20):
+    loop_samples = profile.loop_samples or 1
+    lines = [
+        f"Профиль процесса {os.getpid()} за {profile.elapsed:.1f} с: {profile.samples} семплов, "
+        f"event loop занят {100 * (profile.loop_samples - profile.idle_samples) / loop_samples:.0f}% времени",
+    ]
+    top = profile.top(limit)
+    if not top:
+        lines.append("Event loop всё время ждал событий.")
+        return "\n".join(lines)
+    lines.append("")
+    lines.append("Функции по времени в стеке (от занятого времени event loop, в скобках - собственное):")
+    for name, cumulative, own in top:
+        lines.append(f"{cumulative * 100:5.1f}% ({own * 100:.1f}%) {name}")
+    return "\n".join(lines)
@@ -0,0 +1,79 @@
+# utils/reports.py
+# Отчёт о продажах для админ-панели. Считается только по агрегатам daily_sales
+# (строка на день, товар и тип доставки), итоги периода - векторно в NumPy.
+from datetime import timedelta
+
+import numpy as np
+
+TOP_PRODUCTS = 5
+
+
+def _change(current, previous):
+    if previous == 0:
+        return ""
+    return f" ({(current - previous) / previous * 100:+.0f}% к пред. периоду)"
+
+
+def _totals_by(keys, weights):
+    """
+    Суммы weights по значениям keys: (уникальные ключи, суммы).
+    """
+    unique, inverse = np.unique(keys, return_inverse=True)
+    return unique, np.bincount(inverse, weights=weights, minlength=len(unique))
+
+
+def build_sales_report(rows, today, days):
+    """
+    :param rows: строки get_daily_sales за 2 * days дней, заканчивая today
+                 (текущий период и предыдущий такой же длины для сравнения).
+    """
+    start = today - timedelta(days=days - 1)
+    previous_start = start - timedelta(days=days)
+    title = f"📈 Продажи за {days} дн. ({start.strftime('%d.%m')} - {today.strftime('%d.%m.%Y')})"
+    if not rows:
+        return f"{title}\n\nПродаж нет."
+
+    offsets = np.fromiter(((row['sale_date'] - previous_start).days for row in rows), dtype=np.int64, count=len(rows))
+    revenue = np.fromiter((row['revenue'] for row in rows), dtype=np.float64, count=len(rows))
+    quantity = np.fromiter((row['quantity'] for row in rows), dtype=np.int64, count=len(rows))
+    products = np.fromiter((row['id_product'] for row in rows), dtype=np.int64, count=len(rows))
+    types = np.fromiter((row['id_type'] for row in rows), dtype=np.int64, count=len(rows))
+    product_names = {row['id_product']: row['product_name'] for row in rows}
+    type_names = {row['id_type']: row['delivery_type'] or "—" for row in rows}
+
+    current = offsets >= days
+    revenue_total = revenue[current].sum()
+    previous_total = revenue[~current].sum()
+    quantity_total = int(quantity[current].sum())
+    previous_quantity = int(quantity[~current].sum())
+    if not current.any():
+        return f"{title}\n\nПродаж нет. За предыдущий период: {previous_total:.2f}₽."
+
+    daily = np.bincount(offsets[current] - days, weights=revenue[current], minlength=days)
+    best_day = int(daily.argmax())
+
+    lines = [
+        title,
+        "",
+        f"💰 Выручка по товарам: {revenue_total:.2f}₽{_change(revenue_total, previous_total)}",
+        f"📦 Продано единиц: {quantity_total}{_change(quantity_total, previous_quantity)}",
+        f"📅 В среднем за день: {daily.mean():.2f}₽, дней с продажами: {int(np.count_nonzero(daily))} из {days}",
+        f"🏆 Лучший день: {(start + timedelta(days=best_day)).strftime('%d.%m')} - {daily[best_day]:.2f}₽",
+        "",
+        "Топ товаров по выручке:",
+    ]
+
+    product_ids, product_revenue = _totals_by(products[current], revenue[current])
+    _, product_quantity = _totals_by(products[current], quantity[current])
+    for index in np.argsort(product_revenue)[::-1][:TOP_PRODUCTS]:
+        share = product_revenue[index] / revenue_total * 100 if revenue_total else 0.0
+        lines.append(f"{product_names[int(product_ids[index])]}: {product_revenue[index]:.2f}₽ "
+                     f"({share:.0f}%), {int(product_quantity[index])} шт.")
+
+    lines.append("")
+    lines.append("По типу доставки:")
+    type_ids, type_revenue = _totals_by(types[current], revenue[current])
+    for index in np.argsort(type_revenue)[::-1]:
+        share = type_revenue[index] / revenue_total * 100 if revenue_total else 0.0
+        lines.append(f"{type_names[int(type_ids[index])]}: {type_revenue[index]:.2f}₽ ({share:.0f}%)")
+    return "\n".join(lines)
@@ -0,0 +1,124 @@
+# utils/search.py
+# Поиск товаров для inline-режима (@bot гирос) по названию и описанию без запросов к БД.
+# Индекс строится по товарам каталога и хранится в Catalog.memoize, поэтому
+# пересобирается сам при загрузке новой версии каталога.
+#
+# Слово запроса совпадает со словом товара по префиксу ("гир" -> "гирос") или, если
+# есть опечатка, по доле общих триграмм ("гироз" -> "гирос").
+import re
+
+from db.catalog import get_catalog
+
+# Минимальная доля триграмм слова запроса, найденных в поле товара
+FUZZY_THRESHOLD = 0.5
+# Сколько первых символов слова попадает в индекс префиксов
+MAX_PREFIX = 12
+MAX_RESULTS = 200
+
+# Вес совпадения в названии и в описании
+NAME_WEIGHT = 3.0
+DESCRIPTION_WEIGHT = 1.0
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def words(text):
+    return _WORD_RE.findall((text or "").lower().replace("ё", "е"))
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class _Field:
+    """
+    Префиксы и триграммы слов одного поля (названия или описания) всех товаров.
+    """
+
+    def __init__(self, weight):
+        self.weight = weight
+        self.prefixes = {}  # префикс -> {id_product}
+        self.trigrams = {}  # триграмма -> {id_product}
+
+    def add(self, product_id, text):
+        for word in set(words(text)):
+            for length in range(1, min(len(word), MAX_PREFIX) + 1):
+                self.prefixes.setdefault(word[:length], set()).add(product_id)
+            for trigram in trigrams(word):
+                self.trigrams.setdefault(trigram, set()).add(product_id)
+
+    def match(self, word):
+        """
+        :return: {id_product: вес совпадения} для одного слова запроса.
+        """
+        scores = {}
+        if len(word) <= MAX_PREFIX:
+            for product_id in self.prefixes.get(word, ()):
+                scores[product_id] = self.weight
+        elif word[:MAX_PREFIX] in self.prefixes:
+            for product_id in self.prefixes[word[:MAX_PREFIX]]:
+                scores[product_id] = self.weight * 0.9
+
+        word_trigrams = trigrams(word)
+        shared = {}
+        for trigram in word_trigrams:
+            for product_id in self.trigrams.get(trigram, ()):
+                shared[product_id] = shared.get(product_id, 0) + 1
+        for product_id, count in shared.items():
+            similarity = count / len(word_trigrams)
+            if similarity >= FUZZY_THRESHOLD and product_id not in scores:
+                # Нечёткое совпадение всегда слабее точного префикса
+                scores[product_id] = self.weight * similarity * 0.8
+        return scores
+
+
+class SearchIndex:
+    def __init__(self, products):
+        self.products = products  # в порядке каталога
+        self.order = {product['id_product']: position for position, product in enumerate(products)}
+        self.name = _Field(NAME_WEIGHT)
+        self.description = _Field(DESCRIPTION_WEIGHT)
+        for product in products:
+            self.name.add(product['id_product'], product['name'])
+            self.description.add(product['id_product'], product.get('descript'))
+
+    def search(self, query, limit=MAX_RESULTS):
+        """
+        :return: id товаров по убыванию релевантности. Выше те, где нашлись все слова запроса.
+        """
+        query_words = words(query)
+        if not query_words:
+            return [product['id_product'] for product in self.products[:limit]]
+
+        scores = {}
+        matched = {}
+        for word in query_words:
+            word_scores = self.description.match(word)
+            for product_id, score in self.name.match(word).items():
+                word_scores[product_id] = max(score, word_scores.get(product_id, 0.0))
+            for product_id, score in word_scores.items():
+                scores[product_id] = scores.get(product_id, 0.0) + score
+                matched[product_id] = matched.get(product_id, 0) + 1
+
+        best = max(matched.values(), default=0)
+        # Если какие-то товары подошли по всем словам, частичные совпадения не показываем
+        if best == len(query_words):
+            candidates = [product_id for product_id, count in matched.items() if count == best]
+        else:
+            candidates = list(matched)
+        candidates.sort(key=lambda product_id: (-matched[product_id], -scores[product_id], self.order[product_id]))
+        return candidates[:limit]
+
+
+async def search_products(query, limit=MAX_RESULTS):
+    """
+    Товары каталога, подходящие под запрос, по убыванию релевантности.
+    """
+    catalog = await get_catalog()
+    if catalog is None:
+        return []
+    index = catalog.memoize("search_index", lambda: SearchIndex(
+        [product for products in catalog.products_by_category.values() for product in products]
+    ))
+    return [catalog.products_by_id[product_id] for product_id in index.search(query, limit)]
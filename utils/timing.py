@@ -0,0 +1,33 @@
+# utils/timing.py
+# Учёт времени, которое обработка одного апдейта провела в Telegram API и в БД.
+# Контекст апдейта хранится в contextvar: его создаёт middlewares/metrics.py, а время
+# добавляют middleware сессии бота (Telegram API) и async_db_utils (ожидание БД).
+import contextvars
+
+
+class UpdateTiming:
+    __slots__ = ("handler", "api_time", "api_calls", "db_time", "db_calls")
+
+    def __init__(self):
+        self.handler = None
+        self.api_time = 0.0
+        self.api_calls = 0
+        self.db_time = 0.0
+        self.db_calls = 0
+
+
+current_update = contextvars.ContextVar("current_update", default=None)
+
+
+def add_api_time(seconds):
+    timing = current_update.get()
+    if timing is not None:
+        timing.api_time += seconds
+        timing.api_calls += 1
+
+
+def add_db_time(seconds):
+    timing = current_update.get()
+    if timing is not None:
+        timing.db_time += seconds
+        timing.db_calls += 1
@@ -1,13 +1,45 @@
 # utils/utils.py
+import time
+from collections import OrderedDict
+
 from aiogram import Bot
 from aiogram.fsm.context import FSMContext
 
-from db.db_utils import get_admin_by_tg_id
+from config import ADMIN_CACHE_TTL, ADMIN_CACHE_SIZE
+from db.async_db_utils import get_admin_by_tg_id
+from utils import invalidation
+
+_admin_cache = OrderedDict()  # tg_user_id -> (является ли админом, когда запись устареет)
+
+
+async def is_admin(tg_user_id):
+    """
+    Ошибка БД (db_utils.DBError) пробрасывается и не кэшируется, чтобы сбой не закрыл админу доступ.
+    """
+    cached = _admin_cache.get(tg_user_id)
+    now = time.monotonic()
+    if cached and cached[1] > now:
+        _admin_cache.move_to_end(tg_user_id)
+        return cached[0]
+
+    admin = await get_admin_by_tg_id(tg_user_id)
+    result = admin is not None
+    _admin_cache[tg_user_id] = (result, now + ADMIN_CACHE_TTL)
+    _admin_cache.move_to_end(tg_user_id)
+    if len(_admin_cache) > ADMIN_CACHE_SIZE:
+        _admin_cache.popitem(last=False)
+    return result
+
+
+def _drop_admin(tg_user_id):
+    _admin_cache.pop(tg_user_id, None)
+
+
+invalidation.register("admin", _drop_admin)
 
 
-def is_admin(tg_user_id):
-    admin = get_admin_by_tg_id(tg_user_id)
-    return admin is not None
+def invalidate_admin(tg_user_id):
+    invalidation.publish("admin", tg_user_id)
 
 
 async def delete_saved_messages(bot: Bot, chat_id: int, state: FSMContext):